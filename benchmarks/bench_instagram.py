@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Benchmark Instagram extraction offline: the network mode's JSON feed parsing against a
+recorded tag-sections payload, modal extraction in headless Chromium against a local
+HTML fixture of an opened post, and page loads of that post with its video, font, images
+and tracking script under the full and lean browser profiles.
+
+Usage:
+    python benchmarks/bench_instagram.py [--posts 3000] [--profile-posts 50]
+"""
+import copy
+import json
+import asyncio
+import argparse
+
+from harness import Measurement, load_fixture, isolated_workdir, http_server, skipped, quiet, _QuietHandler, FIXTURES_DIR
+
+def bench_config():
+    #Dummy credentials; the modal benchmark never logs in
+    return {
+        'instagram': {
+            'username': 'benchmark',
+            'password': 'benchmark',
+            'headless': True,
+            'extraction_mode': 'modal',
+            'storage_state_file': 'instagram_state.json'
+        },
+        'thumbnail_directory': 'thumbnails'
+    }
+
+def payload_pages(posts):
+    #Yield copies of the recorded payload with post codes made unique per page, until `posts` medias are produced
+    recorded = load_fixture('instagram_tag_sections.json')
+    per_page = sum(len(section['layout_content']['medias']) for section in recorded['data']['recent']['sections'])
+    page = 0
+    produced = 0
+    while produced < posts:
+        payload = copy.deepcopy(recorded)
+        for section in payload['data']['recent']['sections']:
+            for item in section['layout_content']['medias']:
+                item['media']['code'] = f"{item['media']['code']}{page}"
+        yield payload
+        produced += per_page
+        page += 1
+
+def run_feed(posts=3000):
+    #Parse recorded feed payloads into post rows, as the network extraction mode does per response
+    from instagram_feed import InstagramFeedCollector
+
+    pages = list(payload_pages(posts))
+    collector = InstagramFeedCollector()
+    rows = 0
+    with Measurement('instagram.feed_payload', posts=posts) as measurement:
+        for payload in pages:
+            added = collector.add_payload(payload)
+            rows += len(collector.drain())
+            measurement.lap(added)
+    return measurement.result(rows=rows, payloads=len(pages))
+
+def post_handler():
+    #Serve the recorded post page for any /p/<id>/ path
+    with open(f"{FIXTURES_DIR}/instagram_post.html", 'rb') as f:
+        body = f.read()
+
+    class PostHandler(_QuietHandler):
+        def do_GET(self):
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/html; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+    return PostHandler
+
+async def _run_modal(posts, base_url):
+    from scrapers import InstagramScraper
+    from browser import close_browser_pool
+
+    scraper = InstagramScraper()
+    try:
+        try:
+            await scraper.setup_browser()
+        except Exception as e:
+            return skipped('instagram.modal_extract', f"Chromium unavailable: {str(e).splitlines()[0]}", posts=posts)
+
+        extracted = 0
+        with Measurement('instagram.modal_extract', posts=posts) as measurement:
+            for number in range(posts):
+                # Navigation is excluded; only the single-evaluate extraction and parsing are timed
+                await scraper.page.goto(f"{base_url}/p/benchmark{number}/")
+                with measurement.operation():
+                    if await scraper._extract_post_data():
+                        extracted += 1
+        return measurement.result(extracted=extracted)
+    finally:
+        await scraper.cleanup()
+        await close_browser_pool()
+
+def run_modal(posts=200):
+    #Extract post data from the recorded modal page in headless Chromium
+    with isolated_workdir(bench_config()), http_server(post_handler()) as base_url:
+        return asyncio.run(_run_modal(posts, base_url))
+
+# Assets a real post page pulls in besides the DOM: (content type, size in bytes)
+PAGE_ASSETS = {
+    '/static/clip.mp4': ('video/mp4', 1536 * 1024),
+    '/static/font.woff2': ('font/woff2', 96 * 1024),
+    '/static/thumb.jpg': ('image/jpeg', 48 * 1024),
+    '/ajax/bz': ('application/javascript', None)
+}
+
+# Keeps the renderer busy for a while, like the analytics bundles on the real page
+TRACKING_SCRIPT = b"var t = 0; for (var i = 0; i < 3000000; i++) { t += Math.sqrt(i); } document.title = String(t);"
+
+def heavy_post_handler():
+    #Serve the recorded post page with a video, a web font and a tracking script, and those assets
+    with open(f"{FIXTURES_DIR}/instagram_post.html", 'rb') as f:
+        page = f.read()
+    page = page.replace(b'</head>', b'<style>@font-face { font-family: Bench; src: url(/static/font.woff2); } '
+                                     b'body { font-family: Bench; }</style></head>')
+    page = page.replace(b'</body>', b'<video src="/static/clip.mp4" autoplay muted preload="auto"></video>'
+                                     b'<script src="/ajax/bz?event=pageview"></script></body>')
+
+    class HeavyPostHandler(_QuietHandler):
+        def do_GET(self):
+            path = self.path.split('?')[0]
+            if path in PAGE_ASSETS:
+                content_type, size = PAGE_ASSETS[path]
+                body = TRACKING_SCRIPT if size is None else b'\0' * size
+            else:
+                content_type, body = 'text/html; charset=utf-8', page
+            self.send_response(200)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+    return HeavyPostHandler
+
+async def _run_profile(profile, posts, base_url):
+    from browser import BrowserPool
+    from metrics import get_metrics
+
+    name = f"instagram.profile_{profile}"
+    # Both profiles run headless so the comparison also works on hosts without a display
+    pool = BrowserPool(headless=True, profile=profile, storage_state_path='instagram_state.json')
+    try:
+        try:
+            context = await pool.new_context()
+        except Exception as e:
+            return skipped(name, f"Chromium unavailable: {str(e).splitlines()[0]}", posts=posts)
+
+        page = await pool.new_page(context)
+        with Measurement(name, posts=posts) as measurement:
+            for number in range(posts):
+                with measurement.operation():
+                    await page.goto(f"{base_url}/p/benchmark{number}/", wait_until='load')
+        await pool.close_context(context)
+
+        totals = {}
+        for counter in get_metrics().summary()['counters']:
+            if counter['labels'].get('profile') == profile:
+                totals[counter['name']] = totals.get(counter['name'], 0) + counter['value']
+        return measurement.result(
+            kb_per_post=round(totals.get('browser_bytes_total', 0) / posts / 1024, 1),
+            cpu_ms_per_post=round(totals.get('browser_cpu_seconds_total', 0) / posts * 1000, 1),
+            blocked_per_post=round(totals.get('browser_requests_blocked_total', 0) / posts, 1)
+        )
+    finally:
+        await pool.close()
+
+def run_profiles(posts=50):
+    #Load the same heavy post page under each browser profile, reporting bytes and renderer CPU per post
+    results = []
+    with isolated_workdir(bench_config()), http_server(heavy_post_handler()) as base_url:
+        for profile in ('full', 'lean'):
+            results.append(asyncio.run(_run_profile(profile, posts, base_url)))
+    return results
+
+def run(posts=3000, modal_posts=200, profile_posts=50):
+    with quiet():
+        return [run_feed(posts), run_modal(modal_posts)] + run_profiles(profile_posts)
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark Instagram extraction against local fixtures')
+    parser.add_argument('--posts', type=int, default=3000, help='Number of feed posts to parse')
+    parser.add_argument('--modal-posts', type=int, default=200, help='Number of post pages to extract in Chromium')
+    parser.add_argument('--profile-posts', type=int, default=50, help='Post pages loaded under each browser profile')
+    args = parser.parse_args()
+    print(json.dumps(run(args.posts, args.modal_posts, args.profile_posts), indent=2))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Benchmark dashboard-style lookups: hashtag and date-range, author and full-text queries
+against the SQLite metadata store, compared with filtering a full scan of metadata.csv.
+
+Usage:
+    python benchmarks/bench_query.py [--rows 100000] [--queries 200]
+"""
+import json
+import random
+import argparse
+from datetime import datetime, timedelta
+
+from harness import Measurement, isolated_workdir, quiet
+
+HASHTAGS = ['lofi', 'study', 'coding', 'python', 'travel', 'food', 'music', 'art', 'fitness', 'gaming']
+AUTHORS = ['Study Music Beats', 'travel_with_ana', 'CodeCraft', 'foodie.daily', 'Pixel Arcade']
+WORDS = ('late night coding session with lofi beats to study and relax while the city sleeps '
+         'street food tour around the old town market sunrise hike over the ridge').split()
+
+def make_rows(count, seed=7):
+    #Rows from both platforms spread over a year, with two hashtags each
+    rng = random.Random(seed)
+    start = datetime(2024, 1, 1)
+    rows = []
+    for number in range(count):
+        published = start + timedelta(minutes=rng.randrange(365 * 24 * 60))
+        rows.append({
+            'post_id': f"bench{number:011d}",
+            'platform': 'youtube' if number % 2 else 'instagram',
+            'post_text': ' '.join(rng.sample(WORDS, 10)),
+            'hashtags': ','.join(rng.sample(HASHTAGS, 2)),
+            'timestamp': published.strftime('%Y-%m-%dT%H:%M:%SZ'),
+            'likes': str(rng.randrange(100000)),
+            'comments': str(rng.randrange(1000)),
+            'author': rng.choice(AUTHORS),
+            'view_count': str(rng.randrange(10000000)) if number % 2 else '',
+            'scraped_at': datetime(2025, 1, 1).isoformat()
+        })
+    return rows
+
+def query_cases(count, seed=11):
+    #A repeatable mix of hashtag plus one-month range lookups
+    rng = random.Random(seed)
+    cases = []
+    for _ in range(count):
+        month = rng.randrange(1, 12)
+        cases.append((rng.choice(HASHTAGS), f"2024-{month:02d}-01", f"2024-{month + 1:02d}-01"))
+    return cases
+
+def scan_csv(filename, hashtag, since, until):
+    #What a dashboard does without the store: read every row and filter in Python
+    import csv
+    matches = []
+    with open(filename, 'r', newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            if hashtag in row['hashtags'].split(',') and since <= row['timestamp'] < until:
+                matches.append(row)
+    return matches
+
+def run(rows=100000, queries=200):
+    from storage import MetadataStore, MetadataCSVWriter
+
+    results = []
+    with quiet(), isolated_workdir({}):
+        data = make_rows(rows)
+        MetadataCSVWriter('metadata.csv').append(data)
+
+        store = MetadataStore('metadata.db')
+        with Measurement('query.backfill', rows=rows) as backfill:
+            store.backfill(data)
+            backfill.lap(rows)
+        results.append(backfill.result())
+        del data
+
+        cases = query_cases(queries)
+        with Measurement('query.hashtag_range', rows=rows, queries=queries) as measurement:
+            for hashtag, since, until in cases:
+                with measurement.operation():
+                    store.query(hashtag=hashtag, since=since, until=until, limit=100)
+        results.append(measurement.result())
+
+        with Measurement('query.author_newest', rows=rows, queries=queries) as measurement:
+            for index in range(queries):
+                with measurement.operation():
+                    store.query(author=AUTHORS[index % len(AUTHORS)], limit=100)
+        results.append(measurement.result())
+
+        with Measurement('query.full_text', rows=rows, queries=queries) as measurement:
+            for index in range(queries):
+                with measurement.operation():
+                    store.query(text=f"{WORDS[index % len(WORDS)]} beats", limit=100)
+        results.append(measurement.result())
+        store.close()
+
+        # Full scans are slow, so only a few are timed
+        with Measurement('query.csv_scan', rows=rows, queries=min(queries, 5)) as measurement:
+            for hashtag, since, until in cases[:5]:
+                with measurement.operation():
+                    scan_csv('metadata.csv', hashtag, since, until)
+        results.append(measurement.result())
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark queries against the metadata store')
+    parser.add_argument('--rows', type=int, default=100000, help='Rows in the store and CSV')
+    parser.add_argument('--queries', type=int, default=200, help='Queries per benchmark')
+    args = parser.parse_args()
+    print(json.dumps(run(args.rows, args.queries), indent=2))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Benchmark the save path: bulk save_to_metadata_csv into an empty output at several sizes,
+then small appends and re-saves of already indexed posts against the filled output.
+
+Usage:
+    python benchmarks/bench_save.py [--sizes 10000 100000 1000000] [--format csv]
+"""
+import os
+import json
+import argparse
+from datetime import datetime, timedelta
+
+from harness import Measurement, isolated_workdir, quiet
+
+DEFAULT_SIZES = (10000, 100000, 1000000)
+# Rows per save_to_metadata_csv call while filling the output
+BULK_CHUNK_SIZE = 10000
+APPEND_BATCHES = 40
+
+def make_row(number, scraped_at):
+    #A YouTube-shaped row with realistic field lengths
+    return {
+        'post_id': f"bench{number:011d}",
+        'platform': 'youtube',
+        'post_text': f"Lofi beats to study and relax to, session {number}. Subscribe for daily mixes",
+        'hashtags': 'lofi,study,relax',
+        'timestamp': '2024-05-01T18:42:07Z',
+        'image_url': f"https://i.ytimg.com/vi/bench{number:011d}/hqdefault.jpg",
+        'likes': str(number % 50000),
+        'comments': str(number % 900),
+        'author': 'Study Music Beats',
+        'view_count': str(number * 7 % 10000000),
+        'duration': 'PT1H2M3S',
+        'channel_id': 'UCbenchmarkchannel0000001',
+        'url': f"https://www.youtube.com/watch?v=bench{number:011d}",
+        'scraped_at': scraped_at
+    }
+
+def make_rows(start, count):
+    base = datetime(2024, 5, 1)
+    return [make_row(number, (base + timedelta(seconds=number)).isoformat()) for number in range(start, start + count)]
+
+def _output_size(location):
+    #Total bytes of a file, or of every file under a dataset directory
+    if os.path.isfile(location):
+        return os.path.getsize(location)
+    total = 0
+    for root, _, files in os.walk(location):
+        total += sum(os.path.getsize(os.path.join(root, name)) for name in files)
+    return total
+
+def run_size(size, output_format='csv'):
+    #Fill an empty output with `size` rows, then measure appends and duplicate skips on it
+    from scrape_posts import save_to_metadata_csv, SAVE_BATCH_SIZE
+    from storage import PostIndex, open_writer
+
+    with isolated_workdir({}):
+        post_index = PostIndex('post_index.db')
+        writer = open_writer(output_format)
+        parameters = {'rows': size, 'format': output_format}
+
+        # Rows are generated per chunk, outside the timed section, so memory reflects the save path
+        with Measurement('save.bulk', chunk_size=BULK_CHUNK_SIZE, **parameters) as bulk:
+            for start in range(0, size, BULK_CHUNK_SIZE):
+                chunk = make_rows(start, min(BULK_CHUNK_SIZE, size - start))
+                with bulk.operation(items=len(chunk)):
+                    save_to_metadata_csv(chunk, post_index=post_index, writer=writer)
+        results = [bulk.result(output_bytes=_output_size(writer.location))]
+
+        with Measurement('save.append', batch_size=SAVE_BATCH_SIZE, **parameters) as append:
+            for batch in range(APPEND_BATCHES):
+                rows = make_rows(size + batch * SAVE_BATCH_SIZE, SAVE_BATCH_SIZE)
+                with append.operation(items=len(rows)):
+                    save_to_metadata_csv(rows, post_index=post_index, writer=writer)
+        results.append(append.result())
+
+        with Measurement('save.skip_indexed', batch_size=SAVE_BATCH_SIZE, **parameters) as skip:
+            for batch in range(APPEND_BATCHES):
+                rows = make_rows(batch * SAVE_BATCH_SIZE, SAVE_BATCH_SIZE)
+                with skip.operation(items=len(rows)):
+                    save_to_metadata_csv(rows, post_index=post_index, writer=writer)
+        results.append(skip.result())
+
+        post_index.close()
+        return results
+
+def run(sizes=DEFAULT_SIZES, output_format='csv'):
+    results = []
+    with quiet():
+        for size in sizes:
+            results.extend(run_size(size, output_format))
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark saving metadata rows')
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(DEFAULT_SIZES), help='Output sizes in rows')
+    parser.add_argument('--format', choices=['csv', 'parquet'], default='csv', help='Output format to benchmark')
+    args = parser.parse_args()
+    print(json.dumps(run(args.sizes, args.format), indent=2))
+
+if __name__ == '__main__':
+    main()
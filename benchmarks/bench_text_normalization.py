@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark for text_normalization against the per-scraper cleaning it replaced
+
+Runs both implementations over synthetic captions (with and without typographic
+characters) and YouTube-length descriptions, checks they produce identical output, and
+prints the time per text for each as JSON.
+
+Usage:
+    python benchmarks/bench_text_normalization.py [--rows 20000] [--repeat 5]
+"""
+import os
+import re
+import sys
+import json
+import random
+import argparse
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from text_normalization import clean_text, extract_hashtags
+
+def legacy_clean_text(text):
+    #The cleaning both scrapers used to carry: one str.replace pass per character, then a split/join
+    if not text:
+        return ""
+    text = text.replace('\u2018', "'")
+    text = text.replace('\u2019', "'")
+    text = text.replace('\u201c', '"')
+    text = text.replace('\u201d', '"')
+    text = text.replace('\u2013', '-')
+    text = text.replace('\u2014', '--')
+    text = text.replace('\u200b', '')
+    text = text.replace('\ufeff', '')
+    return ' '.join(text.split())
+
+def legacy_extract_hashtags(text):
+    #Clean, then findall + sub with uncompiled patterns and a second split/join
+    text = legacy_clean_text(text)
+    hashtags = re.findall(r'#(\w+)', text)
+    text = re.sub(r'#\w+\s*', '', text).strip()
+    return ' '.join(text.split()), hashtags
+
+WORDS = ['video', 'today', 'new', '\u2018quoted\u2019', '\u201cbest\u201d', 'tutorial', '\u2014',
+         'how', 'to', '\u200b', 'python', 'music', '\u2013', 'live', '\ufeffstream']
+
+def make_text(rng, words):
+    tokens = []
+    for _ in range(words):
+        if rng.random() < 0.1:
+            tokens.append('#' + rng.choice(WORDS).strip('\u2018\u2019\u201c\u201d\u2013\u2014\u200b\ufeff') + str(rng.randint(0, 99)))
+        else:
+            tokens.append(rng.choice(WORDS))
+        tokens.append(rng.choice([' ', ' ', '  ', '\n', '\n\n']))
+    return ''.join(tokens)
+
+def run(rows=20000, repeat=5):
+    #Compare the legacy and shared implementations on each corpus; returns one entry per pair
+    rng = random.Random(42)
+    corpora = {
+        'caption': [make_text(rng, 30) for _ in range(rows)],
+        'ascii_caption': [make_text(rng, 30).encode('ascii', 'ignore').decode() for _ in range(rows)],
+        'description': [make_text(rng, 400) for _ in range(rows // 10)]
+    }
+
+    results = []
+    for corpus_name, texts in corpora.items():
+        # Both implementations must agree before their speed is compared
+        for text in texts:
+            assert extract_hashtags(text) == legacy_extract_hashtags(text), text
+            assert clean_text(text) == legacy_clean_text(text), text
+
+        for name, function in (('legacy', legacy_extract_hashtags), ('shared', extract_hashtags)):
+            best = min(timeit.repeat(lambda: [function(text) for text in texts], number=1, repeat=repeat))
+            results.append({
+                'name': 'text_normalization.extract_hashtags',
+                'corpus': corpus_name,
+                'implementation': name,
+                'texts': len(texts),
+                'seconds': round(best, 4),
+                'microseconds_per_text': round(best / len(texts) * 1e6, 2)
+            })
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark text normalization')
+    parser.add_argument('--rows', type=int, default=20000, help='Number of texts per corpus')
+    parser.add_argument('--repeat', type=int, default=5, help='Timing repetitions; the best is reported')
+    args = parser.parse_args()
+    print(json.dumps(run(args.rows, args.repeat), indent=2))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Benchmark thumbnail downloads against a local HTTP server: blocking download_thumbnail calls
+(cold, already stored, and conditional re-validation) and the background ThumbnailDownloader.
+
+Usage:
+    python benchmarks/bench_thumbnails.py [--thumbnails 500] [--image-kb 48]
+"""
+import json
+import argparse
+
+from harness import Measurement, isolated_workdir, http_server, image_handler, quiet
+
+def bench_config():
+    return {'thumbnail_directory': 'thumbnails', 'thumbnail_workers': 8, 'thumbnail_host_limit': 8}
+
+def _urls(base_url, count):
+    return [(f"{base_url}/v/t51/{number}_1080.jpg", f"bench_{number}") for number in range(count)]
+
+def run_download(count, base_url):
+    #Sequential blocking downloads: cold, then already stored, then forced re-validation (304)
+    from scrapers import download_thumbnail
+    from thumbnails import get_thumbnail_store
+
+    urls = _urls(base_url, count)
+    store = get_thumbnail_store('thumbnails')
+    results = []
+    for name in ('thumbnails.download_cold', 'thumbnails.download_stored', 'thumbnails.download_revalidate'):
+        if name == 'thumbnails.download_revalidate':
+            store.revalidate_after = 0
+
+        succeeded = 0
+        with Measurement(name, thumbnails=count) as measurement:
+            for image_url, file_id in urls:
+                with measurement.operation():
+                    succeeded += bool(download_thumbnail(image_url, file_id, 'thumbnails'))
+        results.append(measurement.result(succeeded=succeeded, store=dict(store.stats)))
+
+    store.revalidate_after = None
+    return results
+
+def run_downloader(count, base_url, workers=8):
+    #Queue every thumbnail on the background downloader and time until the queue drains
+    from thumbnails import ThumbnailDownloader
+
+    urls = _urls(base_url, count)
+    with Measurement('thumbnails.downloader', thumbnails=count, workers=workers) as measurement:
+        downloader = ThumbnailDownloader('downloader', max_workers=workers, per_host_limit=workers)
+        for image_url, file_id in urls:
+            downloader.submit(image_url, file_id)
+        downloader.close()
+        measurement.lap(count)
+    return measurement.result(**downloader.stats)
+
+def run(count=500, image_kb=48):
+    with isolated_workdir(bench_config()), http_server(image_handler(image_kb * 1024)) as base_url, quiet():
+        results = run_download(count, base_url)
+        results.append(run_downloader(count, base_url))
+        for result in results:
+            result['parameters']['image_kb'] = image_kb
+        return results
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark thumbnail downloads against a local HTTP server')
+    parser.add_argument('--thumbnails', type=int, default=500, help='Number of thumbnails per benchmark')
+    parser.add_argument('--image-kb', type=int, default=48, help='Size of each served image in KB')
+    args = parser.parse_args()
+    print(json.dumps(run(args.thumbnails, args.image_kb), indent=2))
+
+if __name__ == '__main__':
+    main()
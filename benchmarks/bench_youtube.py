@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Benchmark YouTubeScraper.iter_videos against a fake discovery client that replays the
+recorded search and videos responses in fixtures/, with thumbnails served locally.
+
+Usage:
+    python benchmarks/bench_youtube.py [--rows 2000] [--api-latency-ms 0]
+"""
+import copy
+import json
+import time
+import argparse
+
+from harness import Measurement, load_fixture, isolated_workdir, http_server, image_handler, quiet
+
+# Separates a recorded video ID from the page number, so every replayed page has new IDs
+ID_SEPARATOR = '.'
+
+class _ReplayRequest:
+    def __init__(self, respond, latency):
+        self.respond = respond
+        self.latency = latency
+
+    def execute(self):
+        if self.latency:
+            time.sleep(self.latency)
+        return self.respond()
+
+class ReplayYouTube:
+    """
+    Stand-in for the googleapiclient discovery client.
+    search().list() replays the recorded search page with page-specific video IDs and a
+    nextPageToken, and videos().list() replays the recorded details for those IDs.
+    """
+
+    def __init__(self, thumbnail_base, latency=0.0):
+        self.search_page = load_fixture('youtube_search.json')
+        self.recorded_videos = {item['id']: item for item in load_fixture('youtube_videos.json')['items']}
+        self.thumbnail_base = thumbnail_base
+        self.latency = latency
+        self.calls = {'search.list': 0, 'videos.list': 0}
+
+    def search(self):
+        return _Endpoint(self._search)
+
+    def videos(self):
+        return _Endpoint(self._videos)
+
+    def _search(self, pageToken=None, maxResults=50, **params):
+        self.calls['search.list'] += 1
+        page = int(pageToken or 0)
+
+        def respond():
+            response = copy.deepcopy(self.search_page)
+            response['items'] = response['items'][:maxResults]
+            for item in response['items']:
+                item['id']['videoId'] = f"{item['id']['videoId']}{ID_SEPARATOR}{page}"
+            response['nextPageToken'] = str(page + 1)
+            return response
+        return _ReplayRequest(respond, self.latency)
+
+    def _videos(self, id='', **params):
+        self.calls['videos.list'] += 1
+
+        def respond():
+            items = []
+            for video_id in id.split(','):
+                recorded = self.recorded_videos.get(video_id.rsplit(ID_SEPARATOR, 1)[0])
+                if recorded is None:
+                    continue
+                item = copy.deepcopy(recorded)
+                item['id'] = video_id
+                # Point thumbnails at the local server instead of i.ytimg.com
+                for thumbnail in item['snippet']['thumbnails'].values():
+                    thumbnail['url'] = f"{self.thumbnail_base}/vi/{video_id}/{thumbnail['url'].rsplit('/', 1)[-1]}"
+                items.append(item)
+            return {'kind': 'youtube#videoListResponse', 'items': items}
+        return _ReplayRequest(respond, self.latency)
+
+class _Endpoint:
+    def __init__(self, list_method):
+        self.list = list_method
+
+def bench_config():
+    #Unlimited quota, no response cache and no pacing delay, so only the scraper itself is measured
+    return {
+        'youtube_api_key': 'benchmark-key',
+        'youtube_daily_quota': 10 ** 9,
+        'youtube_cache': {'ttl': {'search.list': 0, 'videos.list': 0}},
+        'pacing': {'youtube': {'base_delay': 0, 'min_delay': 0}},
+        'thumbnail_directory': 'thumbnails'
+    }
+
+def run(rows=2000, api_latency_ms=0):
+    #Scrape `rows` videos through the replay client and measure per-video latency
+    with isolated_workdir(bench_config()), http_server(image_handler()) as base_url:
+        from scrapers import YouTubeScraper
+
+        scraper = YouTubeScraper()
+        client = ReplayYouTube(base_url, api_latency_ms / 1000)
+        scraper.quota.client_factory = lambda api_key: client
+
+        with quiet(), Measurement('youtube.iter_videos', rows=rows, api_latency_ms=api_latency_ms) as measurement:
+            for _ in scraper.iter_videos('benchmark query', rows):
+                measurement.lap()
+
+        # Thumbnails download in the background; report how long the queue takes to drain
+        started = time.perf_counter()
+        scraper.thumbnails.close()
+        drain_seconds = time.perf_counter() - started
+
+        return [measurement.result(
+            api_calls=dict(client.calls),
+            thumbnails_downloaded=scraper.thumbnails.stats['downloaded'],
+            thumbnail_drain_seconds=round(drain_seconds, 4)
+        )]
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the YouTube scraper against replayed API responses')
+    parser.add_argument('--rows', type=int, default=2000, help='Number of videos to scrape')
+    parser.add_argument('--api-latency-ms', type=float, default=0, help='Simulated latency per API call')
+    args = parser.parse_args()
+    print(json.dumps(run(args.rows, args.api_latency_ms), indent=2))
+
+if __name__ == '__main__':
+    main()
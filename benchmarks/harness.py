@@ -0,0 +1,195 @@
+"""
+Shared helpers for the benchmarks: latency/throughput/memory measurement, an isolated
+working directory with its own config.json, and a local HTTP server for fixtures.
+"""
+import os
+import io
+import sys
+import math
+import json
+import time
+import shutil
+import platform
+import tempfile
+import threading
+import tracemalloc
+import contextlib
+from datetime import datetime
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+FIXTURES_DIR = os.path.join(BENCHMARKS_DIR, 'fixtures')
+REPO_DIR = os.path.dirname(BENCHMARKS_DIR)
+
+# Make the scraper modules importable when a benchmark is run as a script
+if REPO_DIR not in sys.path:
+    sys.path.insert(0, REPO_DIR)
+
+def load_fixture(name):
+    #Load a recorded JSON response from the fixtures directory
+    with open(os.path.join(FIXTURES_DIR, name), 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def percentile(sorted_values, q):
+    #Nearest-rank percentile of an already sorted list
+    if not sorted_values:
+        return None
+    rank = math.ceil(q / 100 * len(sorted_values))
+    return sorted_values[min(len(sorted_values), max(1, rank)) - 1]
+
+class Measurement:
+    """
+    Collects per-operation latencies, total time and peak Python memory for one benchmark.
+    Use as a context manager around the benchmark, and call lap() after each operation
+    (or wrap each operation in `with measurement.operation():`).
+    """
+
+    # tracemalloc slows Python code down noticeably; turn it off for timing-only runs
+    track_memory = True
+
+    def __init__(self, name, **parameters):
+        self.name = name
+        self.parameters = parameters
+        self.latencies = []
+        self.items = 0
+        self.started = None
+        self.elapsed = None
+        self.peak_bytes = None
+        self._last = None
+        self._owns_tracemalloc = False
+
+    def __enter__(self):
+        if self.track_memory:
+            self._owns_tracemalloc = not tracemalloc.is_tracing()
+            if self._owns_tracemalloc:
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+        self.started = self._last = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.elapsed = time.perf_counter() - self.started
+        if self.track_memory:
+            self.peak_bytes = tracemalloc.get_traced_memory()[1]
+            if self._owns_tracemalloc:
+                tracemalloc.stop()
+
+    def lap(self, items=1):
+        #Record the time since the previous lap (or the start) as one operation's latency
+        now = time.perf_counter()
+        self.latencies.append(now - self._last)
+        self.items += items
+        self._last = now
+
+    @contextlib.contextmanager
+    def operation(self, items=1):
+        #Time a single operation, excluding whatever ran between operations
+        start = time.perf_counter()
+        yield
+        self.latencies.append(time.perf_counter() - start)
+        self.items += items
+        self._last = time.perf_counter()
+
+    def result(self, **extra):
+        #Machine-readable summary of the measurement
+        latencies = sorted(self.latencies)
+        result = {
+            'name': self.name,
+            'parameters': self.parameters,
+            'items': self.items,
+            'operations': len(latencies),
+            'seconds': round(self.elapsed, 4),
+            'throughput_per_second': round(self.items / self.elapsed, 2) if self.elapsed else None,
+            'latency_ms': {
+                'mean': round(sum(latencies) / len(latencies) * 1000, 3) if latencies else None,
+                'p50': _ms(percentile(latencies, 50)),
+                'p90': _ms(percentile(latencies, 90)),
+                'p99': _ms(percentile(latencies, 99)),
+                'max': _ms(latencies[-1] if latencies else None)
+            },
+            'peak_python_memory_mb': round(self.peak_bytes / (1024 * 1024), 2) if self.peak_bytes is not None else None
+        }
+        result.update(extra)
+        return result
+
+def _ms(seconds):
+    return round(seconds * 1000, 3) if seconds is not None else None
+
+def skipped(name, reason, **parameters):
+    #Result entry for a benchmark that could not run in this environment
+    return {'name': name, 'parameters': parameters, 'skipped': reason}
+
+@contextlib.contextmanager
+def isolated_workdir(config):
+    '''Run inside a temporary directory holding the given config.json
+    Scrapers read config.json and write their databases and logs relative to the working directory'''
+    previous = os.getcwd()
+    workdir = tempfile.mkdtemp(prefix='scraper-bench-')
+    try:
+        with open(os.path.join(workdir, 'config.json'), 'w', encoding='utf-8') as f:
+            json.dump(config, f)
+        os.chdir(workdir)
+        yield workdir
+    finally:
+        os.chdir(previous)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+@contextlib.contextmanager
+def quiet():
+    #Silence the progress prints of the code under test
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+class _QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+@contextlib.contextmanager
+def http_server(handler_class=None, directory=None):
+    '''Serve fixtures on a free local port in a background thread; yields the base URL
+    Serves files from directory with the standard handler unless a handler class is given'''
+    if handler_class is None:
+        def handler_class(*args, **kwargs):
+            return _QuietHandler(*args, directory=directory or FIXTURES_DIR, **kwargs)
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler_class)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, name='bench-http', daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+def image_handler(size=48 * 1024):
+    '''HTTP handler serving a distinct, deterministic JPEG-sized body for every path
+    Supports If-None-Match so conditional re-fetches can be measured'''
+    class ImageHandler(_QuietHandler):
+        def do_GET(self):
+            path = self.path.split('?')[0]
+            etag = f'"{abs(hash(path)):x}"'
+            if self.headers.get('If-None-Match') == etag:
+                self.send_response(304)
+                self.send_header('ETag', etag)
+                self.end_headers()
+                return
+            seed = path.encode('utf-8')
+            body = (seed * (size // max(1, len(seed)) + 1))[:size]
+            self.send_response(200)
+            self.send_header('Content-Type', 'image/jpeg')
+            self.send_header('Content-Length', str(len(body)))
+            self.send_header('ETag', etag)
+            self.end_headers()
+            self.wfile.write(body)
+    return ImageHandler
+
+def environment():
+    #Describe the machine so results from different runs can be compared fairly
+    return {
+        'timestamp': datetime.now().isoformat(),
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count()
+    }
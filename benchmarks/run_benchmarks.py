@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Run the offline benchmark suite and write the results as JSON.
+
+Every benchmark runs against recorded fixtures and local servers in a temporary working
+directory, so no network access, credentials or API quota are needed, and the repository's
+own config.json, metadata.csv, databases and logs are never touched.
+
+Usage:
+    python benchmarks/run_benchmarks.py [--only youtube save] [--output results.json]
+    python benchmarks/run_benchmarks.py --save-sizes 10000 100000 --no-memory
+"""
+import sys
+import json
+import logging
+import argparse
+
+from harness import Measurement, environment
+
+import bench_youtube
+import bench_instagram
+import bench_thumbnails
+import bench_save
+import bench_query
+import bench_text_normalization
+
+BENCHMARKS = ('youtube', 'instagram', 'thumbnails', 'save', 'query', 'text')
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description='Run the offline scraper benchmarks')
+    parser.add_argument('--only', nargs='+', choices=BENCHMARKS, help='Run only these benchmarks')
+    parser.add_argument('--output', help='Write JSON results to this file instead of stdout')
+    parser.add_argument('--youtube-rows', type=int, default=2000, help='Videos scraped from the replayed API')
+    parser.add_argument('--api-latency-ms', type=float, default=0, help='Simulated latency per YouTube API call')
+    parser.add_argument('--instagram-posts', type=int, default=3000, help='Posts parsed from recorded feed payloads')
+    parser.add_argument('--modal-posts', type=int, default=200, help='Post pages extracted in headless Chromium')
+    parser.add_argument('--profile-posts', type=int, default=50,
+                        help='Post pages loaded under each browser profile (full and lean)')
+    parser.add_argument('--thumbnails', type=int, default=500, help='Thumbnails downloaded per benchmark')
+    parser.add_argument('--save-sizes', type=int, nargs='+', default=list(bench_save.DEFAULT_SIZES),
+                        help='Output sizes in rows for the save benchmarks')
+    parser.add_argument('--format', choices=['csv', 'parquet'], default='csv', help='Output format for the save benchmarks')
+    parser.add_argument('--query-rows', type=int, default=100000, help='Rows in the store for the query benchmarks')
+    parser.add_argument('--text-rows', type=int, default=20000, help='Texts per corpus for text normalization')
+    parser.add_argument('--no-memory', action='store_true',
+                        help='Skip peak memory tracking, which slows Python code down')
+    parser.add_argument('--log', action='store_true', help='Keep the scrapers\' INFO logging')
+    return parser.parse_args()
+
+def main():
+    args = parse_arguments()
+    selected = args.only or BENCHMARKS
+
+    if args.no_memory:
+        Measurement.track_memory = False
+    # Per-row INFO logging would dominate the timings
+    if not args.log:
+        logging.disable(logging.INFO)
+
+    runners = {
+        'youtube': lambda: bench_youtube.run(args.youtube_rows, args.api_latency_ms),
+        'instagram': lambda: bench_instagram.run(args.instagram_posts, args.modal_posts, args.profile_posts),
+        'thumbnails': lambda: bench_thumbnails.run(args.thumbnails),
+        'save': lambda: bench_save.run(args.save_sizes, args.format),
+        'query': lambda: bench_query.run(args.query_rows),
+        'text': lambda: bench_text_normalization.run(args.text_rows)
+    }
+
+    results = []
+    for name in BENCHMARKS:
+        if name not in selected:
+            continue
+        print(f"Running {name} benchmarks...", file=sys.stderr)
+        results.extend(runners[name]())
+
+    report = json.dumps({'environment': environment(), 'results': results}, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(report + '\n')
+        print(f"Wrote {len(results)} results to {args.output}", file=sys.stderr)
+    else:
+        print(report)
+
+if __name__ == '__main__':
+    main()
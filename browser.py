@@ -0,0 +1,303 @@
+import os
+import asyncio
+from metrics import get_metrics
+
+# Configure logging
+import logging
+logger = logging.getLogger(__name__)
+
+LAUNCH_ARGS = [
+    '--disable-blink-features=AutomationControlled',
+    '--disable-notifications',
+    '--start-maximized',
+    '--disable-extensions',
+    '--disable-dev-shm-usage',
+    '--no-sandbox',
+    f'--window-size={1920},{1080}',
+    '--enable-unsafe-swiftshader'
+]
+
+# Configure contexts to bypass automation detection
+CONTEXT_OPTIONS = {
+    'viewport': {'width': 1920, 'height': 1080},
+    'user_agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Edge/120.0.0.0',
+    'has_touch': False,
+    'locale': 'en-US',
+    'timezone_id': 'Asia/Kolkata',
+    'screen': {'width': 1920, 'height': 1080},
+    'ignore_https_errors': True
+}
+
+# Lean profile: headless, a smaller window and no software GPU, so many more sessions fit on one host
+LEAN_LAUNCH_ARGS = [
+    '--disable-blink-features=AutomationControlled',
+    '--disable-notifications',
+    '--disable-extensions',
+    '--disable-dev-shm-usage',
+    '--no-sandbox',
+    f'--window-size={1280},{800}',
+    '--disable-gpu',
+    '--mute-audio'
+]
+
+LEAN_CONTEXT_OPTIONS = dict(
+    CONTEXT_OPTIONS,
+    viewport={'width': 1280, 'height': 800},
+    screen={'width': 1280, 'height': 800}
+)
+
+# Only the DOM and the JSON responses are read; video, audio and fonts are never needed.
+# Patterns use the DevTools wildcard syntax, where * matches any run of characters
+BLOCKED_URL_PATTERNS = [
+    '*.mp4*',
+    '*.m4a*',
+    '*.m4v*',
+    '*.webm*',
+    '*.mp3*',
+    '*.woff*',
+    '*.ttf*',
+    '*.otf*'
+]
+
+# Blocked as well when block_images is set
+IMAGE_URL_PATTERNS = [
+    '*.jpg*',
+    '*.jpeg*',
+    '*.png*',
+    '*.webp*',
+    '*.gif*',
+    '*.heic*'
+]
+
+# Analytics and client-side logging requests, blocked in the lean profile
+TRACKING_URL_PATTERNS = [
+    '*/logging_client_events*',
+    '*/ajax/bz*',
+    '*/ajax/logging/*',
+    '*facebook.com/tr*',
+    '*connect.facebook.net*',
+    '*google-analytics.com*',
+    '*googletagmanager.com*',
+    '*doubleclick.net*'
+]
+
+BROWSER_PROFILES = {
+    'full': {'headless': False, 'args': LAUNCH_ARGS, 'context_options': CONTEXT_OPTIONS, 'block': False},
+    'lean': {'headless': True, 'args': LEAN_LAUNCH_ARGS, 'context_options': LEAN_CONTEXT_OPTIONS, 'block': True}
+}
+
+STEALTH_SCRIPT = """
+    Object.defineProperty(navigator, 'webdriver', {
+        get: () => undefined
+    });
+"""
+
+class ResourceBlocker:
+    """
+    Blocks requests the scraper never reads (media, fonts, tracking and, optionally, images)
+    inside Chromium with the DevTools Network.setBlockedURLs command, installed on each tab's
+    CDP session. Unlike a Playwright route, which turns off the HTTP cache, this keeps the
+    JS and CSS bundles cached across navigations. Blocked requests are counted per resource type.
+    """
+
+    def __init__(self, profile, url_patterns=BLOCKED_URL_PATTERNS + TRACKING_URL_PATTERNS):
+        self.profile = profile
+        self.url_patterns = list(url_patterns)
+        self.metrics = get_metrics()
+
+    async def install(self, session):
+        #Block the patterns in one tab; Network must already be enabled on the session
+        try:
+            await session.send('Network.setBlockedURLs', {'urls': self.url_patterns})
+        except Exception as e:
+            logger.debug(f"Request blocking unavailable: {str(e)}")
+            return
+        session.on('Network.loadingFailed', self._on_loading_failed)
+
+    def _on_loading_failed(self, event):
+        #Chromium reports requests refused by setBlockedURLs with the 'inspector' reason
+        if event.get('blockedReason') == 'inspector':
+            self.metrics.increment('browser_requests_blocked_total', profile=self.profile,
+                                   resource_type=str(event.get('type', 'Other')).lower())
+
+class ResourceMeter:
+    """
+    Bytes received and renderer CPU time of the pages a pool opens, read over the Chrome
+    DevTools Protocol. The totals go to the shared metrics registry as browser_bytes_total
+    and browser_cpu_seconds_total, labelled with the profile, so dividing by posts_total
+    gives the network and CPU cost per post of each profile.
+    """
+
+    def __init__(self, profile):
+        self.profile = profile
+        self.metrics = get_metrics()
+        self._sessions = {}
+
+    async def attach(self, context, page):
+        '''Start counting a page's network bytes; failures only disable metering for that page
+        Returns the page's CDP session, or None if it could not be opened'''
+        try:
+            session = await context.new_cdp_session(page)
+            await session.send('Network.enable')
+            await session.send('Performance.enable')
+        except Exception as e:
+            logger.debug(f"Resource metering unavailable: {str(e)}")
+            return None
+        session.on('Network.loadingFinished', self._on_loading_finished)
+        self._sessions[page] = session
+        return session
+
+    def _on_loading_finished(self, event):
+        self.metrics.increment('browser_bytes_total', event.get('encodedDataLength', 0), profile=self.profile)
+
+    async def collect(self, page):
+        #Record the page's renderer CPU time; call before the page or its context is closed
+        session = self._sessions.pop(page, None)
+        if session is None:
+            return
+        try:
+            response = await session.send('Performance.getMetrics')
+            cpu = {metric['name']: metric['value'] for metric in response['metrics']}.get('TaskDuration', 0)
+            self.metrics.increment('browser_cpu_seconds_total', cpu, profile=self.profile)
+            await session.detach()
+        except Exception as e:
+            logger.debug(f"Could not read page metrics: {str(e)}")
+
+    def pages(self, context):
+        #Metered pages that belong to a context
+        return [page for page in self._sessions if page.context == context]
+
+class BrowserPool:
+    """
+    Chromium instances shared by every Instagram scrape in the process.
+    Browsers are launched once and handed out round-robin; each scrape gets its own
+    context, pre-loaded with the saved login session when one exists.
+    The 'lean' profile runs headless in a smaller window without GPU emulation and
+    blocks media, fonts and tracking; 'full' renders everything, as a person would see it.
+    """
+
+    def __init__(self, headless=None, max_browsers=1, storage_state_path='instagram_state.json',
+                 profile='full', block_images=False):
+        if profile not in BROWSER_PROFILES:
+            raise ValueError(f"Unknown browser profile '{profile}', expected one of {', '.join(BROWSER_PROFILES)}")
+        self.profile = profile
+        self.settings = BROWSER_PROFILES[profile]
+        self.headless = self.settings['headless'] if headless is None else headless
+        self.max_browsers = max(1, max_browsers)
+        self.storage_state_path = storage_state_path
+
+        self.blocker = None
+        if self.settings['block']:
+            image_patterns = IMAGE_URL_PATTERNS if block_images else []
+            self.blocker = ResourceBlocker(profile, BLOCKED_URL_PATTERNS + image_patterns + TRACKING_URL_PATTERNS)
+        self.meter = ResourceMeter(profile)
+
+        self._playwright = None
+        self._browsers = []
+        self._next_browser = 0
+        self._lock = asyncio.Lock()
+
+    async def _get_browser(self):
+        #Launch browsers lazily up to max_browsers, then reuse them round-robin
+        async with self._lock:
+            if self._playwright is None:
+                # Imported on first launch so YouTube-only runs never load Playwright
+                from playwright.async_api import async_playwright
+                self._playwright = await async_playwright().start()
+
+            if len(self._browsers) < self.max_browsers:
+                logger.info(f"Launching Chromium {len(self._browsers) + 1}/{self.max_browsers} "
+                            f"(profile={self.profile}, headless={self.headless})")
+                browser = await self._playwright.chromium.launch(headless=self.headless, args=self.settings['args'])
+                self._browsers.append(browser)
+                return browser
+
+            browser = self._browsers[self._next_browser % len(self._browsers)]
+            self._next_browser += 1
+            return browser
+
+    def has_saved_session(self):
+        #Check whether a login session was saved by an earlier run
+        return os.path.exists(self.storage_state_path)
+
+    async def new_context(self):
+        #Create a new browser context, restoring the saved login session if available
+        browser = await self._get_browser()
+
+        options = dict(self.settings['context_options'])
+        if self.has_saved_session():
+            options['storage_state'] = self.storage_state_path
+
+        context = await browser.new_context(**options)
+        await context.add_init_script(STEALTH_SCRIPT)
+        return context
+
+    async def new_page(self, context):
+        #Open a tab in a context with its bytes and CPU time metered and, in the lean profile, unneeded requests blocked
+        page = await context.new_page()
+        session = await self.meter.attach(context, page)
+        if self.blocker and session is not None:
+            await self.blocker.install(session)
+        return page
+
+    async def close_page(self, page):
+        #Record a tab's CPU time, then close it
+        await self.meter.collect(page)
+        await page.close()
+
+    async def close_context(self, context):
+        #Record the CPU time of every tab of a context, then close it
+        for page in self.meter.pages(context):
+            await self.meter.collect(page)
+        await context.close()
+
+    async def save_session(self, context):
+        #Persist cookies and local storage of a logged-in context for later runs
+        temp_path = f"{self.storage_state_path}.tmp"
+        await context.storage_state(path=temp_path)
+        os.replace(temp_path, self.storage_state_path)
+        logger.info(f"Saved Instagram session to {self.storage_state_path}")
+
+    def discard_session(self):
+        #Remove a saved session that is no longer valid
+        if self.has_saved_session():
+            os.remove(self.storage_state_path)
+            logger.info(f"Discarded expired Instagram session {self.storage_state_path}")
+
+    async def close(self):
+        #Close every browser and stop Playwright
+        for browser in self._browsers:
+            try:
+                await browser.close()
+            except Exception as e:
+                logger.debug(f"Error closing browser: {str(e)}")
+        self._browsers = []
+
+        if self._playwright is not None:
+            await self._playwright.stop()
+            self._playwright = None
+        logger.info("Browser pool closed")
+
+# Process-wide pool shared by all InstagramScraper instances
+_browser_pool = None
+
+def get_browser_pool(instagram_config=None):
+    #Return the shared browser pool, creating it from the instagram section of config.json on first use
+    global _browser_pool
+    if _browser_pool is None:
+        instagram_config = instagram_config or {}
+        _browser_pool = BrowserPool(
+            headless=instagram_config.get('headless'),
+            max_browsers=instagram_config.get('browser_pool_size', 1),
+            storage_state_path=instagram_config.get('storage_state_file', 'instagram_state.json'),
+            profile=instagram_config.get('browser_profile', 'full'),
+            block_images=instagram_config.get('block_images', False)
+        )
+    return _browser_pool
+
+async def close_browser_pool():
+    #Close the shared browser pool if it was started
+    global _browser_pool
+    if _browser_pool is not None:
+        await _browser_pool.close()
+        _browser_pool = None
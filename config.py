@@ -0,0 +1,21 @@
+import os
+import json
+
+# Configure logging
+import logging
+logger = logging.getLogger(__name__)
+
+def load_config(config_file='config.json'):
+    #Load configuration from JSON file
+    try:
+        if os.path.exists(config_file):
+            with open(config_file, 'r') as f:
+                config = json.load(f)
+            logger.info(f"Loaded configuration from {config_file}")
+            return config
+        else:
+            logger.warning(f"Config file {config_file} not found, using default settings")
+            return {}
+    except Exception as e:
+        logger.error(f"Error loading configuration: {str(e)}")
+        return {}
@@ -0,0 +1,181 @@
+from datetime import datetime, timezone
+from urllib.parse import urlsplit, parse_qs, unquote
+from text_normalization import clean_text, extract_hashtags
+
+# Configure logging
+import logging
+logger = logging.getLogger(__name__)
+
+# Tag-section endpoints that carry the hashtag grid; the tag is read from the tag_name
+# parameter or, for the paginated sections, from the path /api/v1/tags/<tag>/sections/
+TAG_INFO_PATHS = (
+    '/api/v1/tags/web_info/',
+    '/api/v1/tags/logged_out_web_info/'
+)
+TAG_SECTIONS_PATH = '/api/v1/tags/{tag}/sections/'
+
+def _is_media(node):
+    #Media objects carry a shortcode plus an image field, in both the v1 API and the older GraphQL shape
+    return (
+        isinstance(node, dict)
+        and isinstance(node.get('code') or node.get('shortcode'), str)
+        and any(key in node for key in ('image_versions2', 'carousel_media', 'display_url', 'thumbnail_src'))
+    )
+
+def find_media(payload):
+    #Walk a JSON payload and yield every media object, whatever endpoint it came from
+    stack = [payload]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, dict):
+            if _is_media(node):
+                yield node
+                continue
+            stack.extend(reversed(list(node.values())))
+        elif isinstance(node, list):
+            stack.extend(reversed(node))
+
+def _best_image_url(media):
+    #Pick the largest image candidate, falling back to the first carousel item
+    candidates = (media.get('image_versions2') or {}).get('candidates') or []
+    if candidates:
+        best = max(candidates, key=lambda c: (c.get('width') or 0) * (c.get('height') or 0))
+        return best.get('url', '')
+    carousel = media.get('carousel_media') or []
+    if carousel:
+        return _best_image_url(carousel[0])
+    return media.get('display_url') or media.get('thumbnail_src') or ''
+
+def _caption_text(media):
+    caption = media.get('caption')
+    if isinstance(caption, dict):
+        return caption.get('text') or ''
+    # Older GraphQL shape
+    edges = (media.get('edge_media_to_caption') or {}).get('edges') or []
+    if edges:
+        return (edges[0].get('node') or {}).get('text') or ''
+    return ''
+
+def _count(media, *keys):
+    #Return the first available count as a string, or '' if the count is hidden
+    for key in keys:
+        value = media.get(key)
+        if isinstance(value, dict):
+            value = value.get('count')
+        if isinstance(value, int):
+            return str(value)
+    return ''
+
+def media_to_post_data(media):
+    """
+    Convert an Instagram media object into the same row dictionary the modal path produces
+
+    Args:
+        media: Media dict from a grid/feed JSON response
+
+    Returns:
+        Post data dictionary
+    """
+    post_id = media.get('code') or media.get('shortcode')
+
+    owner = media.get('user') or media.get('owner') or {}
+    author = clean_text(owner.get('username', ''))
+
+    # Clean the caption and extract its hashtags in one pass
+    post_text, hashtags = extract_hashtags(_caption_text(media))
+
+    taken_at = media.get('taken_at') or media.get('taken_at_timestamp')
+    if taken_at:
+        timestamp = datetime.fromtimestamp(taken_at, tz=timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.000Z')
+    else:
+        timestamp = datetime.now().isoformat()
+
+    return {
+        'post_id': post_id,
+        'platform': 'instagram',
+        'post_text': post_text,
+        'hashtags': ','.join(hashtags),
+        'timestamp': timestamp,
+        'image_url': _best_image_url(media),
+        'likes': _count(media, 'like_count', 'edge_liked_by', 'edge_media_preview_like'),
+        'comments': _count(media, 'comment_count', 'edge_media_to_comment'),
+        'author': author,
+        'scraped_at': datetime.now().isoformat()
+    }
+
+class InstagramFeedCollector:
+    """
+    Collects post rows from the JSON responses the hashtag page already loads.
+    Attach on_response to page.on('response'); nothing is collected until start(tag) is
+    called, and then only tag-section responses for that tag, loaded while the page is on
+    /explore/tags/<tag>/, are read. Rows are buffered in arrival order until the scraper
+    takes them with drain().
+    """
+
+    def __init__(self):
+        self._pending = {}
+        self.tag = None
+        self.responses_seen = 0
+
+    def start(self, tag):
+        #Collect the grid of this hashtag from now on, dropping anything buffered before
+        self.tag = tag.lstrip('#').lower()
+        self._pending.clear()
+
+    def stop(self):
+        #Stop collecting and drop buffered rows, e.g. when the hashtag page could not be reached
+        self.tag = None
+        self._pending.clear()
+
+    def matches(self, url):
+        #Only the tag-section endpoints of the hashtag being scraped; the home timeline and
+        #other GraphQL or feed queries never match
+        if self.tag is None:
+            return False
+        parts = urlsplit(url)
+        if parts.path in TAG_INFO_PATHS:
+            return parse_qs(parts.query).get('tag_name', [''])[0].lower() == self.tag
+        return unquote(parts.path).lower() == TAG_SECTIONS_PATH.format(tag=self.tag)
+
+    def on_tag_page(self, page_url):
+        #Whether the page that made a request is showing the hashtag being scraped
+        return self.tag is not None and f"/explore/tags/{self.tag}/" in unquote(page_url).lower()
+
+    def add_payload(self, payload):
+        #Parse one JSON payload and buffer any media it contains; returns the number of new rows
+        added = 0
+        for media in find_media(payload):
+            try:
+                post_data = media_to_post_data(media)
+            except Exception as e:
+                logger.debug(f"Could not parse media object: {str(e)}")
+                continue
+            if post_data['post_id'] and post_data['image_url'] and post_data['post_id'] not in self._pending:
+                self._pending[post_data['post_id']] = post_data
+                added += 1
+        return added
+
+    async def on_response(self, response):
+        #Playwright response handler: parse matching JSON responses
+        try:
+            if response.status != 200 or not self.matches(response.url):
+                return
+            if response.request.resource_type not in ('xhr', 'fetch'):
+                return
+            if not self.on_tag_page(response.frame.url):
+                return
+            payload = await response.json()
+        except Exception as e:
+            logger.debug(f"Skipping unreadable response: {str(e)}")
+            return
+
+        self.responses_seen += 1
+        added = self.add_payload(payload)
+        if added:
+            logger.info(f"Captured {added} posts from {response.url.split('?')[0]}")
+
+    def drain(self):
+        #Return and clear the buffered rows in arrival order
+        rows = list(self._pending.values())
+        self._pending.clear()
+        return rows
@@ -0,0 +1,230 @@
+import json
+import time
+import bisect
+import threading
+
+# Configure logging
+import logging
+logger = logging.getLogger(__name__)
+
+# Upper bounds in seconds of the latency histogram buckets, from a cached lookup to a slow login
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+METRIC_PREFIX = 'scraper_'
+STAGE_METRIC = 'stage_duration_seconds'
+
+def _label_key(labels):
+    #Labels as a sorted tuple, so the same labels in any order name the same series
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+def _format_labels(label_key, extra=()):
+    pairs = list(label_key) + list(extra)
+    if not pairs:
+        return ''
+    escaped = []
+    for name, value in pairs:
+        value = value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        escaped.append(f'{name}="{value}"')
+    return '{' + ','.join(escaped) + '}'
+
+class Histogram:
+    """
+    Cumulative latency histogram with fixed buckets, as in the Prometheus exposition format.
+    Percentiles in the JSON summary are interpolated within buckets, so they are estimates.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # The last bucket is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q):
+        #Estimate a quantile by linear interpolation inside the bucket that contains it
+        if not self.count:
+            return None
+        target = q * self.count
+        cumulative = 0
+        for index, bucket_count in enumerate(self.counts):
+            if bucket_count and cumulative + bucket_count >= target:
+                lower = self.buckets[index - 1] if index > 0 else 0.0
+                upper = min(self.buckets[index] if index < len(self.buckets) else self.max, self.max)
+                return lower + (max(upper, lower) - lower) * (target - cumulative) / bucket_count
+            cumulative += bucket_count
+        return self.max
+
+class StageTimer:
+    """
+    Context manager that records how long a stage took when it exits.
+    The outcome label defaults to 'ok', becomes 'error' when an exception escapes, and can be
+    set by the caller (e.g. 'cached', 'failed') before the block ends.
+    """
+
+    def __init__(self, registry, stage, labels):
+        self.registry = registry
+        self.stage = stage
+        self.labels = labels
+        self.outcome = 'ok'
+        self.started = None
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is not None and self.outcome == 'ok':
+            self.outcome = 'error'
+        self.registry.observe(self.stage, time.perf_counter() - self.started, outcome=self.outcome, **self.labels)
+        return False
+
+class MetricsRegistry:
+    """
+    Counters and per-stage latency histograms for one scraping process.
+    Stages (login, search, post_extract, api_call, thumbnail_fetch, save) are timed with
+    time(); the totals can be written as a JSON summary at the end of a run or served in
+    the Prometheus text format while it is in progress.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.started_at = time.time()
+        self._histograms = {}
+        self._counters = {}
+        self._lock = threading.Lock()
+        self._server = None
+
+    def time(self, stage, **labels):
+        #Time a block of code as one occurrence of a stage
+        return StageTimer(self, stage, labels)
+
+    def observe(self, stage, seconds, **labels):
+        #Record one occurrence of a stage that took the given number of seconds
+        key = (stage, _label_key(labels))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(self.buckets)
+            histogram.observe(seconds)
+
+    def increment(self, name, amount=1, **labels):
+        #Add to a counter such as posts_total or cache_requests_total
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def summary(self):
+        #JSON-serializable totals: one entry per stage and label combination, and every counter
+        with self._lock:
+            stages = []
+            for (stage, label_key), histogram in sorted(self._histograms.items()):
+                stages.append({
+                    'stage': stage,
+                    'labels': dict(label_key),
+                    'count': histogram.count,
+                    'seconds_total': round(histogram.sum, 4),
+                    'mean_ms': round(histogram.sum / histogram.count * 1000, 2),
+                    'p50_ms': round(histogram.quantile(0.5) * 1000, 2),
+                    'p90_ms': round(histogram.quantile(0.9) * 1000, 2),
+                    'p99_ms': round(histogram.quantile(0.99) * 1000, 2),
+                    'max_ms': round(histogram.max * 1000, 2)
+                })
+            counters = [
+                {'name': name, 'labels': dict(label_key), 'value': value}
+                for (name, label_key), value in sorted(self._counters.items())
+            ]
+        return {
+            'started_at': self.started_at,
+            'elapsed_seconds': round(time.time() - self.started_at, 3),
+            'stages': stages,
+            'counters': counters
+        }
+
+    def prometheus_text(self):
+        #Current metrics in the Prometheus text exposition format
+        lines = []
+        with self._lock:
+            name = METRIC_PREFIX + STAGE_METRIC
+            lines.append(f"# HELP {name} Time spent in each scraping stage")
+            lines.append(f"# TYPE {name} histogram")
+            for (stage, label_key), histogram in sorted(self._histograms.items()):
+                series = (('stage', stage),) + label_key
+                cumulative = 0
+                for bound, bucket_count in zip(list(self.buckets) + ['+Inf'], histogram.counts):
+                    cumulative += bucket_count
+                    lines.append(f"{name}_bucket{_format_labels(series, [('le', str(bound))])} {cumulative}")
+                lines.append(f"{name}_sum{_format_labels(series)} {histogram.sum}")
+                lines.append(f"{name}_count{_format_labels(series)} {histogram.count}")
+
+            typed = set()
+            for (counter, label_key), value in sorted(self._counters.items()):
+                name = METRIC_PREFIX + counter
+                if name not in typed:
+                    lines.append(f"# TYPE {name} counter")
+                    typed.add(name)
+                lines.append(f"{name}{_format_labels(label_key)} {value}")
+        return '\n'.join(lines) + '\n'
+
+    def write_summary(self, path):
+        #Write the JSON summary to a file
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.summary(), f, indent=2)
+        logger.info(f"Wrote metrics summary to {path}")
+
+    def serve(self, port, host='127.0.0.1'):
+        '''Serve /metrics (Prometheus text) and /metrics.json in a background thread
+        Returns the port actually bound, which differs from the argument when it is 0'''
+        from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+        registry = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                path = self.path.split('?')[0]
+                if path == '/metrics':
+                    body = registry.prometheus_text().encode('utf-8')
+                    content_type = 'text/plain; version=0.0.4; charset=utf-8'
+                elif path == '/metrics.json':
+                    body = json.dumps(registry.summary()).encode('utf-8')
+                    content_type = 'application/json'
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), MetricsHandler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name='metrics-http', daemon=True).start()
+        bound_port = self._server.server_address[1]
+        logger.info(f"Serving metrics on http://{host}:{bound_port}/metrics")
+        return bound_port
+
+    def stop(self):
+        #Stop the metrics endpoint if it was started
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+# One registry per process, shared by every scraper, downloader and writer
+_registry = None
+_registry_lock = threading.Lock()
+
+def get_metrics():
+    #Return the process-wide metrics registry, creating it on first use
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = MetricsRegistry()
+        return _registry
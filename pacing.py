@@ -0,0 +1,92 @@
+import time
+import asyncio
+import threading
+
+# Configure logging
+import logging
+logger = logging.getLogger(__name__)
+
+# HTTP statuses treated as rate-limit signals
+RATE_LIMIT_STATUSES = (403, 429)
+
+class PacingController:
+    """
+    Adaptive delay between requests, shared by everything scraping one platform.
+    The delay shrinks while responses are healthy and grows multiplicatively on rate-limit
+    signals (HTTP 429/403) or missing selectors, so scrapers only slow down when the
+    platform pushes back. An optional max_rate also caps how many requests per second
+    may start across everything sharing the controller, however many tabs run at once.
+    """
+
+    def __init__(self, name, base_delay=0.5, min_delay=0.05, max_delay=60.0, speedup=0.8, backoff=2.0,
+                 max_rate=None):
+        self.name = name
+        self.base_delay = base_delay
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.speedup = speedup
+        self.backoff = backoff
+
+        self.max_rate = max_rate
+
+        self.delay = base_delay
+        self.stats = {'successes': 0, 'rate_limits': 0, 'missing_selectors': 0}
+        self._lock = threading.Lock()
+        self._next_slot = 0.0
+
+    def record_success(self):
+        #Healthy response: speed up towards the minimum delay
+        with self._lock:
+            self.stats['successes'] += 1
+            self.delay = max(self.min_delay, self.delay * self.speedup)
+
+    def record_rate_limit(self):
+        #Rate-limit signal: back off sharply
+        with self._lock:
+            self.stats['rate_limits'] += 1
+            self.delay = min(self.max_delay, max(self.delay, self.base_delay) * self.backoff)
+            delay = self.delay
+        logger.warning(f"{self.name} rate limit detected, backing off to {delay:.2f}s")
+
+    def record_missing_selector(self):
+        #Expected element did not appear: the page may be throttled, back off gently
+        with self._lock:
+            self.stats['missing_selectors'] += 1
+            self.delay = min(self.max_delay, max(self.delay, self.base_delay) * (1 + self.backoff) / 2)
+
+    def observe_status(self, status):
+        #Feed an HTTP status code into the controller
+        if status in RATE_LIMIT_STATUSES:
+            self.record_rate_limit()
+        elif 200 <= status < 400:
+            self.record_success()
+
+    async def wait(self):
+        #Sleep for the current delay without blocking the event loop
+        await asyncio.sleep(self.delay)
+
+    def wait_sync(self):
+        #Sleep for the current delay in synchronous code
+        time.sleep(self.delay)
+
+    async def throttle(self):
+        #Wait for the next request slot so starts are spaced at most max_rate per second
+        if not self.max_rate:
+            return
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_slot)
+            self._next_slot = start + 1 / self.max_rate
+        if start > now:
+            await asyncio.sleep(start - now)
+
+# One controller per platform, shared across scrapers in the process
+_pacers = {}
+_pacers_lock = threading.Lock()
+
+def get_pacer(platform, pacing_config=None):
+    #Return the shared pacing controller for a platform, creating it from config on first use
+    with _pacers_lock:
+        if platform not in _pacers:
+            _pacers[platform] = PacingController(platform, **(pacing_config or {}))
+        return _pacers[platform]
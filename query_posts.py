@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+import os
+import sys
+import csv
+import json
+import argparse
+from config import load_config
+from storage import MetadataStore, METADATA_COLUMNS, OUTPUT_FORMATS, open_writer
+
+# Columns shown by the default table output
+TABLE_COLUMNS = ['platform', 'timestamp', 'author', 'likes', 'view_count', 'post_id']
+TEXT_WIDTH = 60
+
+def rebuild_store(path, output_format='csv'):
+    #Recreate the query store from scratch from the rows in the output
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    store = MetadataStore(path)
+    try:
+        count = store.backfill(open_writer(output_format).iter_rows())
+    finally:
+        store.close()
+    print(f"Indexed {count} posts into {path}")
+
+def print_table(rows):
+    #Print one line per post with the start of its text
+    for row in rows:
+        text = (row.get('post_text') or '').split('\n')[0]
+        if len(text) > TEXT_WIDTH:
+            text = text[:TEXT_WIDTH - 3] + '...'
+        values = ['' if row.get(name) is None else str(row.get(name)) for name in TABLE_COLUMNS]
+        print(' | '.join(values + [text]))
+    print(f"{len(rows)} posts")
+
+def write_rows(rows, output):
+    #Write rows to stdout as a table, CSV or JSON lines
+    if output == 'json':
+        for row in rows:
+            print(json.dumps(row, ensure_ascii=False))
+    elif output == 'csv':
+        header = METADATA_COLUMNS + [key for key in (rows[0] if rows else {}) if key not in METADATA_COLUMNS]
+        writer = csv.DictWriter(sys.stdout, fieldnames=header, restval='', extrasaction='ignore')
+        writer.writeheader()
+        writer.writerows(rows)
+    else:
+        print_table(rows)
+
+def main():
+    parser = argparse.ArgumentParser(description='Query scraped posts from the local metadata store')
+    parser.add_argument('--text', help='Words that must all appear in the post text (full-text search)')
+    parser.add_argument('--hashtag', help='Hashtag to match, with or without #')
+    parser.add_argument('--author', help='Instagram author or YouTube channel name')
+    parser.add_argument('--channel-id', help='YouTube channel ID')
+    parser.add_argument('--platform', choices=['instagram', 'youtube'], help='Only posts from this platform')
+    parser.add_argument('--since', help='Posts published at or after this ISO date or datetime')
+    parser.add_argument('--until', help='Posts published before this ISO date or datetime')
+    parser.add_argument('--order', choices=list(MetadataStore.ORDERS), default='newest',
+                        help='Sort order (relevance needs --text)')
+    parser.add_argument('--limit', type=int, default=20, help='Maximum number of posts to return')
+    parser.add_argument('--output', choices=['table', 'csv', 'json'], default='table',
+                        help='Output format: a short table, CSV or JSON lines')
+    parser.add_argument('--top-hashtags', type=int, metavar='N',
+                        help='List the N most used hashtags in the time range instead of posts')
+    parser.add_argument('--rebuild', action='store_true',
+                        help='Recreate the store from the saved output, e.g. after editing metadata.csv')
+    parser.add_argument('--format', choices=list(OUTPUT_FORMATS), default='csv',
+                        help='Output to rebuild the store from')
+    parser.add_argument('--db', help='Store file (default: metadata_store.file in config.json, or metadata.db)')
+
+    args = parser.parse_args()
+    path = args.db or load_config().get('metadata_store', {}).get('file', 'metadata.db')
+
+    if args.rebuild:
+        rebuild_store(path, args.format)
+        return
+
+    if not os.path.exists(path):
+        parser.error(f"{path} does not exist yet; scrape some posts or run with --rebuild")
+
+    store = MetadataStore(path)
+    try:
+        try:
+            if args.top_hashtags:
+                for hashtag, count in store.top_hashtags(args.platform, args.since, args.until, args.top_hashtags):
+                    print(f"#{hashtag}: {count}")
+                return
+
+            rows = store.query(
+                text=args.text,
+                hashtag=args.hashtag,
+                author=args.author,
+                channel_id=args.channel_id,
+                platform=args.platform,
+                since=args.since,
+                until=args.until,
+                order=args.order,
+                limit=args.limit
+            )
+        except ValueError as e:
+            parser.error(str(e))
+        write_rows(rows, args.output)
+    finally:
+        store.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,285 @@
+import os
+import json
+import math
+import sqlite3
+import hashlib
+import threading
+from datetime import datetime, timedelta, timezone
+from metrics import get_metrics
+
+# Configure logging
+import logging
+logger = logging.getLogger(__name__)
+
+# Quota units charged per call by the YouTube Data API v3
+QUOTA_COSTS = {
+    'search.list': 100,
+    'videos.list': 1
+}
+DEFAULT_DAILY_QUOTA = 10000
+
+# Local copy of the YouTube Data API discovery document, so building a client needs no network request
+DISCOVERY_FILE = 'youtube_discovery.json'
+
+# Error reasons meaning a key has used up its daily quota
+EXHAUSTED_REASONS = ('quotaExceeded', 'dailyLimitExceeded')
+
+# YouTube quotas reset at midnight Pacific time
+try:
+    from zoneinfo import ZoneInfo
+    QUOTA_TIMEZONE = ZoneInfo('America/Los_Angeles')
+except Exception:
+    QUOTA_TIMEZONE = timezone(timedelta(hours=-8))
+
+class QuotaExhaustedError(Exception):
+    #Raised when no API key has enough quota left for a call
+    pass
+
+def quota_day():
+    #Current quota day as YYYY-MM-DD in Pacific time
+    return datetime.now(QUOTA_TIMEZONE).strftime('%Y-%m-%d')
+
+def projected_cost(limit, results_per_page=50):
+    #Quota units needed to scrape `limit` videos: one search page plus one batched detail call per 50 videos
+    pages = max(1, math.ceil(limit / results_per_page))
+    return pages * (QUOTA_COSTS['search.list'] + QUOTA_COSTS['videos.list'])
+
+def error_reason(http_error):
+    #Extract the first error reason from a googleapiclient HttpError
+    try:
+        content = json.loads(http_error.content.decode('utf-8'))
+        errors = content.get('error', {}).get('errors', [])
+        if errors:
+            return errors[0].get('reason', '')
+        return content.get('error', {}).get('status', '')
+    except Exception:
+        return ''
+
+def load_discovery_document(path=DISCOVERY_FILE):
+    '''Return the parsed YouTube Data API v3 discovery document, read from a local file
+    On first use it is taken from the copy bundled with google-api-python-client (or fetched once
+    by releases without one) and saved, so later starts never go to the network'''
+    if path and os.path.exists(path):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except ValueError as e:
+            logger.warning(f"Ignoring unreadable discovery document {path}: {str(e)}")
+
+    document = None
+    try:
+        from googleapiclient.discovery_cache import get_static_doc
+        document = get_static_doc('youtube', 'v3')
+    except ImportError:
+        pass
+
+    if document is None:
+        import urllib.request
+        from googleapiclient.discovery import DISCOVERY_URI
+        url = DISCOVERY_URI.format(api='youtube', apiVersion='v3')
+        logger.info(f"Fetching the YouTube discovery document from {url}")
+        with urllib.request.urlopen(url, timeout=30) as response:
+            document = response.read().decode('utf-8')
+
+    if path:
+        try:
+            temp_path = f"{path}.tmp"
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                f.write(document)
+            os.replace(temp_path, path)
+        except OSError as e:
+            logger.warning(f"Could not save discovery document to {path}: {str(e)}")
+    return json.loads(document)
+
+def _key_id(api_key):
+    #Store a fingerprint instead of the raw API key
+    return hashlib.sha256(api_key.encode('utf-8')).hexdigest()[:12]
+
+class QuotaLedger:
+    """
+    Per-key daily quota usage stored in SQLite.
+    Charges are reserved atomically, so scrapers in different threads or processes
+    never overspend a key between them.
+    """
+
+    def __init__(self, path='quota.db'):
+        self.conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS usage (
+                key_id TEXT NOT NULL,
+                day TEXT NOT NULL,
+                units INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (key_id, day)
+            )
+            """
+        )
+        self.conn.commit()
+        self._lock = threading.Lock()
+
+    def used(self, key_id, day):
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT units FROM usage WHERE key_id = ? AND day = ?", (key_id, day)
+            ).fetchone()
+        return row[0] if row else 0
+
+    def try_charge(self, key_id, day, units, budget):
+        #Reserve units against a key's budget; returns False if that would exceed it
+        with self._lock, self.conn:
+            self.conn.execute(
+                "INSERT OR IGNORE INTO usage (key_id, day, units) VALUES (?, ?, 0)", (key_id, day)
+            )
+            cursor = self.conn.execute(
+                "UPDATE usage SET units = units + ? WHERE key_id = ? AND day = ? AND units + ? <= ?",
+                (units, key_id, day, units, budget)
+            )
+            return cursor.rowcount == 1
+
+    def mark_exhausted(self, key_id, day, budget):
+        #Record that the API reported this key as out of quota
+        with self._lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO usage (key_id, day, units) VALUES (?, ?, ?)", (key_id, day, budget)
+            )
+
+    def close(self):
+        self.conn.close()
+
+class QuotaScheduler:
+    """
+    Routes YouTube API calls through a pool of API keys with a daily budget each.
+    Every call is charged at its documented cost before it is sent; when a key runs out
+    (by our accounting or the API's) the scheduler rotates to the next key, and raises
+    QuotaExhaustedError once none can afford the call so the work can be deferred.
+    Calls may be made from several threads at once; each thread sends its requests
+    through its own HTTP connection, since httplib2 connections are not thread-safe.
+    """
+
+    def __init__(self, api_keys, daily_budget=DEFAULT_DAILY_QUOTA, ledger_path='quota.db', client_factory=None,
+                 discovery_file=DISCOVERY_FILE):
+        if not api_keys:
+            raise ValueError("At least one YouTube API key is required")
+
+        self.api_keys = list(dict.fromkeys(api_keys))
+        self.daily_budget = daily_budget
+        self.ledger = QuotaLedger(ledger_path)
+        self.client_factory = client_factory or self._build_client
+        self.discovery_file = discovery_file
+        self._discovery_document = None
+        self._clients = {}
+        self._current = 0
+        self._lock = threading.Lock()
+        self._http = threading.local()
+        self.calls = {endpoint: 0 for endpoint in QUOTA_COSTS}
+        self.metrics = get_metrics()
+
+    @classmethod
+    def from_config(cls, config, client_factory=None):
+        #Create a scheduler from youtube_api_keys (or the single youtube_api_key) in config.json
+        api_keys = list(config.get('youtube_api_keys') or [])
+        if config.get('youtube_api_key'):
+            api_keys.insert(0, config['youtube_api_key'])
+        return cls(
+            api_keys,
+            daily_budget=config.get('youtube_daily_quota', DEFAULT_DAILY_QUOTA),
+            ledger_path=config.get('quota_file', 'quota.db'),
+            client_factory=client_factory,
+            discovery_file=config.get('youtube_discovery_file', DISCOVERY_FILE)
+        )
+
+    def _build_client(self, api_key):
+        #Build a client from the cached discovery document; parsed once and shared by every key
+        from googleapiclient.discovery import build_from_document
+        if self._discovery_document is None:
+            self._discovery_document = load_discovery_document(self.discovery_file)
+        return build_from_document(self._discovery_document, developerKey=api_key,
+                                   requestBuilder=self._build_request)
+
+    def _build_request(self, http, *args, **kwargs):
+        #Bind each request to the calling thread's own connection instead of the client's shared one
+        from googleapiclient.http import HttpRequest, build_http
+        if getattr(self._http, 'connection', None) is None:
+            # build_http applies the client library's default socket timeout, so a stalled call fails
+            self._http.connection = build_http()
+        return HttpRequest(self._http.connection, *args, **kwargs)
+
+    def client(self, api_key):
+        #Build API clients lazily, one per key
+        with self._lock:
+            if api_key not in self._clients:
+                self._clients[api_key] = self.client_factory(api_key)
+            return self._clients[api_key]
+
+    def remaining(self):
+        #Quota units left today across all keys
+        day = quota_day()
+        return sum(
+            max(0, self.daily_budget - self.ledger.used(_key_id(api_key), day))
+            for api_key in self.api_keys
+        )
+
+    def can_afford(self, units):
+        #Check whether the remaining budget covers a projected cost
+        return self.remaining() >= units
+
+    def execute(self, endpoint, make_request):
+        """
+        Charge and execute one API call, rotating keys as they run out
+
+        Args:
+            endpoint: Quota cost name such as 'search.list' or 'videos.list'
+            make_request: Function taking an API client and returning an unexecuted request
+
+        Returns:
+            The API response
+        """
+        from googleapiclient.errors import HttpError
+        cost = QUOTA_COSTS[endpoint]
+        day = quota_day()
+
+        for attempt in range(len(self.api_keys)):
+            index = (self._current + attempt) % len(self.api_keys)
+            api_key = self.api_keys[index]
+            key_id = _key_id(api_key)
+
+            if not self.ledger.try_charge(key_id, day, cost, self.daily_budget):
+                continue
+
+            with self._lock:
+                if index != self._current:
+                    logger.info(f"Rotating to YouTube API key {index + 1}/{len(self.api_keys)}")
+                    self._current = index
+
+            with self.metrics.time('api_call', endpoint=endpoint) as timer:
+                try:
+                    response = make_request(self.client(api_key)).execute()
+                    with self._lock:
+                        self.calls[endpoint] += 1
+                    return response
+                except HttpError as e:
+                    if e.resp.status == 403 and error_reason(e) in EXHAUSTED_REASONS:
+                        logger.warning(f"YouTube API key {index + 1}/{len(self.api_keys)} is out of quota")
+                        self.ledger.mark_exhausted(key_id, day, self.daily_budget)
+                        timer.outcome = 'quota_exceeded'
+                        continue
+                    raise
+
+        raise QuotaExhaustedError(
+            f"No YouTube API key has {cost} quota units left for {endpoint}; "
+            f"quota resets at midnight Pacific time"
+        )
+
+    def report(self):
+        #Summary of calls made, units spent and units left today
+        spent = sum(QUOTA_COSTS[endpoint] * count for endpoint, count in self.calls.items())
+        return {
+            'calls': dict(self.calls),
+            'units_spent': spent,
+            'units_remaining': self.remaining(),
+            'keys': len(self.api_keys)
+        }
+
+    def close(self):
+        self.ledger.close()
@@ -0,0 +1,159 @@
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from metrics import get_metrics
+
+# Configure logging
+import logging
+logger = logging.getLogger(__name__)
+
+# Seconds a cached response stays fresh, per endpoint. Search results change quickly,
+# video snippets and statistics much less so. A TTL of 0 disables caching for an endpoint.
+DEFAULT_TTLS = {
+    'search.list': 3600,
+    'videos.list': 86400
+}
+DEFAULT_MAX_ENTRIES = 50000
+
+# Parameters holding comma-separated lists whose order does not change the response
+LIST_PARAMS = ('part', 'id')
+
+def _normalize(key, value):
+    #Normalize a request parameter so equivalent requests share a cache key
+    if not isinstance(value, str):
+        return value
+    if key in LIST_PARAMS:
+        return ','.join(sorted(item.strip() for item in value.split(',')))
+    return value.strip()
+
+def cache_key(endpoint, params):
+    #Stable key for an endpoint and its request parameters
+    normalized = {key: _normalize(key, value) for key, value in params.items() if value is not None}
+    payload = json.dumps([endpoint, normalized], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+class ResponseCache:
+    """
+    Persistent cache of YouTube API responses stored in SQLite.
+    Entries are keyed by endpoint and normalized request parameters, expire after a
+    per-endpoint TTL, and the least recently used entries are evicted once the cache
+    holds more than max_entries.
+    """
+
+    def __init__(self, path='youtube_cache.db', ttls=None, max_entries=DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.ttls = dict(DEFAULT_TTLS)
+        self.ttls.update(ttls or {})
+        self.max_entries = max_entries
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+        self.metrics = get_metrics()
+
+        self.conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                endpoint TEXT NOT NULL,
+                response TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+            """
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed_at ON responses (accessed_at)")
+        self.conn.commit()
+        self._lock = threading.Lock()
+
+        self.purge_expired()
+        self._size = self.conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    @classmethod
+    def from_config(cls, config):
+        #Create a cache from the youtube_cache section of config.json
+        cache_config = config.get('youtube_cache', {})
+        return cls(
+            path=cache_config.get('file', 'youtube_cache.db'),
+            ttls=cache_config.get('ttl'),
+            max_entries=cache_config.get('max_entries', DEFAULT_MAX_ENTRIES)
+        )
+
+    def enabled(self, endpoint):
+        return self.ttls.get(endpoint, 0) > 0
+
+    def get(self, endpoint, params):
+        #Return the cached response for a request, or None if missing or expired
+        if not self.enabled(endpoint):
+            return None
+
+        key = cache_key(endpoint, params)
+        now = time.time()
+        with self._lock, self.conn:
+            row = self.conn.execute(
+                "SELECT response, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+
+            if row is None or now - row[1] > self.ttls[endpoint]:
+                if row is not None:
+                    self.conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    self._size -= 1
+                self.stats['misses'] += 1
+                self.metrics.increment('cache_requests_total', endpoint=endpoint, result='miss')
+                return None
+
+            self.conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+            self.stats['hits'] += 1
+        self.metrics.increment('cache_requests_total', endpoint=endpoint, result='hit')
+        return json.loads(row[0])
+
+    def put(self, endpoint, params, response):
+        #Store a response, evicting the least recently used entries if the cache is full
+        if not self.enabled(endpoint):
+            return
+
+        key = cache_key(endpoint, params)
+        now = time.time()
+        with self._lock, self.conn:
+            exists = self.conn.execute("SELECT 1 FROM responses WHERE key = ?", (key,)).fetchone()
+            self.conn.execute(
+                "INSERT OR REPLACE INTO responses (key, endpoint, response, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, endpoint, json.dumps(response), now, now)
+            )
+            if not exists:
+                self._size += 1
+
+            overflow = self._size - self.max_entries
+            if overflow > 0:
+                cursor = self.conn.execute(
+                    "DELETE FROM responses WHERE key IN "
+                    "(SELECT key FROM responses ORDER BY accessed_at LIMIT ?)",
+                    (overflow,)
+                )
+                self._size -= cursor.rowcount
+                self.stats['evictions'] += cursor.rowcount
+
+    def purge_expired(self):
+        #Remove every entry older than its endpoint's TTL
+        now = time.time()
+        removed = 0
+        with self._lock, self.conn:
+            for endpoint, ttl in self.ttls.items():
+                cursor = self.conn.execute(
+                    "DELETE FROM responses WHERE endpoint = ? AND created_at < ?",
+                    (endpoint, now - ttl)
+                )
+                removed += cursor.rowcount
+        if removed:
+            logger.info(f"Removed {removed} expired responses from {self.path}")
+        return removed
+
+    def hit_rate(self):
+        lookups = self.stats['hits'] + self.stats['misses']
+        return self.stats['hits'] / lookups if lookups else 0.0
+
+    def close(self):
+        self.conn.close()
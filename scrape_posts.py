@@ -1,97 +1,591 @@
 #!/usr/bin/env python3
 import asyncio
 import argparse
-import os
-import json
 import csv
-import pandas as pd
-from datetime import datetime
-from scrapers import InstagramScraper, YouTubeScraper
+import sys
+import math
+from datetime import timedelta
+from scrapers import InstagramScraper, YouTubeScraper, iterate_in_thread, iter_youtube_statistics, load_config
+from thumbnails import get_thumbnail_store
+from thumbnail_processing import close_thumbnail_processor
+from browser import close_browser_pool
+from storage import (MetadataCSVWriter, MetadataStore, PostIndex, CheckpointStore, EngagementHistory, OUTPUT_FORMATS,
+                     open_writer)
+from quota import QuotaScheduler, QuotaExhaustedError, QUOTA_COSTS, projected_cost
+from metrics import get_metrics
+from pacing import get_pacer
 
-async def run_instagram_scraper(target, limit):
+# Rows are written to metadata.csv in batches of this size while a scrape is still running
+SAVE_BATCH_SIZE = 25
+
+# Posts per target when --limit is not given
+DEFAULT_LIMIT = 50
+
+# Refresh mode re-polls videos whose counts are older than this many hours by default
+DEFAULT_STALE_AFTER_HOURS = 24
+
+async def run_instagram_scraper(target, limit, post_index=None, checkpoint=None, writer=None, store=None):
     print(f"Starting Instagram scraper for '{target}' with limit {limit}")
-    posts = await InstagramScraper.scrape(target, limit)
+    # Rows are saved as they stream in, so a crash keeps everything scraped so far
+    rows = InstagramScraper.stream(target, limit, checkpoint)
+    count = await save_stream_to_metadata_csv(rows, post_index=post_index, checkpoint=checkpoint, writer=writer,
+                                              store=store)
     
-    if posts:
-        print(f"Successfully scraped {len(posts)} Instagram posts")
+    if count:
+        print(f"Successfully scraped {count} Instagram posts")
     else:
         print("No Instagram posts were scraped")
     
-    return posts
+    return count
 
-async def run_youtube_scraper(target, limit):
+async def run_youtube_scraper(target, limit, post_index=None, checkpoint=None, writer=None, store=None):
     print(f"Starting YouTube scraper for '{target}' with limit {limit}")
-    # The BaseScraper.scrape method is async, so we need to await it
-    posts = await YouTubeScraper.scrape(target, limit)
+    # The BaseScraper.stream method is an async iterator, so we consume it with async for
+    rows = YouTubeScraper.stream(target, limit, checkpoint)
+    count = await save_stream_to_metadata_csv(rows, post_index=post_index, checkpoint=checkpoint, writer=writer,
+                                              store=store)
     
-    if posts:
-        print(f"Successfully scraped {len(posts)} YouTube videos")
+    if count:
+        print(f"Successfully scraped {count} YouTube videos")
     else:
         print("No YouTube videos were scraped")
     
-    return posts
+    return count
 
-def save_to_metadata_csv(posts, filename='metadata.csv'):
-    """Save or append scraped posts to the metadata.csv file"""
-    if not posts:
-        print("No data to save")
-        return
-    
-    # Convert posts to DataFrame
-    df_new = pd.DataFrame(posts)
+def open_post_index(writer=None):
+    """Open the persistent post-ID index the scrapers also use (post_index_file in config.json),
+    seeding it from the rows already in the output on first use"""
+    post_index = PostIndex(load_config().get('post_index_file', 'post_index.db'))
+    if post_index.created:
+        post_index.backfill((writer or MetadataCSVWriter()).iter_rows())
+    return post_index
+
+def open_metadata_store(writer=None):
+    """Open the queryable SQLite copy of the saved rows, or return None if it is disabled in config.json
+    On first use it is filled from the rows already in the output"""
+    store_config = load_config().get('metadata_store', {})
+    if not store_config.get('enabled', True):
+        return None
+    store = MetadataStore(store_config.get('file', 'metadata.db'))
+    if store.created:
+        store.backfill((writer or MetadataCSVWriter()).iter_rows())
+    return store
+
+def save_to_metadata_csv(posts, filename='metadata.csv', post_index=None, writer=None, store=None):
+    """Append scraped posts to the metadata.csv file without re-reading existing rows
+    When a post index is given, already saved posts are skipped and new ones are recorded
+    Pass a writer from storage.open_writer to save in another output format instead, and a
+    MetadataStore to also make the saved rows queryable
+    Returns the number of rows written, or None if the output could not be written"""
+    writer = writer or MetadataCSVWriter(filename)
+    filename = writer.location
+    metrics = get_metrics()
     
-    # Check if metadata.csv exists
-    if os.path.exists(filename):
+    with metrics.time('save') as timer:
+        if post_index is not None:
+            new_posts = post_index.filter_new_rows(posts)
+            if len(new_posts) < len(posts):
+                print(f"Skipped {len(posts) - len(new_posts)} posts already in {filename}")
+            posts = new_posts
+        
+        if not posts:
+            print("No data to save")
+            timer.outcome = 'empty'
+            return 0
+        
+        is_new_file = not writer.exists()
+        
         try:
-            # Read existing data
-            df_existing = pd.read_csv(filename, encoding='utf-8')
-            print(f"Found existing metadata.csv with {len(df_existing)} records")
-            
-            # Append new data
-            df_combined = pd.concat([df_existing, df_new], ignore_index=True)
-            
-            # Save combined data
-            df_combined.to_csv(filename, index=False, encoding='utf-8')
-            print(f"Added {len(df_new)} new posts to {filename}")
-            print(f"Total posts in {filename}: {len(df_combined)}")
+            # Only the new rows are written; existing output is never loaded
+            saved = writer.append(posts)
         except Exception as e:
-            df_new.to_csv(filename, index=False, encoding='utf-8')
-            print(f"Saved {len(df_new)} posts to new {filename}")
+            print(f"Error saving to {filename}: {str(e)}")
+            timer.outcome = 'failed'
+            return None
+        
+        # Record the committed posts so later runs skip them
+        if post_index is not None:
+            post_index.add_rows(posts)
+        
+        # The output is already written; a failure here only leaves the query store behind
+        if store is not None:
+            try:
+                store.add_rows(posts)
+            except Exception as e:
+                print(f"Error indexing posts in {store.path}: {str(e)} (run query_posts.py --rebuild)")
+    
+    metrics.increment('rows_saved_total', saved)
+    
+    if is_new_file:
+        print(f"Created new {filename} with {saved} posts")
     else:
-        # Create new file
-        df_new.to_csv(filename, index=False, encoding='utf-8')
-        print(f"Created new {filename} with {len(df_new)} posts")
+        print(f"Added {saved} new posts to {filename}")
+    return saved
+
+async def attach_image_hashes(rows, thumbnail_dir='thumbnails', timeout=30):
+    """Fill in each row's image_phash once its thumbnail has been downloaded and processed
+    Rows whose thumbnail is not ready within the timeout are saved with an empty hash"""
+    store = get_thumbnail_store(thumbnail_dir)
+    post_ids = [row['post_id'] for row in rows if row.get('image_url')]
+    if timeout > 0:
+        await asyncio.to_thread(store.wait_for, post_ids, timeout)
+    hashes = store.image_hashes(post_ids)
+    for row in rows:
+        row['image_phash'] = hashes.get(row['post_id'], '')
+
+async def save_stream_to_metadata_csv(rows, filename='metadata.csv', post_index=None, batch_size=SAVE_BATCH_SIZE,
+                                      checkpoint=None, writer=None, store=None):
+    """Save rows from an async iterator as they arrive, holding at most one batch in memory
+    Each saved batch is committed to the checkpoint, if one is given
+    Returns the number of rows received"""
+    batch = []
+    total = 0
+    completed = False
+    
+    # With thumbnail post-processing enabled, each batch waits for its perceptual hashes
+    config = load_config()
+    processing = config.get('thumbnail_processing', {})
+    
+    async def flush(wait=True):
+        if processing.get('enabled'):
+            await attach_image_hashes(
+                batch,
+                config.get('thumbnail_directory', 'thumbnails'),
+                processing.get('timeout', 30) if wait else 0
+            )
+        saved = save_to_metadata_csv(batch, filename, post_index, writer, store)
+        # A failed write leaves the batch uncommitted, so --resume scrapes these rows again;
+        # otherwise every row is either written now or was already saved
+        if checkpoint is not None and saved is not None:
+            checkpoint.commit([row['post_id'] for row in batch])
+    
+    try:
+        async for row in rows:
+            batch.append(row)
+            total += 1
+            if len(batch) >= batch_size:
+                await flush()
+                batch = []
+        completed = True
+    finally:
+        # Keep whatever arrived before a failure, without waiting on thumbnails
+        if batch:
+            await flush(wait=completed)
+        elif checkpoint is not None:
+            checkpoint.commit([])
+    
+    return total
+
+def plan_youtube_quota(targets, checkpoints=None, resume=False):
+    """
+    Report the projected YouTube quota cost of a batch and defer targets that would exceed it
+    
+    Targets are kept in file order, so the ones listed last are deferred first. Deferred
+    targets are never started, so they have no checkpoint; run them again once the quota
+    resets (the batch summary prints them as batch lines). With resume, rows already
+    committed to a target's checkpoint are not charged again.
+    
+    Returns:
+        Tuple of (targets to run now, deferred targets)
+    """
+    youtube_targets = [t for t in targets if t[0] == 'youtube']
+    if not youtube_targets:
+        return targets, []
+    
+    def target_cost(target):
+        platform, name, limit = target
+        if checkpoints is not None and resume:
+            state = checkpoints.load(platform, name) or {}
+            limit = max(0, limit - len(state.get('committed_ids', [])))
+        return projected_cost(limit) if limit > 0 else 0
+    
+    try:
+        quota = QuotaScheduler.from_config(load_config())
+    except ValueError as e:
+        print(f"Cannot plan YouTube quota: {str(e)}")
+        return targets, []
+    try:
+        available = quota.remaining()
+    finally:
+        quota.close()
+    
+    total_cost = sum(target_cost(target) for target in youtube_targets)
+    print(f"Projected YouTube quota cost: {total_cost} units ({available} remaining today)")
+    
+    scheduled = []
+    deferred = []
+    planned = 0
+    for target in targets:
+        if target[0] == 'youtube':
+            cost = target_cost(target)
+            if planned + cost > available:
+                deferred.append(target)
+                continue
+            planned += cost
+        scheduled.append(target)
+    
+    if deferred:
+        print(f"Deferring {len(deferred)} YouTube targets until the quota resets")
+    return scheduled, deferred
+
+def refresh_youtube_engagement(stale_after_hours, writer=None, history_file='engagement_history.db', limit=None):
+    """
+    Re-poll likes, comments and views of saved YouTube videos whose counts are stale
+    
+    Videos are picked by the age of their last poll, or of scraped_at if never polled, oldest
+    first. Each poll is stored as a row with deltas in the engagement history instead of being
+    appended to the output again. Runs synchronously; call it with asyncio.to_thread.
+    
+    Args:
+        stale_after_hours: Age in hours after which a video's counts are re-polled
+        writer: Writer of the output the videos were saved to
+        history_file: SQLite file holding the engagement time series
+        limit: Maximum number of videos to refresh, or None for all stale videos
+        
+    Returns:
+        Number of videos refreshed
+    """
+    writer = writer or MetadataCSVWriter()
+    history = EngagementHistory(history_file)
+    quota = None
+    missing_video_ids = []
+    refreshed = 0
+    totals = {'likes_delta': 0, 'comments_delta': 0, 'view_count_delta': 0}
+    try:
+        stale = history.select_stale('youtube', writer.iter_rows('youtube'), timedelta(hours=stale_after_hours))
+        if limit is not None:
+            stale = stale[:limit]
+        if not stale:
+            print(f"No YouTube videos older than {stale_after_hours:g} hours to refresh")
+            return 0
+        
+        previous = dict(stale)
+        video_ids = [post_id for post_id, _ in stale]
+        # Only statistics calls are made, so no scraper (downloader, index, cache) is started
+        config = load_config()
+        quota = QuotaScheduler.from_config(config)
+        pacer = get_pacer('youtube', config.get('pacing', {}).get('youtube'))
+        cost = math.ceil(len(video_ids) / 50) * QUOTA_COSTS['videos.list']
+        print(
+            f"Refreshing {len(video_ids)} YouTube videos older than {stale_after_hours:g} hours "
+            f"(quota cost: {cost} units, {quota.remaining()} remaining today)"
+        )
+        
+        try:
+            for polls in iter_youtube_statistics(quota, video_ids, pacer, missing_video_ids):
+                for row in history.record('youtube', polls, previous):
+                    for name in totals:
+                        totals[name] += row[name] or 0
+                refreshed += len(polls)
+        except QuotaExhaustedError as e:
+            # Refreshed videos are no longer stale, so the next run continues with the rest
+            print(f"Stopping refresh: {str(e)}")
+        
+        print(
+            f"Refreshed {refreshed} YouTube videos ({len(missing_video_ids)} unavailable): "
+            f"views {totals['view_count_delta']:+d}, likes {totals['likes_delta']:+d}, "
+            f"comments {totals['comments_delta']:+d}"
+        )
+        return refreshed
+    finally:
+        history.close()
+        if quota is not None:
+            quota.close()
+
+def load_batch_targets(source, default_limit):
+    """
+    Read batch targets from a file, or from stdin when source is '-'
+    
+    Each line is "platform,target[,limit]"; blank lines and lines starting with # are ignored.
+    
+    Returns:
+        List of (platform, target, limit) tuples
+    """
+    if source == '-':
+        lines = sys.stdin.read().splitlines()
+    else:
+        with open(source, 'r', encoding='utf-8') as f:
+            lines = f.read().splitlines()
+    
+    targets = []
+    for line_number, fields in enumerate(csv.reader(lines), start=1):
+        fields = [field.strip() for field in fields]
+        if not fields or not fields[0] or fields[0].startswith('#'):
+            continue
+        if len(fields) < 2 or fields[0] not in ('instagram', 'youtube') or not fields[1]:
+            print(f"Skipping invalid batch line {line_number}: {','.join(fields)}")
+            continue
+        limit = int(fields[2]) if len(fields) > 2 and fields[2] else default_limit
+        targets.append((fields[0], fields[1], limit))
+    
+    return targets
+
+async def run_batch(targets, instagram_concurrency=1, youtube_concurrency=4, filename='metadata.csv',
+                    checkpoints=None, resume=False, writer=None):
+    """
+    Scrape many targets concurrently, reusing scrapers across targets
+    
+    YouTube targets share a pool of API clients (one per concurrent slot) and run in worker
+    threads. Instagram targets share the pooled browsers and saved login, each in its own
+    context. Rows are streamed into metadata.csv as they arrive and, when a CheckpointStore
+    is given, each target's progress is checkpointed (and resumed if resume is set).
+    YouTube targets that the remaining API quota cannot cover are deferred, not started.
+    
+    Returns:
+        Dict mapping (platform, target) to the number of posts scraped, or None if deferred
+    """
+    targets, deferred = plan_youtube_quota(targets, checkpoints, resume)
+    post_index = open_post_index(writer or MetadataCSVWriter(filename))
+    store = open_metadata_store(writer)
+    semaphores = {
+        'instagram': asyncio.Semaphore(instagram_concurrency),
+        'youtube': asyncio.Semaphore(youtube_concurrency)
+    }
+    youtube_pool = asyncio.Queue()
+    youtube_scrapers = []
+    instagram_lock = asyncio.Lock()
+    instagram = {'session': None, 'error': None}
+    results = {(platform, target): None for platform, target, _ in deferred}
+    
+    async def get_instagram_session():
+        # Log in once (or restore the saved session) before any Instagram target starts
+        async with instagram_lock:
+            if instagram['error']:
+                raise RuntimeError(instagram['error'])
+            if instagram['session'] is None:
+                session = InstagramScraper()
+                await session.setup_browser()
+                if not await session.ensure_logged_in():
+                    await session.cleanup()
+                    instagram['error'] = "Instagram login failed"
+                    raise RuntimeError(instagram['error'])
+                instagram['session'] = session
+            return instagram['session']
+    
+    async def scrape_youtube(target, limit, checkpoint):
+        # Reuse an idle client, creating one only when every existing client is busy
+        try:
+            scraper = youtube_pool.get_nowait()
+        except asyncio.QueueEmpty:
+            scraper = await asyncio.to_thread(YouTubeScraper)
+            youtube_scrapers.append(scraper)
+        try:
+            rows = iterate_in_thread(lambda: scraper.iter_videos(target, limit, checkpoint))
+            return await save_stream_to_metadata_csv(rows, filename, post_index, checkpoint=checkpoint,
+                                                     writer=writer, store=store)
+        finally:
+            youtube_pool.put_nowait(scraper)
+    
+    async def scrape_instagram(target, limit, checkpoint):
+        # Each target gets its own pooled context carrying the shared login session
+        session = await get_instagram_session()
+        scraper = await session.fork_session()
+        try:
+            if not await scraper.ensure_logged_in():
+                print(f"Instagram login failed for '{target}'")
+                return 0
+            if await scraper.search_hashtag(target):
+                rows = scraper.iter_posts(limit, checkpoint)
+                return await save_stream_to_metadata_csv(rows, filename, post_index, checkpoint=checkpoint,
+                                                         writer=writer, store=store)
+            print(f"Failed to search Instagram hashtag '{target}'")
+            return 0
+        finally:
+            await scraper.cleanup()
+    
+    async def run_target(platform, target, limit):
+        async with semaphores[platform]:
+            print(f"Starting {platform} scraper for '{target}' with limit {limit}")
+            checkpoint = checkpoints.checkpoint(platform, target, resume) if checkpoints else None
+            try:
+                if platform == 'youtube':
+                    count = await scrape_youtube(target, limit, checkpoint)
+                else:
+                    count = await scrape_instagram(target, limit, checkpoint)
+            except Exception as e:
+                print(f"{platform} scraping failed for '{target}': {str(e)}")
+                count = 0
+        
+        results[(platform, target)] = count
+    
+    try:
+        await asyncio.gather(*(run_target(*target) for target in targets))
+    finally:
+        for scraper in youtube_scrapers:
+            await asyncio.to_thread(scraper.thumbnails.close)
+        if instagram['session'] is not None:
+            await instagram['session'].cleanup()
+        await close_browser_pool()
+        close_thumbnail_processor()
+        post_index.close()
+        if store is not None:
+            store.close()
+    
+    return results
 
 async def main():
     # Parse command line arguments
     parser = argparse.ArgumentParser(description='SlateMate Social Media Scraper')
-    parser.add_argument('--platform', choices=['instagram', 'youtube'], required=True,
+    parser.add_argument('--platform', choices=['instagram', 'youtube'],
                         help='Platform to scrape (instagram or youtube)')
-    parser.add_argument('--target', required=True, help='Search term or hashtag to scrape')
-    parser.add_argument('--limit', type=int, default=50, help='Maximum number of posts to retrieve')
+    parser.add_argument('--target', help='Search term or hashtag to scrape')
+    parser.add_argument('--limit', type=int,
+                        help=f'Maximum number of posts to retrieve (default: {DEFAULT_LIMIT}; with --refresh, no limit)')
+    parser.add_argument('--batch', metavar='FILE',
+                        help='Scrape many targets from a file of "platform,target[,limit]" lines (- for stdin)')
+    parser.add_argument('--instagram-concurrency', type=int, default=1,
+                        help='Maximum Instagram targets scraped at once in batch mode')
+    parser.add_argument('--youtube-concurrency', type=int, default=4,
+                        help='Maximum YouTube targets scraped at once in batch mode')
+    parser.add_argument('--resume', action='store_true',
+                        help='Continue interrupted scrapes from their saved checkpoints')
+    parser.add_argument('--refresh', action='store_true',
+                        help='Re-poll likes, comments and views of saved YouTube videos instead of scraping new ones')
+    parser.add_argument('--stale-after', type=float, metavar='HOURS',
+                        help=f'With --refresh, re-poll videos whose counts are older than this '
+                             f'(default: {DEFAULT_STALE_AFTER_HOURS})')
+    parser.add_argument('--format', choices=list(OUTPUT_FORMATS), default='csv',
+                        help='Output format: metadata.csv or a Parquet dataset partitioned by platform and date')
+    parser.add_argument('--metrics-file',
+                        help='Write per-stage timings and counters as JSON to this file (default: metrics.json)')
+    parser.add_argument('--metrics-port', type=int,
+                        help='Serve live metrics in the Prometheus text format on this port at /metrics')
     
     args = parser.parse_args()
     
-    all_posts = []
+    # Stage timings are collected for the whole run and written out when it ends
+    metrics_config = load_config().get('metrics', {})
+    metrics = get_metrics()
+    metrics_port = args.metrics_port if args.metrics_port is not None else metrics_config.get('port')
+    if metrics_port is not None:
+        metrics.serve(metrics_port)
+    
+    try:
+        await run_from_args(args, parser)
+    finally:
+        metrics.stop()
+        metrics_file = args.metrics_file or metrics_config.get('summary_file', 'metrics.json')
+        summary = metrics.summary()
+        try:
+            metrics.write_summary(metrics_file)
+        except Exception as e:
+            print(f"Error writing metrics to {metrics_file}: {str(e)}")
+        print_stage_timings(summary)
+        print_browser_usage(summary)
+
+def print_stage_timings(summary):
+    #Print one line per timed stage from a metrics summary
+    if not summary['stages']:
+        return
+    print("\nStage Timings:")
+    for entry in summary['stages']:
+        labels = ', '.join(f"{name}={value}" for name, value in entry['labels'].items())
+        print(
+            f"{entry['stage']} ({labels}): {entry['count']} calls, "
+            f"mean {entry['mean_ms']:.1f} ms, p90 {entry['p90_ms']:.1f} ms, total {entry['seconds_total']:.2f} s"
+        )
+
+def print_browser_usage(summary):
+    #Print the network and renderer CPU cost per Instagram post of the browser profile used
+    totals = {}
+    for counter in summary['counters']:
+        if counter['name'].startswith('browser_'):
+            totals[counter['name']] = totals.get(counter['name'], 0) + counter['value']
+        elif counter['name'] == 'posts_total' and counter['labels'].get('platform') == 'instagram':
+            totals['posts'] = totals.get('posts', 0) + counter['value']
+    posts = totals.get('posts', 0)
+    if not posts or 'browser_bytes_total' not in totals:
+        return
+    print(
+        f"\nBrowser Usage: {totals['browser_bytes_total'] / posts / 1024:.1f} KB and "
+        f"{totals.get('browser_cpu_seconds_total', 0) / posts * 1000:.0f} ms renderer CPU per post, "
+        f"{totals.get('browser_requests_blocked_total', 0)} requests blocked"
+    )
+
+async def run_from_args(args, parser):
+    #Run the single-target or batch scrape selected on the command line
+    writer = open_writer(args.format)
+    
+    if args.refresh:
+        if args.platform == 'instagram' or args.batch:
+            parser.error("--refresh only re-polls saved YouTube videos")
+        refresh_config = load_config().get('refresh', {})
+        stale_after = args.stale_after
+        if stale_after is None:
+            stale_after = refresh_config.get('stale_after_hours', DEFAULT_STALE_AFTER_HOURS)
+        # Every stale video is re-polled unless --limit is given
+        await asyncio.to_thread(
+            refresh_youtube_engagement, stale_after, writer,
+            refresh_config.get('history_file', 'engagement_history.db'), args.limit
+        )
+        return
+    
+    if args.limit is None:
+        args.limit = DEFAULT_LIMIT
+    
+    checkpoints = CheckpointStore()
+    
+    if args.batch:
+        targets = load_batch_targets(args.batch, args.limit)
+        try:
+            results = await run_batch(targets, args.instagram_concurrency, args.youtube_concurrency,
+                                      checkpoints=checkpoints, resume=args.resume, writer=writer)
+        finally:
+            checkpoints.close()
+        
+        # Print summary
+        print("\nBatch Summary:")
+        for (platform, target), count in results.items():
+            if count is None:
+                print(f"{platform} '{target}': deferred until the YouTube quota resets")
+            else:
+                print(f"{platform} '{target}': {count} posts")
+        print(f"Total posts scraped: {sum(count for count in results.values() if count)}")
+        
+        # Deferred targets never started, so --resume has nothing to continue; list them to run again
+        deferred = [(platform, target, limit) for platform, target, limit in targets
+                    if results.get((platform, target), 0) is None]
+        if deferred:
+            print("\nRun these batch lines again after the YouTube quota resets:")
+            csv.writer(sys.stdout, lineterminator='\n').writerows(deferred)
+        return
+    
+    if not args.platform or not args.target:
+        checkpoints.close()
+        parser.error("--platform and --target are required unless --batch is given")
     
-    # Run the selected scraper
-    if args.platform == 'instagram':
-        instagram_posts = await run_instagram_scraper(args.target, args.limit)
-        if instagram_posts:
-            all_posts.extend(instagram_posts)
+    checkpoint = checkpoints.checkpoint(args.platform, args.target, resume=args.resume)
+    if args.platform == 'youtube':
+        _, deferred = plan_youtube_quota([(args.platform, args.target, args.limit)], checkpoints, args.resume)
+        if deferred:
+            checkpoints.close()
+            print(f"Not starting YouTube '{args.target}': run it again after the quota resets")
+            return
     
-    elif args.platform == 'youtube':
-        youtube_posts = await run_youtube_scraper(args.target, args.limit)
-        if youtube_posts:
-            all_posts.extend(youtube_posts)
+    post_index = open_post_index(writer)
+    store = open_metadata_store(writer)
+    total_posts = 0
     
-    # Save all collected data to metadata.csv
-    if all_posts:
-        save_to_metadata_csv(all_posts)
+    # Run the selected scraper; rows are saved to metadata.csv as they arrive
+    try:
+        if args.platform == 'instagram':
+            try:
+                total_posts = await run_instagram_scraper(args.target, args.limit, post_index, checkpoint, writer, store)
+            finally:
+                await close_browser_pool()
+        
+        elif args.platform == 'youtube':
+            total_posts = await run_youtube_scraper(args.target, args.limit, post_index, checkpoint, writer, store)
+    finally:
+        close_thumbnail_processor()
+        post_index.close()
+        if store is not None:
+            store.close()
+        checkpoints.close()
     
     # Print summary
     print("\nScraping Summary:")
-    print(f"Total posts scraped: {len(all_posts)}")
+    print(f"Total posts scraped: {total_posts}")
 
 if __name__ == "__main__":
     asyncio.run(main()) 
\ No newline at end of file
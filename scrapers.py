@@ -1,35 +1,50 @@
 import asyncio
+import copy
+import inspect
+import threading
 import os
 import re
 from datetime import datetime
 import json
-import time
-from tqdm import tqdm
-import requests
+
+from config import load_config
+from thumbnails import ThumbnailDownloader, create_session, fetch_thumbnail
+from thumbnail_processing import get_thumbnail_processor
+from storage import PostIndex
+from pacing import get_pacer
+from metrics import get_metrics
+
+# Playwright, googleapiclient and tqdm are imported by the methods that use them,
+# so a run only loads the dependencies of the platform it scrapes
 
 # For Instagram
-from playwright.async_api import async_playwright, TimeoutError
+from browser import get_browser_pool
+from instagram_feed import InstagramFeedCollector
+from text_normalization import clean_text, extract_hashtags
 
 # For YouTube
-from googleapiclient.discovery import build
-from googleapiclient.errors import HttpError
+from quota import QuotaScheduler, QuotaExhaustedError, projected_cost
+from response_cache import ResponseCache
 
 # Configure logging
 import logging
 logger = logging.getLogger(__name__)
 
-# Setup logging if not already configured
+# Setup logging if not already configured; scraper.log is only opened once something is logged
 if not logger.handlers:
     logging.basicConfig(
         level=logging.INFO,
         format='%(asctime)s - %(levelname)s - %(message)s',
         handlers=[
-            logging.FileHandler('scraper.log', encoding='utf-8'),
+            logging.FileHandler('scraper.log', encoding='utf-8', delay=True),
             logging.StreamHandler()
         ]
     )
     logger = logging.getLogger(__name__)
 
+# Shared keep-alive session for one-off download_thumbnail calls
+_thumbnail_session = None
+
 def ensure_dir_exists(directory):
     #Ensure directory exists
     if not os.path.exists(directory):
@@ -38,7 +53,8 @@ def ensure_dir_exists(directory):
 
 def download_thumbnail(image_url, file_id, thumbnail_dir=None):
     '''Download and save thumbnail image
-    Use thumbnail directory from config if not specified'''
+    Use thumbnail directory from config if not specified
+    Blocking single download; the scrapers queue thumbnails on a ThumbnailDownloader instead'''
 
     if thumbnail_dir is None:
         config = load_config()
@@ -46,58 +62,70 @@ def download_thumbnail(image_url, file_id, thumbnail_dir=None):
         
     ensure_dir_exists(thumbnail_dir)
     
-    try:
-        # Extract proper file extension from URL or use jpg as default
-        file_extension = 'jpg'
-        if '.' in image_url.split('?')[0].split('/')[-1]:
-            url_extension = image_url.split('?')[0].split('/')[-1].split('.')[-1].lower()
-            # Only use valid image extensions
-            if url_extension in ['jpg', 'jpeg', 'png', 'webp', 'gif', 'heic']:
-                file_extension = url_extension
-        
-        # Clean the file_id to avoid issues with special characters
-        safe_file_id = "".join([c for c in file_id if c.isalnum() or c in '_-'])
-        
-        # Create the file path with proper extension
-        file_path = os.path.join(thumbnail_dir, f"{safe_file_id}.{file_extension}")
-        
-        # Check if file already exists to avoid re-downloading
-        if os.path.exists(file_path):
-            logger.info(f"Thumbnail already exists: {file_path}")
-            return True
-            
-        # Download the image with timeout and proper headers
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
-        response = requests.get(image_url, timeout=15, headers=headers)
-        
-        if response.status_code == 200:
-            with open(file_path, 'wb') as f:
-                f.write(response.content)
-            logger.info(f"Thumbnail saved to {file_path}")
-            return True
-        else:
-            logger.warning(f"Failed to download thumbnail, status code: {response.status_code}")
-            return False
-    except Exception as e:
-        logger.error(f"Error downloading thumbnail: {str(e)}")
-        return False
+    global _thumbnail_session
+    if _thumbnail_session is None:
+        _thumbnail_session = create_session()
+    
+    return fetch_thumbnail(_thumbnail_session, image_url, file_id, thumbnail_dir)
+
+def create_thumbnail_downloader(config, thumbnail_dir):
+    #Create a background thumbnail downloader using worker settings from config
+    return ThumbnailDownloader(
+        thumbnail_dir,
+        max_workers=config.get('thumbnail_workers', 8),
+        per_host_limit=config.get('thumbnail_host_limit', 4),
+        revalidate_after=config.get('thumbnail_revalidate_after'),
+        processor=get_thumbnail_processor(config, thumbnail_dir)
+    )
 
-def load_config(config_file='config.json'):
-    #Load configuration from JSON file
+class _StreamEnd:
+    #Marks the end of a threaded stream, carrying the producer's exception if it failed
+    def __init__(self, error=None):
+        self.error = error
+
+async def iterate_in_thread(make_generator, buffer_size=100):
+    '''Run a blocking generator in a worker thread and yield its items to async code
+    The bounded buffer applies backpressure so a slow consumer keeps memory constant'''
+    loop = asyncio.get_running_loop()
+    buffer = asyncio.Queue(maxsize=buffer_size)
+    stop = threading.Event()
+    
+    def put(item):
+        asyncio.run_coroutine_threadsafe(buffer.put(item), loop).result()
+    
+    def produce():
+        error = None
+        generator = None
+        try:
+            # The generator is created here so its setup also runs off the event loop
+            generator = make_generator()
+            for item in generator:
+                put(item)
+                if stop.is_set():
+                    break
+        except BaseException as e:
+            error = e
+        finally:
+            if generator is not None:
+                generator.close()
+        put(_StreamEnd(error))
+    
+    producer = loop.run_in_executor(None, produce)
     try:
-        if os.path.exists(config_file):
-            with open(config_file, 'r') as f:
-                config = json.load(f)
-            logger.info(f"Loaded configuration from {config_file}")
-            return config
-        else:
-            logger.warning(f"Config file {config_file} not found, using default settings")
-            return {}
-    except Exception as e:
-        logger.error(f"Error loading configuration: {str(e)}")
-        return {}
+        while True:
+            item = await buffer.get()
+            if isinstance(item, _StreamEnd):
+                if item.error is not None:
+                    raise item.error
+                break
+            yield item
+    finally:
+        # Let a producer blocked on a full buffer finish and see the stop flag
+        stop.set()
+        while not producer.done():
+            while not buffer.empty():
+                buffer.get_nowait()
+            await asyncio.sleep(0.01)
 
 # A parent Scraper class for both InstagramScraper and YouTubeScraper classes, providing common interface and functionality.
 class BaseScraper:
@@ -110,7 +138,8 @@ class BaseScraper:
     async def scrape(cls, query, limit=50):
         """
         Unified interface for scraping from any platform.
-        Handles both synchronous and asynchronous implementations.
+        Handles both synchronous and asynchronous implementations; synchronous ones run in a
+        worker thread so other scrapes sharing the event loop keep running.
         
         Args:
             query: Search term or hashtag
@@ -123,13 +152,12 @@ class BaseScraper:
         
         try:
             # Check if the _execute_scrape method is a coroutine (async)
-            import inspect
             if inspect.iscoroutinefunction(cls._execute_scrape):
                 # Call async implementation
                 return await cls._execute_scrape(query, limit) #this call will implement the instagram scraper
             else:
-                # Call synchronous implementation
-                return cls._execute_scrape(query, limit) #this call will implement the youtube scraper
+                # Call synchronous implementation off the event loop
+                return await asyncio.to_thread(cls._execute_scrape, query, limit) #this call will implement the youtube scraper
         except ValueError as e:
             logger.error(str(e))
             return []
@@ -137,8 +165,108 @@ class BaseScraper:
             logger.error(f"{cls.__name__} scraping failed: {str(e)}")
             return []
 
+    @classmethod
+    async def stream(cls, query, limit=50, checkpoint=None):
+        """
+        Async iterator form of scrape() that yields each item as soon as it is extracted.
+        Synchronous implementations run in a worker thread so the event loop is never blocked.
+        
+        Args:
+            query: Search term or hashtag
+            limit: Maximum number of items to retrieve
+            checkpoint: Optional ScrapeCheckpoint to resume from and record progress in
+            
+        Yields:
+            Post data dictionaries; items yielded before a failure are kept by the caller
+        """
+        logger.info(f"Streaming {cls.__name__} for '{query}' with limit {limit}")
+        
+        try:
+            if inspect.isasyncgenfunction(cls._execute_stream):
+                # Async implementation (instagram)
+                async for item in cls._execute_stream(query, limit, checkpoint):
+                    yield item
+            else:
+                # Synchronous implementation (youtube)
+                async for item in iterate_in_thread(lambda: cls._execute_stream(query, limit, checkpoint)):
+                    yield item
+        except ValueError as e:
+            logger.error(str(e))
+        except Exception as e:
+            logger.error(f"{cls.__name__} scraping failed: {str(e)}")
+
 #------------ INSTAGRAM SCRAPER USING PLAYWRIGHT ------------#
 
+# Collects every post field in one page.evaluate call instead of a query_selector/inner_text
+# round trip per field. Selectors mirror the ones the modal path has always tried, in order,
+# inside the first root element found: the dialog of a post opened from the grid, or the main
+# element of a post's own permalink page. Playwright's :has-text() selectors are emulated by
+# scanning the root's elements.
+POST_EXTRACT_SCRIPT = """
+(roots) => {
+    const scope = roots.map((selector) => document.querySelector(selector)).find(Boolean);
+    const first = (selector) => (scope ? scope.querySelector(selector) : null);
+    const text = (el) => (el ? el.innerText : null);
+    const withText = (tag, needle) => {
+        if (!scope) return null;
+        const el = Array.from(scope.querySelectorAll(tag))
+            .find((e) => (e.innerText || '').toLowerCase().includes(needle));
+        return text(el);
+    };
+    const img = first("article img");
+    const time = first("time");
+    return {
+        image_url: img ? img.getAttribute('src') : null,
+        url: window.location.href,
+        author: text(first("header a")),
+        captions: [
+            "ul div > span",
+            "h1",
+            "div[role='button'] > span",
+            "span[dir='auto']"
+        ].map((selector) => text(first(selector))),
+        time_datetime: time ? time.getAttribute('datetime') : null,
+        time_text: text(time),
+        likes_texts: [
+            text(first("section span span")),
+            text(first("section span a span")),
+            text(first("a span span")),
+            withText('div', 'likes'),
+            withText('div', 'like')
+        ],
+        comments_texts: [
+            withText('span', 'comment'),
+            withText('a', 'comment'),
+            withText('div', 'comment')
+        ]
+    };
+}
+"""
+MODAL_ROOTS = ["div[role='dialog']"]
+PERMALINK_ROOTS = ["main"]
+
+# Post IDs of every permalink in the grid, in page order and without repeats
+GRID_PERMALINKS_SCRIPT = """
+() => {
+    const ids = new Set();
+    for (const a of document.querySelectorAll("main a[href*='/p/'], main a[href*='/reel/']")) {
+        const match = a.getAttribute('href').match(/\\/(?:p|reel)\\/([^/?#]+)/);
+        if (match) ids.add(match[1]);
+    }
+    return Array.from(ids);
+}
+"""
+POST_URL = "https://www.instagram.com/p/{}/"
+# Consecutive failed scroll rounds after which the grid scan gives up
+GRID_SCAN_MAX_ERRORS = 5
+
+LIKES_PATTERN = re.compile(r'(\d+(?:,\d+)*)\s*(?:like|likes)')
+COMMENTS_PATTERNS = [
+    re.compile(r'(\d+(?:,\d+)*)\s*comments'),
+    re.compile(r'(\d+(?:,\d+)*)\s*comment'),
+    re.compile(r'view all\s*(\d+(?:,\d+)*)\s*comments')
+]
+
 class InstagramScraper(BaseScraper):
     def __init__(self, credentials=None):
         #Initialize Instagram scraper with credentials from config file
@@ -151,94 +279,118 @@ class InstagramScraper(BaseScraper):
             
         self.username = instagram_config.get('username')
         self.password = instagram_config.get('password')
+        self.instagram_config = instagram_config
+        
+        # 'network' reads post data from intercepted JSON responses and falls back to the modal per post,
+        # 'modal' always clicks each post open
+        self.extraction_mode = instagram_config.get('extraction_mode', 'network')
+        
+        # With more than one, posts found by the grid scan are opened on this many extra tabs at once
+        self.worker_pages = max(1, int(instagram_config.get('worker_pages', 1)))
+        
+        # Adaptive delays shared by every Instagram scraper in the process
+        self.pacer = get_pacer('instagram', config.get('pacing', {}).get('instagram'))
+        
+        # Per-stage timings and counters shared by everything in the process
+        self.metrics = get_metrics()
         
         # Use thumbnail directory from config if available
         self.thumbnail_dir = config.get('thumbnail_directory', 'thumbnails')
         logger.info(f"Using Instagram username: {self.username}")
         logger.info(f"Using thumbnail directory: {self.thumbnail_dir}")
         
+        self.browser_pool = None
         self.browser = None
         self.context = None
         self.page = None
+        self.feed = None
         self.posts_data = []
+        self.owns_thumbnails = True
         
         # Create thumbnail directory if it doesn't exist
         ensure_dir_exists(self.thumbnail_dir)
+        
+        # Thumbnails download in the background while scraping continues
+        self.thumbnails = create_thumbnail_downloader(config, self.thumbnail_dir)
+        
+        # Posts saved in earlier runs are skipped before any click or API call
+        self.post_index = PostIndex(config.get('post_index_file', 'post_index.db'))
 
     async def setup_browser(self):
-        #Initialize Playwright browser
-        playwright = await async_playwright().start()
-        
-        # Using fixed screen dimensions
-        logger.info("Using fixed screen dimensions: 1920x1080")
-        
-        # Launch browser
-        self.browser = await playwright.chromium.launch(
-            headless=False, 
-            args=[
-                '--disable-blink-features=AutomationControlled',
-                '--disable-notifications',
-                '--start-maximized',
-                '--disable-extensions',
-                '--disable-dev-shm-usage',
-                '--no-sandbox',
-                f'--window-size={1920},{1080}',# can have a default value set to 1920 x 1080 or we can dynamicaly get the user system dimentions to open the browser
-                '--enable-unsafe-swiftshader'
-            ]
-        )
-        # Configure context to bypass automation detection
-        self.context = await self.browser.new_context(
-            viewport={'width': 1920, 'height': 1080},
-            user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Edge/120.0.0.0',
-            has_touch=False,
-            locale='en-US',
-            timezone_id='Asia/Kolkata',
-            screen={'width': 1920, 'height': 1080},
-            ignore_https_errors=True
-        )
-        await self.context.add_init_script("""
-            Object.defineProperty(navigator, 'webdriver', {
-                get: () => undefined
-            });
-        """)
+        #Take a fresh context from the shared browser pool, restoring the saved login session if any
+        self.browser_pool = get_browser_pool(self.instagram_config)
+        self.context = await self.browser_pool.new_context()
+        self.browser = self.context.browser
         
-        # Create a new page
-        self.page = await self.context.new_page()
+        # Create a new page, metering its bytes and CPU time for the browser profile
+        self.page = await self.browser_pool.new_page(self.context)
         
         # Set default timeout
         self.page.set_default_timeout(30000)
         
+        # Feed Instagram response statuses into the shared pacing controller
+        self.page.on('response', self._observe_response)
+        
+        # Capture post metadata from the hashtag grid JSON the page loads, unless the modal-only mode is configured
+        self.feed = None
+        if self.extraction_mode == 'network':
+            self.feed = InstagramFeedCollector()
+            self.page.on('response', self.feed.on_response)
+        
         logger.info("Browser setup complete")
 
+    def _observe_response(self, response):
+        #Report Instagram API response statuses to the pacing controller
+        if 'instagram.com' in response.url and response.request.resource_type in ('xhr', 'fetch'):
+            self.pacer.observe_status(response.status)
+
+    async def ensure_logged_in(self):
+        #Reuse the saved login session when it is still valid, otherwise log in and save a new one
+        from playwright.async_api import TimeoutError
+        with self.metrics.time('login', platform='instagram') as timer:
+            if self.browser_pool.has_saved_session():
+                try:
+                    await self.page.goto("https://www.instagram.com/", wait_until="domcontentloaded")
+                    await self.page.wait_for_selector("svg[aria-label='Home']", timeout=10000)
+                    logger.info("Restored saved Instagram session, skipping login")
+                    timer.outcome = 'restored'
+                    return True
+                except TimeoutError:
+                    logger.warning("Saved Instagram session has expired, logging in again")
+                    self.browser_pool.discard_session()
+            
+            if await self.login():
+                await self.browser_pool.save_session(self.context)
+                return True
+            timer.outcome = 'failed'
+            return False
+
     async def login(self):
         #Login to Instagram
+        from playwright.async_api import TimeoutError
         try:
             logger.info("Attempting to login to Instagram")
-            await self.page.goto("https://www.instagram.com/", wait_until="networkidle")
-            await asyncio.sleep(2)
+            await self.page.goto("https://www.instagram.com/", wait_until="domcontentloaded")
+            await self.page.wait_for_selector("input[name='username']", timeout=15000)
 
             # Enter username
             await self.page.fill("input[name='username']", self.username)
-            await asyncio.sleep(1)
             
             # Enter password
             await self.page.fill("input[name='password']", self.password)
-            await asyncio.sleep(1)
             
             # Click login button
             await self.page.click("button[type='submit']")
             logger.info("Login credentials submitted")
             
-            # Wait for login to complete
-            await asyncio.sleep(5)
-            
-            # Verify login success by checking for Home icon
+            # Verify login success by waiting for the Home icon
             try:
-                await self.page.wait_for_selector("svg[aria-label='Home']", timeout=10000)
+                await self.page.wait_for_selector("svg[aria-label='Home']", timeout=15000)
                 logger.info("Successfully logged in")
                 return True
             except TimeoutError:
                 logger.error("Login verification failed - Home icon not found")
+                self.pacer.record_missing_selector()
                 return False
             
         except Exception as e:
@@ -246,45 +398,63 @@ class InstagramScraper(BaseScraper):
             return False
 
     async def search_hashtag(self, hashtag):
+        #Search Instagram for hashtag, timed as the search stage
+        with self.metrics.time('search', platform='instagram') as timer:
+            # Drop anything loaded before, such as the home timeline after login; from here on
+            # only this tag's grid responses, once the page is on /explore/tags/<tag>/, are kept
+            if self.feed is not None:
+                self.feed.start(hashtag)
+            found = await self._search_hashtag(hashtag)
+            if not found:
+                timer.outcome = 'failed'
+                if self.feed is not None:
+                    self.feed.stop()
+            return found
+
+    async def _search_hashtag(self, hashtag):
         #Search Instagram for hashtag
+        from playwright.async_api import TimeoutError
         logger.info(f"Searching for hashtag: {hashtag}")
         
         try:
             # Click on search icon
             await self.page.click("svg[aria-label='Search']")
             logger.info("Clicked on search icon")
-            await asyncio.sleep(2)
             
             # Find search input and type hashtag
             search_input = await self.page.wait_for_selector("input[placeholder='Search']", timeout=5000)
             await search_input.fill(f"#{hashtag}")
             logger.info(f"Entered search text: #{hashtag}")
-            await asyncio.sleep(3)
             
-            # Look for search results and try to click on the hashtag
+            # Wait for search results and try to click on the hashtag
             hashtag_result = self.page.locator(f"span:has-text('#{hashtag}')")
+            try:
+                await hashtag_result.first.wait_for(timeout=5000)
+            except TimeoutError:
+                pass
+            
             if await hashtag_result.count() > 0:
                 await hashtag_result.first.click()
                 logger.info(f"Clicked on #{hashtag} in search results")
-                await asyncio.sleep(5)  # Wait for page to load
             else:
                 # If no results found, try pressing Enter
                 await search_input.press("Enter")
                 logger.info("No results found, pressed Enter")
-                await asyncio.sleep(2)
+                await self.pacer.wait()
                 
                 # Press Enter again to navigate to hashtag page
                 await search_input.press("Enter")
                 logger.info("Pressed Enter again")
-                await asyncio.sleep(5)  # Wait for page to load
+            
+            # Wait for the hashtag page to load
+            await self.page.wait_for_load_state("domcontentloaded")
         except Exception as e:
             logger.warning(f"Search using UI failed: {str(e)}")
             
             # Direct URL navigation as fallback
             try:
                 logger.info("Trying direct URL navigation to hashtag page")
-                await self.page.goto(f"https://www.instagram.com/explore/tags/{hashtag}/", wait_until="networkidle")
-                await asyncio.sleep(5)  # Wait for page to load
+                await self.page.goto(f"https://www.instagram.com/explore/tags/{hashtag}/", wait_until="domcontentloaded")
             except Exception as e2:
                 logger.error(f"Direct navigation failed: {str(e2)}")
                 return False
@@ -303,19 +473,50 @@ class InstagramScraper(BaseScraper):
                 return True
             except TimeoutError:
                 logger.error("No posts found for the hashtag - grid not detected")
+                self.pacer.record_missing_selector()
                 return False
         
         return False
 
     async def scroll_and_scrape(self, post_limit):
         #Scroll through posts and scrape data
+        async for post_data in self.iter_posts(post_limit):
+            self.posts_data.append(post_data)
+        return self.posts_data
+
+    async def iter_posts(self, post_limit, checkpoint=None):
+        '''Scroll through posts, yielding each post as soon as it is extracted
+        With a checkpoint, scroll back to its saved position and count its committed posts toward the limit'''
+        if self.worker_pages > 1:
+            async for post_data in self._iter_posts_with_workers(post_limit, checkpoint):
+                yield post_data
+            return
+        
+        from tqdm import tqdm
         posts_scraped = 0
-        last_height = await self.page.evaluate("document.body.scrollHeight")
         processed_ids = set()  # Track already processed post IDs to avoid duplicates
+        attempted_ids = set()  # Grid tiles already opened or skipped in this run
+        last_post_id = None
+        
+        if checkpoint:
+            posts_scraped = len(checkpoint.committed_ids)
+            processed_ids.update(checkpoint.committed_ids)
+            attempted_ids.update(checkpoint.committed_ids)
+            last_post_id = checkpoint.position.get('last_post_id')
+            await self._restore_scroll(checkpoint.position.get('scroll_y', 0))
+        
+        last_height = await self.page.evaluate("document.body.scrollHeight")
         
-        with tqdm(total=post_limit, desc="Scraping posts") as pbar:
+        with tqdm(total=post_limit, initial=posts_scraped, desc="Scraping posts") as pbar:
             while posts_scraped < post_limit:
                 try:
+                    # Rows from this batch resume from the current scroll offset until they are saved
+                    if checkpoint:
+                        checkpoint.set_position(
+                            scroll_y=await self.page.evaluate("window.scrollY"),
+                            last_post_id=last_post_id
+                        )
+                    
                     # Find all post containers in the grid using different selectors
                     post_containers = await self.page.query_selector_all("div._aagv")
                     if not post_containers:
@@ -329,30 +530,56 @@ class InstagramScraper(BaseScraper):
                     
                     logger.info(f"Found {len(post_containers)} visible posts on the page")
                     
-                    # Process visible posts
                     posts_processed_in_batch = 0
-                    for i in range(min(len(post_containers), post_limit - posts_scraped)):
+                    
+                    # Take posts captured from the page's own JSON responses first; tiles
+                    # they cover are skipped below, so only the rest are opened in the modal
+                    if self.feed is not None:
+                        for post_data in self.feed.drain():
+                            if posts_scraped >= post_limit:
+                                break
+                            attempted_ids.add(post_data['post_id'])
+                            if post_data['post_id'] in processed_ids:
+                                continue
+                            if self.post_index.contains('instagram', post_data['post_id']):
+                                continue
+                            
+                            await self._add_post(post_data, processed_ids)
+                            self.metrics.increment('posts_total', platform='instagram', source='network')
+                            posts_scraped += 1
+                            posts_processed_in_batch += 1
+                            pbar.update(1)
+                            last_post_id = post_data['post_id']
+                            if checkpoint:
+                                checkpoint.track(last_post_id)
+                            yield post_data
+                        
+                        logger.info(f"Collected {posts_processed_in_batch} posts from network responses")
+                    
+                    # Process visible posts
+                    for post_container in post_containers:
                         if posts_scraped >= post_limit:
                             break
+                        
+                        # Skip posts seen in this run or saved in an earlier run without opening them
+                        tile_post_id = await self._get_tile_post_id(post_container)
+                        if tile_post_id:
+                            if tile_post_id in attempted_ids:
+                                continue
+                            attempted_ids.add(tile_post_id)
+                            if self.post_index.contains('instagram', tile_post_id):
+                                logger.info(f"Skipping already saved post {tile_post_id}")
+                                self.metrics.increment('posts_skipped_total', platform='instagram')
+                                continue
                             
                         # Process each post
-                        post_data = await self._process_post(post_containers[i], posts_scraped + 1)
+                        post_data = await self._process_post(post_container, posts_scraped + 1)
                         
                         if post_data:
                             # Check if we've already processed this post (avoid duplicates)
                             if post_data['post_id'] not in processed_ids:
-                                processed_ids.add(post_data['post_id'])
-                                self.posts_data.append(post_data)
-                                
-                                # Download thumbnail
-                                thumbnail_success = download_thumbnail(
-                                    post_data['image_url'], 
-                                    post_data['post_id'], 
-                                    self.thumbnail_dir
-                                )
-                                
-                                if thumbnail_success:
-                                    logger.info(f"Downloaded thumbnail for post {post_data['post_id']}")
+                                await self._add_post(post_data, processed_ids)
+                                self.metrics.increment('posts_total', platform='instagram', source='modal')
                                 
                                 posts_scraped += 1
                                 posts_processed_in_batch += 1
@@ -360,6 +587,10 @@ class InstagramScraper(BaseScraper):
                                 
                                 # Log progress
                                 logger.info(f"Successfully scraped post {posts_scraped}/{post_limit}")
+                                last_post_id = post_data['post_id']
+                                if checkpoint:
+                                    checkpoint.track(last_post_id)
+                                yield post_data
 
                     if posts_scraped >= post_limit:
                         logger.info(f"Reached target of {post_limit} posts")
@@ -369,7 +600,7 @@ class InstagramScraper(BaseScraper):
                         logger.warning("No new posts were processed in this batch, attempting more aggressive scrolling")
                         # More aggressive scrolling if we're not finding new posts
                         await self.page.evaluate("window.scrollTo(0, document.body.scrollHeight + 2000)")
-                        await asyncio.sleep(3)
+                        await self._wait_for_new_content(last_height)
                         
                         # Try clicking "Load more" button if it exists
                         try:
@@ -377,13 +608,13 @@ class InstagramScraper(BaseScraper):
                             if await load_more.count() > 0:
                                 logger.info("Found 'Load more' button, clicking it")
                                 await load_more.first.click()
-                                await asyncio.sleep(3)
+                                await self._wait_for_new_content(last_height)
                         except Exception as e:
                             logger.debug(f"No 'Load more' button found: {str(e)}")
                         
                     # Scroll down to load more posts
                     await self.page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
-                    await asyncio.sleep(2)
+                    await self._wait_for_new_content(last_height)
                     
                     # Check if page has new content
                     new_height = await self.page.evaluate("document.body.scrollHeight")
@@ -391,7 +622,8 @@ class InstagramScraper(BaseScraper):
                         # Try scrolling more aggressively
                         for _ in range(3):  # Try multiple small scrolls
                             await self.page.evaluate(f"window.scrollTo(0, {last_height + 1000})")
-                            await asyncio.sleep(1)
+                            if await self._wait_for_new_content(last_height, timeout=2000):
+                                break
                         
                         new_height = await self.page.evaluate("document.body.scrollHeight")
                         if new_height == last_height:
@@ -400,30 +632,261 @@ class InstagramScraper(BaseScraper):
                     
                     last_height = new_height
                     logger.info(f"Scrolled to new content, new height: {new_height}")
-                    await asyncio.sleep(1)  # Give some time for posts to render
+                    await self.pacer.wait()
                     
                 except Exception as e:
                     logger.error(f"Error during scrolling: {str(e)}")
-                    # Try to continue despite errors
-                    await asyncio.sleep(2)
+                    # Back off and try to continue despite errors
+                    self.pacer.record_missing_selector()
+                    await self.pacer.wait()
                     
         logger.info(f"Completed scraping with {posts_scraped} posts")
-        return self.posts_data
+        if checkpoint:
+            checkpoint.finish()
+
+    async def _iter_posts_with_workers(self, post_limit, checkpoint=None):
+        '''Scan the grid on the main page while worker tabs open the posts it finds, yielding posts as they finish
+        The scan and the workers share one set of seen post IDs, so no post is opened twice, and every tab
+        waits for a slot from the Instagram pacing controller before loading a post'''
+        from tqdm import tqdm
+        posts_scraped = 0
+        processed_ids = set()
+        seen_ids = set()  # Posts queued, extracted or skipped in this run, shared by the scan and the workers
+        # Scroll offset each queued post was found at, in discovery order; the oldest unfinished one is
+        # where a resumed scrape must start so that no queued post is lost
+        outstanding = {}
+        
+        if checkpoint:
+            posts_scraped = len(checkpoint.committed_ids)
+            processed_ids.update(checkpoint.committed_ids)
+            seen_ids.update(checkpoint.committed_ids)
+            await self._restore_scroll(checkpoint.position.get('scroll_y', 0))
+        
+        links = asyncio.Queue(maxsize=self.worker_pages * 2)
+        results = asyncio.Queue()
+        pages = []
+        for _ in range(self.worker_pages):
+            page = await self.browser_pool.new_page(self.context)
+            page.set_default_timeout(30000)
+            page.on('response', self._observe_response)
+            pages.append(page)
+        logger.info(f"Extracting posts on {len(pages)} worker tabs")
+        
+        workers = [asyncio.create_task(self._post_worker(page, links, results)) for page in pages]
+        scanner = asyncio.create_task(self._scan_grid(links, results, seen_ids, outstanding))
+        active_workers = len(workers)
+        
+        try:
+            with tqdm(total=post_limit, initial=posts_scraped, desc="Scraping posts") as pbar:
+                while posts_scraped < post_limit and active_workers:
+                    item = await results.get()
+                    if item is None:
+                        active_workers -= 1
+                        continue
+                    
+                    post_id, post_data, source = item
+                    resume_scroll = next(iter(outstanding.values()), None)
+                    outstanding.pop(post_id, None)
+                    if not post_data or post_data['post_id'] in processed_ids:
+                        continue
+                    
+                    await self._add_post(post_data, processed_ids)
+                    self.metrics.increment('posts_total', platform='instagram', source=source)
+                    posts_scraped += 1
+                    pbar.update(1)
+                    if checkpoint:
+                        checkpoint.set_position(scroll_y=resume_scroll or 0, last_post_id=post_data['post_id'])
+                        checkpoint.track(post_data['post_id'])
+                    yield post_data
+            
+            logger.info(f"Completed scraping with {posts_scraped} posts")
+            if checkpoint:
+                checkpoint.finish()
+        finally:
+            scanner.cancel()
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(scanner, *workers, return_exceptions=True)
+            for page in pages:
+                try:
+                    await self.browser_pool.close_page(page)
+                except Exception as e:
+                    logger.debug(f"Could not close worker tab: {str(e)}")
+
+    async def _scan_grid(self, links, results, seen_ids, outstanding):
+        #Scroll the grid on the main page, queueing each new permalink for the workers until the feed ends
+        try:
+            last_height = await self.page.evaluate("document.body.scrollHeight")
+        except Exception as e:
+            logger.error(f"Error starting grid scan: {str(e)}")
+            last_height = None
+        
+        errors = 0
+        while last_height is not None and errors < GRID_SCAN_MAX_ERRORS:
+            try:
+                scroll_y = await self.page.evaluate("window.scrollY")
+                
+                # Posts captured from the page's own JSON responses need no tab at all
+                if self.feed is not None:
+                    for post_data in self.feed.drain():
+                        post_id = post_data['post_id']
+                        if post_id in seen_ids:
+                            continue
+                        seen_ids.add(post_id)
+                        if self.post_index.contains('instagram', post_id):
+                            continue
+                        outstanding[post_id] = scroll_y
+                        await results.put((post_id, post_data, 'network'))
+                
+                for post_id in await self.page.evaluate(GRID_PERMALINKS_SCRIPT):
+                    if post_id in seen_ids:
+                        continue
+                    seen_ids.add(post_id)
+                    if self.post_index.contains('instagram', post_id):
+                        logger.info(f"Skipping already saved post {post_id}")
+                        self.metrics.increment('posts_skipped_total', platform='instagram')
+                        continue
+                    outstanding[post_id] = scroll_y
+                    # Waits here while every worker is busy, so the scan never runs far ahead
+                    await links.put(post_id)
+                
+                # Scroll down to load more posts
+                await self.page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
+                if not await self._wait_for_new_content(last_height):
+                    for _ in range(3):  # Try multiple small scrolls
+                        await self.page.evaluate(f"window.scrollTo(0, {last_height + 1000})")
+                        if await self._wait_for_new_content(last_height, timeout=2000):
+                            break
+                
+                new_height = await self.page.evaluate("document.body.scrollHeight")
+                if new_height == last_height:
+                    logger.info("Reached end of scrollable content, no more posts to load")
+                    break
+                last_height = new_height
+                errors = 0
+                await self.pacer.wait()
+            
+            except Exception as e:
+                logger.error(f"Error during grid scan: {str(e)}")
+                errors += 1
+                self.pacer.record_missing_selector()
+                await self.pacer.wait()
+        
+        # Let every worker finish the posts already queued, then exit
+        for _ in range(self.worker_pages):
+            await links.put(None)
+
+    async def _post_worker(self, page, links, results):
+        #Open queued posts on their permalink pages in one tab; reports None to results when done
+        from playwright.async_api import TimeoutError
+        try:
+            while True:
+                post_id = await links.get()
+                if post_id is None:
+                    break
+                
+                # Shared rate limit across every tab and scraper, on top of the adaptive delay
+                await self.pacer.throttle()
+                post_data = None
+                with self.metrics.time('post_extract', platform='instagram', mode='tab') as timer:
+                    try:
+                        await page.goto(POST_URL.format(post_id), wait_until="domcontentloaded")
+                        await page.wait_for_selector("main article img", timeout=10000)
+                        post_data = await self._extract_post_data(page, PERMALINK_ROOTS)
+                    except TimeoutError:
+                        logger.warning(f"Post {post_id} did not load on its permalink page")
+                        self.pacer.record_missing_selector()
+                    except Exception as e:
+                        logger.warning(f"Error processing post {post_id}: {str(e)}")
+                    if post_data is None:
+                        timer.outcome = 'failed'
+                
+                if post_data:
+                    # The permalink names the post even when the page URL was redirected
+                    post_data['post_id'] = post_id
+                await results.put((post_id, post_data, 'tab'))
+                await self.pacer.wait()
+        finally:
+            results.put_nowait(None)
+
+    async def _restore_scroll(self, scroll_y):
+        #Scroll back down to a saved offset, loading the infinite grid along the way
+        if not scroll_y:
+            return
+        logger.info(f"Restoring scroll position {scroll_y}")
+        while True:
+            height = await self.page.evaluate("document.body.scrollHeight")
+            if height >= scroll_y + await self.page.evaluate("window.innerHeight"):
+                break
+            await self.page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
+            if not await self._wait_for_new_content(height):
+                logger.warning("Grid stopped growing before the saved scroll position")
+                break
+        await self.page.evaluate(f"window.scrollTo(0, {int(scroll_y)})")
+
+    async def _wait_for_new_content(self, previous_height, timeout=5000):
+        #Wait until the page grows past previous_height instead of sleeping a fixed time
+        from playwright.async_api import TimeoutError
+        try:
+            await self.page.wait_for_function(
+                "height => document.body.scrollHeight > height",
+                arg=previous_height,
+                timeout=timeout
+            )
+            return True
+        except TimeoutError:
+            return False
+
+    async def _add_post(self, post_data, processed_ids):
+        #Mark a scraped post as processed and queue its thumbnail download
+        processed_ids.add(post_data['post_id'])
+        
+        # Queue thumbnail download and keep scraping
+        if await self.thumbnails.asubmit(post_data['image_url'], post_data['post_id']):
+            logger.info(f"Queued thumbnail for post {post_data['post_id']}")
+
+    async def _get_tile_post_id(self, post_container):
+        #Read the post ID from the permalink wrapping a grid tile, without opening the post
+        try:
+            href = await post_container.evaluate(
+                "el => { const a = el.closest('a'); return a ? a.getAttribute('href') : null; }"
+            )
+            if href:
+                match = re.search(r'/(?:p|reel)/([^/?#]+)', href)
+                if match:
+                    return match.group(1)
+        except Exception as e:
+            logger.debug(f"Could not read post ID from grid tile: {str(e)}")
+        return None
 
     async def _process_post(self, post_container, post_number):
         #Process a single post
+        from playwright.async_api import TimeoutError
         try:
-            # Click on the post to open it
-            await post_container.click()
-            logger.info(f"Clicked on post {post_number}")
-            await asyncio.sleep(3)  # Wait for post to open
-            
-            # Extract data from the opened post
-            post_data = await self._extract_post_data()
+            # Click, wait for the modal and extract are timed together; closing and pacing are not
+            with self.metrics.time('post_extract', platform='instagram', mode='modal') as timer:
+                # Click on the post to open it
+                await post_container.click()
+                logger.info(f"Clicked on post {post_number}")
+                
+                # Wait for the post to open
+                try:
+                    await self.page.wait_for_selector("div[role='dialog'] article img", timeout=10000)
+                except TimeoutError:
+                    self.pacer.record_missing_selector()
+                    raise
+                
+                # Extract data from the opened post
+                post_data = await self._extract_post_data()
+                if post_data is None:
+                    timer.outcome = 'failed'
             
-            # Close the modal by pressing Escape
+            # Close the modal by pressing Escape and wait for it to go away
             await self.page.keyboard.press("Escape")
-            await asyncio.sleep(1)  # Wait for modal to close
+            await self.page.wait_for_selector("div[role='dialog']", state="detached", timeout=5000)
+            
+            # Adaptive pause before the next post
+            await self.pacer.wait()
             
             return post_data
                 
@@ -432,47 +895,49 @@ class InstagramScraper(BaseScraper):
             # Try to close any open modal if there was an error
             try:
                 await self.page.keyboard.press("Escape")
-                await asyncio.sleep(1)
+                await self.page.wait_for_selector("div[role='dialog']", state="detached", timeout=5000)
             except:
                 pass
+            await self.pacer.wait()
             
             return None
 
-    async def _extract_post_data(self):
-        #Extract comprehensive metadata from an opened post"""
+    async def _extract_post_data(self, page=None, roots=MODAL_ROOTS):
+        #Extract comprehensive metadata from an opened post with a single browser round trip
         try:
-            # Get the image URL from the modal
-            img = await self.page.query_selector("div[role='dialog'] article img")
-            if not img:
+            fields = await (page or self.page).evaluate(POST_EXTRACT_SCRIPT, roots)
+        except Exception as e:
+            logger.error(f"Error extracting post data from modal: {str(e)}")
+            return None
+        
+        return self._parse_modal_fields(fields)
+
+    def _parse_modal_fields(self, fields):
+        #Build the post data dictionary from the raw fields returned by POST_EXTRACT_SCRIPT
+        try:
+            image_url = (fields or {}).get('image_url')
+            if not image_url:
                 logger.warning("Could not find image in modal")
                 return None
-                
-            image_url = await img.get_attribute('src')
             
             # Extract post ID - try multiple methods
             post_id = None
             
             # Method 1: Try to get post ID from URL in the address bar
-            try:
-                current_url = await self.page.evaluate("window.location.href")
-                if '/p/' in current_url:
-                    # Format: https://www.instagram.com/p/[POST_ID]/
-                    post_id = current_url.split('/p/')[1].split('/')[0]
-                    logger.info(f"Extracted post ID from URL: {post_id}")
-            except Exception as e:
-                logger.debug(f"Could not extract post ID from URL: {str(e)}")
+            current_url = fields.get('url') or ''
+            if '/p/' in current_url:
+                # Format: https://www.instagram.com/p/[POST_ID]/
+                post_id = current_url.split('/p/')[1].split('/')[0]
+                logger.info(f"Extracted post ID from URL: {post_id}")
             
             # Method 2: Extract from image URL if method 1 failed
             if not post_id:
-                try:
-                    # Extract the filename part from the URL
-                    filename = image_url.split('/')[-1].split('?')[0]
-                    # Most Instagram image filenames start with the post ID
-                    if '_' in filename:
-                        post_id = filename
-                        logger.info(f"Extracted post ID from image filename: {post_id}")
-                except Exception as e:
-                    logger.debug(f"Could not extract post ID from image URL: {str(e)}")
+                # Extract the filename part from the URL
+                filename = image_url.split('/')[-1].split('?')[0]
+                # Most Instagram image filenames start with the post ID
+                if '_' in filename:
+                    post_id = filename
+                    logger.info(f"Extracted post ID from image filename: {post_id}")
             
             # Method 3: Fallback - use image URL hash if all else fails
             if not post_id:
@@ -480,129 +945,49 @@ class InstagramScraper(BaseScraper):
                 post_id = hashlib.md5(image_url.encode()).hexdigest()[:16]
                 logger.info(f"Generated fallback post ID using hash: {post_id}")
             
-            # Extract author/username
-            author = ""
-            try:
-                author_elem = await self.page.query_selector("div[role='dialog'] header a")
-                if author_elem:
-                    author = await author_elem.inner_text()                      
-                # Clean up author text
-                author = self._clean_text(author)
-            except Exception as e:
-                logger.warning(f"Could not extract author: {str(e)}")
+            # Clean up author text
+            author = clean_text(fields.get('author') or '')
             
-            # Extract post caption/text
+            # Use the first caption candidate that is not an empty or very short string,
+            # cleaning it and moving its hashtags out in one pass
             post_text = ""
-            try:
-                # Try multiple selectors for post text
-                caption_selectors = [
-                    "div[role='dialog'] ul div > span",
-                    "div[role='dialog'] h1", 
-                    "div[role='dialog'] div[role='button'] > span",
-                    "div[role='dialog'] span[dir='auto']"
-                ]
-                
-                for selector in caption_selectors:
-                    caption_elem = await self.page.query_selector(selector)
-                    if caption_elem:
-                        caption_text = await caption_elem.inner_text()
-                        if caption_text and len(caption_text) > 5:  # Ensure it's not an empty or very short string
-                            post_text = self._clean_text(caption_text)
-                            break
-            except Exception as e:
-                logger.warning(f"Could not extract caption: {str(e)}")
-            
-            # Extract hashtags from post text
             hashtags = []
-            if post_text:
-                # Find all hashtags using regex
-                hashtags = re.findall(r'#(\w+)', post_text)
-                
-                # Remove hashtags from post_text
-                post_text = re.sub(r'#\w+\s*', '', post_text).strip()
-                # Clean up any double spaces created by hashtag removal
-                post_text = ' '.join(post_text.split())
+            for caption_text in fields.get('captions') or []:
+                if caption_text and len(caption_text) > 5:
+                    post_text, hashtags = extract_hashtags(caption_text)
+                    break
+            
+            # Prefer the datetime attribute, then the visible text, then the current time
+            timestamp = fields.get('time_datetime') or fields.get('time_text') or datetime.now().isoformat()
             
-            # Extract timestamp if available
-            timestamp = ""
-            try:
-                # Try to find the post timestamp
-                time_elem = await self.page.query_selector("div[role='dialog'] time")
-                if time_elem:
-                    datetime_attr = await time_elem.get_attribute('datetime')
-                    if datetime_attr:
-                        timestamp = datetime_attr
-                    else:
-                        # If datetime attribute not available, use the text
-                        timestamp = await time_elem.inner_text()
-            except Exception as e:
-                logger.warning(f"Could not extract timestamp: {str(e)}")
-                
-            # If no timestamp found, use current time
-            if not timestamp:
-                timestamp = datetime.now().isoformat()
-                
             # Extract likes count
             likes = ""
-            try:
-                #Look for specific like count text
-                likes_selectors = [
-                    "div[role='dialog'] section span span",
-                    "div[role='dialog'] section span a span",
-                    "div[role='dialog'] a span span",
-                    "div[role='dialog'] div:has-text('likes')",
-                    "div[role='dialog'] div:has-text('like')"
-                ]
-                
-                for selector in likes_selectors:
-                    likes_elem = await self.page.query_selector(selector)
-                    if likes_elem:
-                        likes_text = await likes_elem.inner_text()
-                        # Extract numeric value using regex
-                        likes_match = re.search(r'(\d+(?:,\d+)*)\s*(?:like|likes)', likes_text.lower())
-                        if likes_match:
-                            # Remove commas and convert to string
-                            likes = likes_match.group(1).replace(',', '')
-                            logger.info(f"Found likes count: {likes}")
-                            break
-                
-            except Exception as e:
-                logger.warning(f"Could not extract likes: {str(e)}")
+            for likes_text in fields.get('likes_texts') or []:
+                if not likes_text:
+                    continue
+                # Extract numeric value using regex
+                likes_match = LIKES_PATTERN.search(likes_text.lower())
+                if likes_match:
+                    # Remove commas and convert to string
+                    likes = likes_match.group(1).replace(',', '')
+                    logger.info(f"Found likes count: {likes}")
+                    break
             
             # Extract comments count
             comments = ""
-            try:
-                # Approach 1: Look for text containing "comments" or "comment"
-                comments_patterns = [
-                    r'(\d+(?:,\d+)*)\s*comments',
-                    r'(\d+(?:,\d+)*)\s*comment',
-                    r'view all\s*(\d+(?:,\d+)*)\s*comments'
-                ]
-                
-                # Find elements that might contain comment counts
-                comment_selectors = [
-                    "div[role='dialog'] span:has-text('comment')",
-                    "div[role='dialog'] a:has-text('comment')",
-                    "div[role='dialog'] div:has-text('comment')"
-                ]
+            for comments_text in fields.get('comments_texts') or []:
+                if not comments_text:
+                    continue
+                # Try each pattern
+                for pattern in COMMENTS_PATTERNS:
+                    match = pattern.search(comments_text.lower())
+                    if match:
+                        comments = match.group(1).replace(',', '')
+                        logger.info(f"Found comments count: {comments}")
+                        break
                 
-                for selector in comment_selectors:
-                    comments_elem = await self.page.query_selector(selector)
-                    if comments_elem:
-                        comments_text = await comments_elem.inner_text()
-                        
-                        # Try each pattern
-                        for pattern in comments_patterns:
-                            match = re.search(pattern, comments_text.lower())
-                            if match:
-                                comments = match.group(1).replace(',', '')
-                                logger.info(f"Found comments count: {comments}")
-                                break
-                        
-                        if comments:
-                            break
-            except Exception as e:
-                logger.warning(f"Could not extract comments count: {str(e)}")
+                if comments:
+                    break
             
             # Compile all the data scraped
             return {
@@ -621,38 +1006,24 @@ class InstagramScraper(BaseScraper):
             logger.error(f"Error extracting post data from modal: {str(e)}")
             return None
 
-    def _clean_text(self, text):
-        #Clean and normalize text to avoid encoding issues by trying to replace problematic characters with their closest ASCII equivalents
-        if not text:
-            return ""
-            
-        # Replace problematic characters
-        text = text.replace('\u2122', '™') 
-        text = text.replace('\u00a9', '©') 
-        text = text.replace('\u00ae', '®') 
-        
-        # Replace other common special characters
-        text = text.replace('\u2018', "'") 
-        text = text.replace('\u2019', "'") 
-        text = text.replace('\u201c', '"') 
-        text = text.replace('\u201d', '"')
-        text = text.replace('\u2013', '-')
-        text = text.replace('\u2014', '--')
-        
-        # Remove zero-width spaces and other invisible characters
-        text = text.replace('\u200b', '')  
-        text = text.replace('\ufeff', '') 
-        
-        # Normalize whitespace
-        text = ' '.join(text.split())
-        
-        return text
+    async def fork_session(self):
+        #Create a scraper with its own pooled context that shares this one's downloader and post index
+        session = copy.copy(self)
+        session.owns_thumbnails = False
+        session.posts_data = []
+        await session.setup_browser()
+        return session
 
     async def cleanup(self):
-        #Close the browser and clean up
-        if self.browser:
-            await self.browser.close()
-            logger.info("Browser closed")
+        #Close this scraper's context; the pooled browser stays up for later scrapes
+        if self.context:
+            await self.browser_pool.close_context(self.context)
+            self.context = None
+            logger.info("Browser context closed")
+        
+        # Wait for queued thumbnails to finish downloading
+        if self.owns_thumbnails:
+            await self.thumbnails.aclose()
             
     @classmethod
     async def _execute_scrape(cls, hashtag, limit):
@@ -666,19 +1037,34 @@ class InstagramScraper(BaseScraper):
         Returns:
             List of post data dictionaries or empty list if scraping fails
         """
+        return [post_data async for post_data in cls._execute_stream(hashtag, limit)]
+
+    @classmethod
+    async def _execute_stream(cls, hashtag, limit, checkpoint=None):
+        """
+        Instagram-specific implementation of the stream method
+        
+        Args:
+            hashtag: The hashtag to search for (without # symbol)
+            limit: Maximum number of posts to scrape
+            checkpoint: Optional ScrapeCheckpoint to resume from and record progress in
+            
+        Yields:
+            Post data dictionaries as they are extracted
+        """
         scraper = cls()  # Create instance of the class
         
         try:
             # Setup browser
             await scraper.setup_browser()
             
-            # Login to Instagram
-            if await scraper.login():
+            # Login to Instagram, or reuse the saved session
+            if await scraper.ensure_logged_in():
                 # Search for hashtag
                 if await scraper.search_hashtag(hashtag):
                     # Scrape posts
-                    posts_data = await scraper.scroll_and_scrape(limit)
-                    return posts_data
+                    async for post_data in scraper.iter_posts(limit, checkpoint):
+                        yield post_data
                 else:
                     logger.error("Failed to search hashtag")
             else:
@@ -687,59 +1073,164 @@ class InstagramScraper(BaseScraper):
             logger.error(f"Instagram scraping failed: {str(e)}")
             raise
         finally:
-            # Ensure browser is closed
+            # Ensure the context is closed
             await scraper.cleanup()
-            
-        return []
 
 #------------ YOUTUBE SCRAPER WITH GOOGLE CLOUD YOUTUBE DATA API ------------#
 
+# videos().list accepts at most 50 comma-separated IDs per call
+YOUTUBE_MAX_IDS_PER_REQUEST = 50
+
+# Threads that fetch one page's video details while the next search page is requested
+YOUTUBE_FETCH_WORKERS = 4
+
+def iter_youtube_statistics(quota, video_ids, pacer=None, missing_video_ids=None):
+    """
+    Re-poll only the statistics of already saved videos, one videos().list call per 50 IDs
+    
+    Only needs a QuotaScheduler, so refresh mode never starts a YouTubeScraper with its
+    thumbnail downloader, post index and response cache. Responses are never cached, since
+    the counts are what changed. Quota errors propagate so the caller can stop and refresh
+    the remaining videos after the reset.
+    
+    Args:
+        quota: QuotaScheduler the calls are charged to
+        video_ids: List of YouTube video IDs
+        pacer: Optional pacing controller told about successes and rate limits
+        missing_video_ids: Optional list that IDs of deleted or private videos are appended to
+        
+    Yields:
+        One list per batch of dicts with post_id, likes, comments and view_count
+    """
+    from googleapiclient.errors import HttpError
+    metrics = get_metrics()
+    for start in range(0, len(video_ids), YOUTUBE_MAX_IDS_PER_REQUEST):
+        chunk = video_ids[start:start + YOUTUBE_MAX_IDS_PER_REQUEST]
+        try:
+            video_response = quota.execute(
+                'videos.list',
+                lambda youtube: youtube.videos().list(
+                    part='statistics',
+                    id=','.join(chunk)
+                )
+            )
+            if pacer is not None:
+                pacer.record_success()
+        except HttpError as e:
+            logger.warning(f"API error refreshing statistics for {len(chunk)} videos: {str(e)}")
+            if e.resp.status in [403, 429] and pacer is not None:
+                pacer.record_rate_limit()
+            continue
+        
+        polls = []
+        for video_info in video_response.get('items', []):
+            statistics = video_info.get('statistics', {})
+            polls.append({
+                'post_id': video_info['id'],
+                'likes': statistics.get('likeCount', ''),
+                'comments': statistics.get('commentCount', ''),
+                'view_count': statistics.get('viewCount', '')
+            })
+        
+        returned = {poll['post_id'] for poll in polls}
+        missing_ids = [video_id for video_id in chunk if video_id not in returned]
+        if missing_ids:
+            logger.warning(f"No statistics returned for {len(missing_ids)} videos (deleted or private)")
+            if missing_video_ids is not None:
+                missing_video_ids.extend(missing_ids)
+        metrics.increment('posts_refreshed_total', len(polls), platform='youtube')
+        yield polls
+
 class YouTubeScraper(BaseScraper):
     def __init__(self, api_key=None):
         # Load API key from config.json
         config = load_config()
         
-        # Require API key to be in config file
-        if not config.get('youtube_api_key'):
+        # Require at least one API key to be in config file
+        if not config.get('youtube_api_key') and not config.get('youtube_api_keys'):
             raise ValueError("YouTube API key missing in config.json")
-            
-        self.api_key = config.get('youtube_api_key')
-        logger.info("YouTube API key loaded from config.json")
+        
+        # Every API call is charged against a daily budget, rotating through the configured keys
+        self.quota = QuotaScheduler.from_config(config)
+        self.api_key = self.quota.api_keys[0]
+        logger.info(f"Loaded {len(self.quota.api_keys)} YouTube API key(s) from config.json")
+        
+        # Repeated searches and already fetched videos are answered from a local cache
+        self.cache = ResponseCache.from_config(config)
         
         # Use thumbnail directory from config if available
         self.thumbnail_dir = config.get('thumbnail_directory', 'thumbnails')
         logger.info(f"Using thumbnail directory: {self.thumbnail_dir}")
         
-        self.youtube = build('youtube', 'v3', developerKey=self.api_key)
         self.posts_data = []
+        # Video IDs returned by search but missing from videos().list (deleted, private, etc.)
+        self.missing_video_ids = []
+        
+        # Adaptive delay between result pages, shared by every YouTube scraper in the process
+        self.pacer = get_pacer('youtube', config.get('pacing', {}).get('youtube'))
+        
+        # Size of the thread pool that overlaps detail lookups with fetching the next search page
+        self.fetch_workers = max(2, int(config.get('youtube_fetch_workers', YOUTUBE_FETCH_WORKERS)))
+        
+        # Per-stage timings and counters shared by everything in the process
+        self.metrics = get_metrics()
         
         # Create thumbnail directory if it doesn't exist
         ensure_dir_exists(self.thumbnail_dir)
+        
+        # Thumbnails download in the background while scraping continues
+        self.thumbnails = create_thumbnail_downloader(config, self.thumbnail_dir)
+        
+        # Posts saved in earlier runs are skipped before any click or API call
+        self.post_index = PostIndex(config.get('post_index_file', 'post_index.db'))
 
     def search_videos(self, query, max_results=50):
         #Search for videos on YouTube with the given query
+        self.posts_data = list(self.iter_videos(query, max_results))
+        return self.posts_data
+
+    def iter_videos(self, query, max_results=50, checkpoint=None):
+        '''Search for videos on YouTube, yielding each video as soon as its details are fetched
+        With a checkpoint, continue from its saved page token and count its committed videos toward the limit
+        The next search page is requested while the current page's details are fetched and its videos
+        are consumed, on a small thread pool'''
+        from concurrent.futures import ThreadPoolExecutor
+        from tqdm import tqdm
+        from googleapiclient.errors import HttpError
         logger.info(f"Searching YouTube for: {query} (limit: {max_results} videos)")
+        logger.info(
+            f"Projected YouTube quota cost: up to {projected_cost(max_results)} units "
+            f"({self.quota.remaining()} remaining today)"
+        )
         
+        executor = ThreadPoolExecutor(max_workers=self.fetch_workers, thread_name_prefix='youtube-fetch')
+        search_future = None
         try:
             # Define parameters for search request
-            videos_data = []
             next_page_token = None
             results_per_page = min(50, max_results)  # YouTube API allows max 50 per request
             total_retrieved = 0
+            seen_ids = set()
+            
+            if checkpoint:
+                next_page_token = checkpoint.position.get('page_token')
+                total_retrieved = len(checkpoint.committed_ids)
+                seen_ids.update(checkpoint.committed_ids)
             
-            with tqdm(total=max_results, desc="Retrieving videos") as pbar:
-                # Make initial request and handle pagination if needed
-                while total_retrieved < max_results:
-                    # Calculate remaining results to fetch
-                    remaining = max_results - total_retrieved
-                    current_results = min(results_per_page, remaining)
+            # The first page is requested right away; later pages are prefetched below
+            search_future = executor.submit(
+                self._search_page, query, min(results_per_page, max_results - total_retrieved), next_page_token
+            )
+            
+            with tqdm(total=max_results, initial=total_retrieved, desc="Retrieving videos") as pbar:
+                # Handle pagination until the limit is reached or the results run out
+                while search_future is not None:
+                    # Rows from this page resume from this page's token until they are saved
+                    if checkpoint:
+                        checkpoint.set_position(page_token=next_page_token)
                     
-                    # Make the search request
-                    search_response = self._make_search_request(
-                        query, 
-                        max_results=current_results, 
-                        page_token=next_page_token
-                    )
+                    search_response, from_cache = search_future.result()
+                    search_future = None
                     
                     if not search_response:
                         break
@@ -750,43 +1241,118 @@ class YouTubeScraper(BaseScraper):
                         logger.info("No more results found")
                         break
                     
-                    # Get additional data for each video
-                    for item in items:
-                        if item['id']['kind'] == 'youtube#video':
-                            video_id = item['id']['videoId']
-                            # Get detailed video information
-                            video_data = self._get_video_details(video_id)
-                            if video_data:
-                                videos_data.append(video_data)
-                                # Download thumbnail
-                                download_thumbnail(video_data['image_url'], video_data['post_id'], self.thumbnail_dir)
-                                total_retrieved += 1
-                                pbar.update(1)
+                    # Collect the video IDs from this page, keeping search order
+                    video_ids = [
+                        item['id']['videoId'] for item in items
+                        if item['id']['kind'] == 'youtube#video'
+                    ]
                     
-                    # Check if there are more pages
+                    # Skip videos saved in earlier runs or already seen on an earlier page
+                    new_video_ids = [
+                        video_id for video_id in self.post_index.filter_new('youtube', dict.fromkeys(video_ids))
+                        if video_id not in seen_ids
+                    ]
+                    if len(new_video_ids) < len(video_ids):
+                        logger.info(f"Skipping {len(video_ids) - len(new_video_ids)} already saved videos")
+                        self.metrics.increment('posts_skipped_total', len(video_ids) - len(new_video_ids), platform='youtube')
+                    video_ids = new_video_ids[:max_results - total_retrieved]
+                    seen_ids.update(video_ids)
+                    
+                    # Get detailed video information for the whole page in one batch
+                    details_future = executor.submit(self._get_video_details_batch, video_ids)
+                    
+                    # Prefetch the next page while the details arrive and this page's videos are consumed,
+                    # unless this page is expected to reach the limit on its own
                     next_page_token = search_response.get('nextPageToken')
+                    expected = total_retrieved + len(video_ids)
+                    if next_page_token and expected < max_results:
+                        search_future = executor.submit(
+                            self._search_page, query, min(results_per_page, max_results - expected),
+                            next_page_token, not from_cache
+                        )
+                    
+                    details, missing_ids = details_future.result()
+                    self.missing_video_ids.extend(missing_ids)
+                    
+                    for video_id in video_ids:
+                        video_data = details.get(video_id)
+                        if video_data:
+                            # Queue thumbnail download and keep scraping
+                            self.thumbnails.submit(video_data['image_url'], video_data['post_id'])
+                            self.metrics.increment('posts_total', platform='youtube', source='api')
+                            total_retrieved += 1
+                            pbar.update(1)
+                            if checkpoint:
+                                checkpoint.track(video_id)
+                            yield video_data
+                    
+                    # Check if there are more pages
                     if not next_page_token or total_retrieved >= max_results:
                         break
                     
-                    # Add a small delay to avoid rate limiting
-                    time.sleep(0.5)
+                    if checkpoint:
+                        checkpoint.set_position(page_token=next_page_token)
+                    
+                    # Videos were missing or skipped, so the page did not reach the limit after all
+                    if search_future is None:
+                        search_future = executor.submit(
+                            self._search_page, query, min(results_per_page, max_results - total_retrieved),
+                            next_page_token, not from_cache
+                        )
             
-            self.posts_data = videos_data
-            logger.info(f"Successfully retrieved {len(videos_data)} videos")
-            return videos_data
+            logger.info(f"Successfully retrieved {total_retrieved} videos")
+            if checkpoint:
+                checkpoint.finish()
+        
+        except QuotaExhaustedError as e:
+            # Stop here; the checkpoint keeps the page token so the scrape can resume after the reset
+            logger.warning(f"Deferring the rest of '{query}': {str(e)}")
         
         except HttpError as e:
             error_content = json.loads(e.content.decode('utf-8'))
             error_message = error_content.get('error', {}).get('message', str(e))
             logger.error(f"YouTube API error: {error_message}")
-            return []
         
         except Exception as e:
             logger.error(f"Error searching YouTube: {str(e)}")
-            return []
+        
+        finally:
+            # A prefetched page nobody will read is dropped if it has not been sent yet. One already
+            # sent cannot be recalled, so wait for it and include its cost in the report below
+            if search_future is not None and not search_future.cancel():
+                try:
+                    search_future.result()
+                except Exception as e:
+                    logger.debug(f"Unread prefetched search page failed: {str(e)}")
+                logger.info("Stopped with the next search page already requested; its quota is included below")
+            executor.shutdown(wait=False, cancel_futures=True)
+            report = self.quota.report()
+            logger.info(
+                f"YouTube quota used: {report['units_spent']} units "
+                f"({report['calls']['search.list']} searches, {report['calls']['videos.list']} detail calls), "
+                f"{report['units_remaining']} remaining today"
+            )
+            logger.info(
+                f"YouTube response cache: {self.cache.stats['hits']} hits, {self.cache.stats['misses']} misses "
+                f"({self.cache.hit_rate():.0%} hit rate)"
+            )
     
+    def _search_page(self, query, max_results, page_token=None, pace=False):
+        '''Fetch one page of search results in a worker thread, returning (response, served from cache)
+        With pace, wait the adaptive delay first, as after a page that came from the API'''
+        if pace:
+            self.pacer.wait_sync()
+        with self.metrics.time('search', platform='youtube') as timer:
+            search_response, from_cache = self._make_search_request(query, max_results=max_results,
+                                                                    page_token=page_token)
+            if from_cache:
+                timer.outcome = 'cached'
+        return search_response, from_cache
+
     def _make_search_request(self, query, max_results=50, page_token=None):
-        #Make a search request to the YouTube API
+        '''Make a search request to the YouTube API, returning (response, served from cache)
+        Runs on pool threads, so the cache flag is returned rather than kept on the instance'''
+        from googleapiclient.errors import HttpError
         try:
             search_params = {
                 'q': query,
@@ -799,12 +1365,25 @@ class YouTubeScraper(BaseScraper):
             if page_token:
                 search_params['pageToken'] = page_token
             
-            search_response = self.youtube.search().list(**search_params).execute()
-            return search_response
+            # A recent identical search is served locally without spending quota
+            search_response = self.cache.get('search.list', search_params)
+            if search_response is not None:
+                return search_response, True
+            
+            search_response = self.quota.execute(
+                'search.list',
+                lambda youtube: youtube.search().list(**search_params)
+            )
+            self.pacer.record_success()
+            self.cache.put('search.list', search_params, search_response)
+            return search_response, False
         
+        except QuotaExhaustedError:
+            raise
         except HttpError as e:
             if e.resp.status in [403, 429]:  # Quota exceeded or rate limiting
                 logger.warning(f"API quota issue: {str(e)}")
+                self.pacer.record_rate_limit()
             logger.error(f"YouTube API request failed: {str(e)}")
             raise
         except Exception as e:
@@ -812,98 +1391,117 @@ class YouTubeScraper(BaseScraper):
             raise
     
     def _get_video_details(self, video_id):
-        #Get detailed information about a video
-        try:
-            # Get video details from the API
-            video_response = self.youtube.videos().list(
-                part='snippet,contentDetails,statistics',
-                id=video_id
-            ).execute()
-            
-            if not video_response['items']:
-                logger.warning(f"No details found for video ID: {video_id}")
-                return None
-            
-            # Extract the video information
-            video_info = video_response['items'][0]
-            snippet = video_info['snippet']
-            statistics = video_info.get('statistics', {})
-            
-            # Get best available thumbnail
-            thumbnails = snippet.get('thumbnails', {})
-            thumbnail_url = ''
-            # Try to get the highest quality thumbnail
-            for quality in ['maxres', 'high', 'medium', 'standard', 'default']:
-                if quality in thumbnails:
-                    thumbnail_url = thumbnails[quality]['url']
-                    break
-            
-            # Clean text fields to avoid encoding issues
-            title = self._clean_text(snippet.get('title', ''))
-            description = self._clean_text(snippet.get('description', ''))
-            channel_title = self._clean_text(snippet.get('channelTitle', ''))
-            
-            # Extract hashtags from description
-            hashtags = re.findall(r'#(\w+)', description)
-            
-            # Remove hashtags from description
-            description = re.sub(r'#\w+\s*', '', description).strip()
-            # Clean up any double spaces created by hashtag removal
-            description = ' '.join(description.split())
-            
-            # Format the data similar to Instagram scraper format to make the appending process easier
-            video_data = {
-                'post_id': video_id,
-                'platform': 'youtube',
-                'post_text': f"{title}\n\n{description}",
-                'hashtags': ','.join(hashtags),
-                'timestamp': snippet.get('publishedAt', ''),
-                'image_url': thumbnail_url,
-                'likes': statistics.get('likeCount', ''),
-                'comments': statistics.get('commentCount', ''),
-                'author': channel_title,
-                'view_count': statistics.get('viewCount', ''),
-                'duration': video_info.get('contentDetails', {}).get('duration', ''),
-                'channel_id': snippet.get('channelId', ''),
-                'url': f"https://www.youtube.com/watch?v={video_id}",
-                'scraped_at': datetime.now().isoformat()
-            }
-            
-            return video_data
-            
-        except HttpError as e:
-            logger.warning(f"API error getting video details for {video_id}: {str(e)}")
-            return None
-        except Exception as e:
-            logger.warning(f"Error getting video details for {video_id}: {str(e)}")
-            return None
+        #Get detailed information about a single video
+        details, _ = self._get_video_details_batch([video_id])
+        return details.get(video_id)
 
-    def _clean_text(self, text):
-        #Clean and normalize text to avoid encoding issues
-        if not text:
-            return ""
+    def _get_video_details_batch(self, video_ids):
+        """
+        Get detailed information for many videos using one videos().list call per 50 IDs
+        
+        Videos are cached individually, so only IDs without a fresh cached entry are requested.
+        Cached videos keep the time they were fetched as scraped_at, since their statistics
+        are only as fresh as that fetch.
+        
+        Args:
+            video_ids: List of YouTube video IDs
             
-        # Replace problematic characters
-        text = text.replace('\u2122', '™')  
-        text = text.replace('\u00a9', '©') 
-        text = text.replace('\u00ae', '®') 
+        Returns:
+            Tuple of (dict mapping video ID to video data, list of IDs that returned no details)
+        """
+        from googleapiclient.errors import HttpError
+        details = {}
+        part = 'snippet,contentDetails,statistics'
         
-        # Replace other common special characters
-        text = text.replace('\u2018', "'")  
-        text = text.replace('\u2019', "'")  
-        text = text.replace('\u201c', '"') 
-        text = text.replace('\u201d', '"') 
-        text = text.replace('\u2013', '-') 
-        text = text.replace('\u2014', '--')  
+        # Serve cached videos first
+        uncached_ids = []
+        for video_id in video_ids:
+            cached = self.cache.get('videos.list', {'part': part, 'id': video_id})
+            if cached is None:
+                uncached_ids.append(video_id)
+                continue
+            try:
+                details[video_id] = self._build_video_data(cached['item'], cached['fetched_at'])
+            except Exception as e:
+                logger.warning(f"Error parsing cached video details for {video_id}: {str(e)}")
+                uncached_ids.append(video_id)
         
-        # Remove zero-width spaces and other invisible characters
-        text = text.replace('\u200b', '')  
-        text = text.replace('\ufeff', '') 
+        for start in range(0, len(uncached_ids), YOUTUBE_MAX_IDS_PER_REQUEST):
+            chunk = uncached_ids[start:start + YOUTUBE_MAX_IDS_PER_REQUEST]
+            try:
+                # Get video details for the whole chunk from the API
+                video_response = self.quota.execute(
+                    'videos.list',
+                    lambda youtube: youtube.videos().list(
+                        part=part,
+                        id=','.join(chunk)
+                    )
+                )
+                
+                fetched_at = datetime.now().isoformat()
+                for video_info in video_response.get('items', []):
+                    try:
+                        details[video_info['id']] = self._build_video_data(video_info, fetched_at)
+                        self.cache.put('videos.list', {'part': part, 'id': video_info['id']},
+                                       {'item': video_info, 'fetched_at': fetched_at})
+                    except Exception as e:
+                        logger.warning(f"Error parsing video details for {video_info.get('id')}: {str(e)}")
+                        
+            except QuotaExhaustedError:
+                raise
+            except HttpError as e:
+                logger.warning(f"API error getting video details for {len(chunk)} videos: {str(e)}")
+                if e.resp.status in [403, 429]:
+                    self.pacer.record_rate_limit()
+            except Exception as e:
+                logger.warning(f"Error getting video details for {len(chunk)} videos: {str(e)}")
         
-        # Normalize whitespace
-        text = ' '.join(text.split())
+        # Flag any IDs the API did not return
+        missing_ids = [video_id for video_id in video_ids if video_id not in details]
+        for video_id in missing_ids:
+            logger.warning(f"No details found for video ID: {video_id}")
         
-        return text
+        return details, missing_ids
+
+    def _build_video_data(self, video_info, scraped_at=None):
+        #Convert a videos().list item, fetched at scraped_at (default now), into a row dictionary
+        video_id = video_info['id']
+        snippet = video_info['snippet']
+        statistics = video_info.get('statistics', {})
+        
+        # Get best available thumbnail
+        thumbnails = snippet.get('thumbnails', {})
+        thumbnail_url = ''
+        # Try to get the highest quality thumbnail
+        for quality in ['maxres', 'high', 'medium', 'standard', 'default']:
+            if quality in thumbnails:
+                thumbnail_url = thumbnails[quality]['url']
+                break
+        
+        # Clean text fields to avoid encoding issues
+        title = clean_text(snippet.get('title', ''))
+        channel_title = clean_text(snippet.get('channelTitle', ''))
+        
+        # Clean the description and extract its hashtags in one pass
+        description, hashtags = extract_hashtags(snippet.get('description', ''))
+        
+        # Format the data similar to Instagram scraper format to make the appending process easier
+        return {
+            'post_id': video_id,
+            'platform': 'youtube',
+            'post_text': f"{title}\n\n{description}",
+            'hashtags': ','.join(hashtags),
+            'timestamp': snippet.get('publishedAt', ''),
+            'image_url': thumbnail_url,
+            'likes': statistics.get('likeCount', ''),
+            'comments': statistics.get('commentCount', ''),
+            'author': channel_title,
+            'view_count': statistics.get('viewCount', ''),
+            'duration': video_info.get('contentDetails', {}).get('duration', ''),
+            'channel_id': snippet.get('channelId', ''),
+            'url': f"https://www.youtube.com/watch?v={video_id}",
+            'scraped_at': scraped_at or datetime.now().isoformat()
+        }
 
     @classmethod
     def _execute_scrape(cls, query, limit):
@@ -917,9 +1515,27 @@ class YouTubeScraper(BaseScraper):
         Returns:
             List of video data dictionaries or empty list if scraping fails
         """
+        return list(cls._execute_stream(query, limit))
+
+    @classmethod
+    def _execute_stream(cls, query, limit, checkpoint=None):
+        """
+        YouTube-specific implementation of the stream method
+        
+        Args:
+            query: Search terms to find videos
+            limit: Maximum number of videos to retrieve
+            checkpoint: Optional ScrapeCheckpoint to resume from and record progress in
+            
+        Yields:
+            Video data dictionaries as they are retrieved
+        """
         # Initialize the scraper with API key from config
         scraper = cls()
         
-        # Search for videos and collect data
-        videos_data = scraper.search_videos(query, limit)
-        return videos_data 
\ No newline at end of file
+        try:
+            # Search for videos and yield data as it arrives
+            yield from scraper.iter_videos(query, limit, checkpoint)
+        finally:
+            # Wait for queued thumbnails to finish downloading
+            scraper.thumbnails.close() 
\ No newline at end of file
@@ -0,0 +1,881 @@
+import os
+import io
+import csv
+import uuid
+import sqlite3
+import json
+import threading
+from datetime import datetime, timezone
+
+# Configure logging
+import logging
+logger = logging.getLogger(__name__)
+
+# Stable column order for metadata.csv. Instagram rows leave the YouTube-only columns empty.
+METADATA_COLUMNS = [
+    'post_id', 'platform', 'post_text', 'hashtags', 'timestamp', 'image_url',
+    'likes', 'comments', 'author', 'view_count', 'duration', 'channel_id',
+    'url', 'scraped_at'
+]
+
+# Columns stored as integers in typed (Parquet) output; empty or hidden counts become null
+INTEGER_COLUMNS = ('likes', 'comments', 'view_count')
+# Columns stored as UTC timestamps in typed output
+TIMESTAMP_COLUMNS = ('timestamp', 'scraped_at')
+
+def _fsync_dir(directory):
+    #Flush a directory entry so a created or renamed file survives a crash
+    if not hasattr(os, 'O_DIRECTORY'):
+        return  # Not supported on Windows
+    fd = os.open(directory or '.', os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+class MetadataCSVWriter:
+    """
+    Append-only writer for metadata.csv.
+    Only the header line of an existing file is read; new rows are appended in a single
+    fsynced write and the file is truncated back if the write fails, so a save never
+    re-reads or rewrites the existing history.
+    """
+
+    def __init__(self, filename='metadata.csv', columns=None):
+        self.filename = filename
+        self.location = filename
+        self.columns = list(columns or METADATA_COLUMNS)
+
+    def exists(self):
+        return self.read_header() is not None
+
+    def read_header(self):
+        #Read only the header row of the existing file, or None if there is no file yet
+        if not os.path.exists(self.filename) or os.path.getsize(self.filename) == 0:
+            return None
+        with open(self.filename, 'r', newline='', encoding='utf-8') as f:
+            return next(csv.reader(f), None)
+
+    def _header_for(self, rows):
+        #Stable columns first, then any unexpected keys in first-seen order
+        header = list(self.columns)
+        for row in rows:
+            for key in row:
+                if key not in header:
+                    header.append(key)
+        return header
+
+    def _serialize(self, rows, header, include_header=False):
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=header, restval='', extrasaction='ignore')
+        if include_header:
+            writer.writeheader()
+        writer.writerows(rows)
+        return buffer.getvalue().encode('utf-8')
+
+    def append(self, rows):
+        """
+        Append rows to the CSV file, creating it with a header if needed
+
+        Args:
+            rows: List of post data dictionaries from either platform
+
+        Returns:
+            Number of rows written
+        """
+        if not rows:
+            return 0
+
+        header = self.read_header()
+        if header is None:
+            self._replace_with(self._serialize(rows, self._header_for(rows), include_header=True))
+            return len(rows)
+
+        missing_columns = [c for c in self._header_for(rows) if c not in header]
+        if missing_columns:
+            # One-time migration of an older file whose header lacks some columns
+            logger.info(f"Adding columns {missing_columns} to {self.filename}")
+            self._rewrite_with_header(header + missing_columns, rows)
+            return len(rows)
+
+        data = self._serialize(rows, header)
+        with open(self.filename, 'r+b') as f:
+            f.seek(0, os.SEEK_END)
+            original_size = f.tell()
+
+            # Make sure a previous writer left the file ending on a row boundary
+            f.seek(original_size - 1)
+            if f.read(1) != b'\n':
+                data = b'\r\n' + data
+
+            try:
+                f.seek(original_size)
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            except Exception:
+                # Roll back a partial append so the file never ends mid-row
+                f.truncate(original_size)
+                f.flush()
+                os.fsync(f.fileno())
+                raise
+
+        return len(rows)
+
+    def iter_rows(self, platform=None):
+        #Stream saved rows, optionally only those of one platform, without loading the file
+        if not self.exists():
+            return
+        with open(self.filename, 'r', newline='', encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                if platform is None or row.get('platform') == platform:
+                    yield row
+
+    def _replace_with(self, data):
+        #Atomically create or replace the file with the given contents
+        temp_path = f"{self.filename}.tmp"
+        with open(temp_path, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self.filename)
+        _fsync_dir(os.path.dirname(os.path.abspath(self.filename)))
+
+    def _rewrite_with_header(self, header, rows):
+        #Stream the existing rows into a new file with a wider header, then append the new rows
+        temp_path = f"{self.filename}.tmp"
+        with open(self.filename, 'r', newline='', encoding='utf-8') as src, \
+                open(temp_path, 'w', newline='', encoding='utf-8') as dst:
+            writer = csv.DictWriter(dst, fieldnames=header, restval='', extrasaction='ignore')
+            writer.writeheader()
+            writer.writerows(csv.DictReader(src))
+            writer.writerows(rows)
+            dst.flush()
+            os.fsync(dst.fileno())
+        os.replace(temp_path, self.filename)
+        _fsync_dir(os.path.dirname(os.path.abspath(self.filename)))
+
+def _to_int(value):
+    #Parse a count such as "1,234" into an int, or None if it is missing or hidden
+    if isinstance(value, int):
+        return value
+    value = str(value or '').replace(',', '').strip()
+    return int(value) if value.isdigit() else None
+
+def _to_timestamp(value):
+    #Parse an ISO 8601 string into a UTC datetime; naive values are taken as local time
+    if isinstance(value, datetime):
+        parsed = value
+    else:
+        try:
+            parsed = datetime.fromisoformat(str(value or '').strip().replace('Z', '+00:00'))
+        except ValueError:
+            return None
+    return parsed.astimezone(timezone.utc)
+
+class PartitionedParquetWriter:
+    """
+    Append-only Parquet dataset partitioned by platform and scrape date.
+    Each append writes new part files under platform=<platform>/date=<YYYY-MM-DD>/ with
+    typed columns (integer counts, UTC timestamps, hashtag lists), so existing files are
+    never rewritten and readers such as pyarrow.dataset or pandas.read_parquet can prune
+    partitions instead of parsing the whole history.
+    """
+
+    def __init__(self, directory='metadata_parquet'):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise ImportError("Parquet output requires pyarrow: pip install pyarrow") from e
+
+        self.pa = pa
+        self.pq = pq
+        self.directory = directory
+        self.location = directory
+        self.schema = pa.schema([
+            ('post_id', pa.string()),
+            ('post_text', pa.string()),
+            ('hashtags', pa.list_(pa.string())),
+            ('timestamp', pa.timestamp('us', tz='UTC')),
+            ('image_url', pa.string()),
+            ('likes', pa.int64()),
+            ('comments', pa.int64()),
+            ('author', pa.string()),
+            ('view_count', pa.int64()),
+            ('duration', pa.string()),
+            ('channel_id', pa.string()),
+            ('url', pa.string()),
+            ('scraped_at', pa.timestamp('us', tz='UTC')),
+            ('image_phash', pa.string())
+        ])
+
+    def exists(self):
+        return os.path.isdir(self.directory)
+
+    def _typed_row(self, row):
+        #Convert a post data dictionary into values matching the schema
+        typed = {}
+        for name in self.schema.names:
+            value = row.get(name)
+            if name in INTEGER_COLUMNS:
+                value = _to_int(value)
+            elif name in TIMESTAMP_COLUMNS:
+                value = _to_timestamp(value)
+            elif name == 'hashtags':
+                value = [tag for tag in str(value or '').split(',') if tag]
+            else:
+                value = '' if value is None else str(value)
+            typed[name] = value
+        return typed
+
+    def iter_rows(self, platform=None):
+        #Stream saved rows with typed values, reading only the partitions of one platform if given
+        if not self.exists():
+            return
+        import pyarrow.dataset as ds
+        dataset = ds.dataset(self.directory, format='parquet', partitioning='hive')
+        row_filter = ds.field('platform') == platform if platform else None
+        for batch in dataset.to_batches(filter=row_filter):
+            yield from batch.to_pylist()
+
+    def _partition_for(self, row):
+        #Partition by platform and the local date the row was scraped
+        scraped_at = str(row.get('scraped_at') or '')[:10] or datetime.now().strftime('%Y-%m-%d')
+        return os.path.join(self.directory, f"platform={row['platform']}", f"date={scraped_at}")
+
+    def append(self, rows):
+        """
+        Write rows as new part files, one per platform and scrape date
+        
+        Args:
+            rows: List of post data dictionaries from either platform
+            
+        Returns:
+            Number of rows written
+        """
+        if not rows:
+            return 0
+
+        partitions = {}
+        for row in rows:
+            partitions.setdefault(self._partition_for(row), []).append(self._typed_row(row))
+
+        for partition, typed_rows in partitions.items():
+            os.makedirs(partition, exist_ok=True)
+            table = self.pa.Table.from_pylist(typed_rows, schema=self.schema)
+
+            # Write under a temporary name so readers never see a partial part file
+            part_name = f"part-{datetime.now().strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}.parquet"
+            temp_path = os.path.join(partition, f".{part_name}.tmp")
+            self.pq.write_table(table, temp_path, compression='zstd')
+            os.replace(temp_path, os.path.join(partition, part_name))
+            _fsync_dir(partition)
+
+        return len(rows)
+
+# Output backends selectable with --format, with their default locations
+OUTPUT_FORMATS = {
+    'csv': (MetadataCSVWriter, 'metadata.csv'),
+    'parquet': (PartitionedParquetWriter, 'metadata_parquet')
+}
+
+def open_writer(output_format='csv', path=None):
+    #Create the writer for an output format, at its default location unless a path is given
+    writer_class, default_path = OUTPUT_FORMATS[output_format]
+    return writer_class(path or default_path)
+
+class PostIndex:
+    """
+    Persistent index of already-saved posts keyed by (platform, post_id).
+    Backed by a SQLite primary key, so lookups stay fast at millions of entries and the
+    scrapers can skip known posts before any API call or modal click.
+    """
+
+    # SQLite limits the number of bound parameters per statement
+    LOOKUP_CHUNK_SIZE = 500
+
+    def __init__(self, path='post_index.db'):
+        self.path = path
+        self.created = not os.path.exists(path)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS posts (
+                platform TEXT NOT NULL,
+                post_id TEXT NOT NULL,
+                added_at TEXT NOT NULL,
+                PRIMARY KEY (platform, post_id)
+            ) WITHOUT ROWID
+            """
+        )
+        self.conn.commit()
+
+    def contains(self, platform, post_id):
+        #Check whether a single post is already indexed
+        row = self.conn.execute(
+            "SELECT 1 FROM posts WHERE platform = ? AND post_id = ?",
+            (platform, post_id)
+        ).fetchone()
+        return row is not None
+
+    def filter_new(self, platform, post_ids):
+        #Return the post IDs that are not indexed yet, keeping their original order
+        known = set()
+        post_ids = list(post_ids)
+        for start in range(0, len(post_ids), self.LOOKUP_CHUNK_SIZE):
+            chunk = post_ids[start:start + self.LOOKUP_CHUNK_SIZE]
+            placeholders = ','.join('?' * len(chunk))
+            rows = self.conn.execute(
+                f"SELECT post_id FROM posts WHERE platform = ? AND post_id IN ({placeholders})",
+                [platform] + chunk
+            )
+            known.update(row[0] for row in rows)
+        return [post_id for post_id in post_ids if post_id not in known]
+
+    def add_rows(self, rows):
+        #Record the (platform, post_id) of committed rows, ignoring ones already indexed
+        added_at = datetime.now().isoformat()
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO posts (platform, post_id, added_at) VALUES (?, ?, ?)",
+                [(row['platform'], str(row['post_id']), added_at) for row in rows]
+            )
+
+    def filter_new_rows(self, rows):
+        #Drop rows that are already indexed or repeated within the batch
+        new_rows = []
+        seen = set()
+        by_platform = {}
+        for row in rows:
+            by_platform.setdefault(row['platform'], []).append(str(row['post_id']))
+        new_ids = {
+            platform: set(self.filter_new(platform, post_ids))
+            for platform, post_ids in by_platform.items()
+        }
+        for row in rows:
+            key = (row['platform'], str(row['post_id']))
+            if key[1] in new_ids[key[0]] and key not in seen:
+                seen.add(key)
+                new_rows.append(row)
+        return new_rows
+
+    def backfill(self, rows, batch_size=10000):
+        #Index every post read back from an existing output, committing in batches
+        count = 0
+        batch = []
+        for row in rows:
+            if row.get('platform') and row.get('post_id'):
+                batch.append(row)
+            if len(batch) >= batch_size:
+                self.add_rows(batch)
+                count += len(batch)
+                batch = []
+        if batch:
+            self.add_rows(batch)
+            count += len(batch)
+        logger.info(f"Indexed {count} existing posts into {self.path}")
+        return count
+
+    def close(self):
+        self.conn.close()
+
+# Counts re-polled by refresh mode, in the order they are stored
+ENGAGEMENT_COLUMNS = ('likes', 'comments', 'view_count')
+
+class EngagementHistory:
+    """
+    Time series of engagement counts for saved posts, one row per post per poll.
+    Each poll stores the counts and their change since the previous poll (or since the saved
+    row, for a post's first poll), so refreshing never adds duplicate rows to the output and
+    growth over time can be read straight from the deltas.
+    """
+
+    def __init__(self, path='engagement_history.db'):
+        self.path = path
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS engagement (
+                platform TEXT NOT NULL,
+                post_id TEXT NOT NULL,
+                polled_at TEXT NOT NULL,
+                likes INTEGER,
+                comments INTEGER,
+                view_count INTEGER,
+                likes_delta INTEGER,
+                comments_delta INTEGER,
+                view_count_delta INTEGER,
+                PRIMARY KEY (platform, post_id, polled_at)
+            ) WITHOUT ROWID
+            """
+        )
+        self.conn.commit()
+
+    def latest(self, platform):
+        #Most recent poll of every post of a platform, as {post_id: {'polled_at': ..., 'likes': ..., ...}}
+        rows = self.conn.execute(
+            "SELECT post_id, MAX(polled_at), likes, comments, view_count FROM engagement "
+            "WHERE platform = ? GROUP BY post_id",
+            (platform,)
+        )
+        return {
+            row[0]: dict(zip(('polled_at',) + ENGAGEMENT_COLUMNS, row[1:]))
+            for row in rows
+        }
+
+    def select_stale(self, platform, saved_rows, max_age):
+        """
+        Pick the posts whose counts are older than max_age, oldest first
+
+        Args:
+            platform: Platform of the posts
+            saved_rows: Saved rows of that platform, e.g. from a writer's iter_rows()
+            max_age: timedelta after which counts are considered stale
+
+        Returns:
+            List of (post_id, previous counts) tuples; the previous counts are the latest poll,
+            or the newest saved row for posts that were never polled
+        """
+        cutoff = datetime.now(timezone.utc) - max_age
+        polled = self.latest(platform)
+        candidates = {}
+        for row in saved_rows:
+            post_id = str(row.get('post_id') or '')
+            if not post_id or post_id in polled:
+                continue
+            scraped_at = _to_timestamp(row.get('scraped_at'))
+            if scraped_at is None:
+                continue
+            previous = candidates.get(post_id)
+            if previous is None or scraped_at > previous[0]:
+                candidates[post_id] = (scraped_at, {name: _to_int(row.get(name)) for name in ENGAGEMENT_COLUMNS})
+
+        for post_id, poll in polled.items():
+            candidates[post_id] = (_to_timestamp(poll['polled_at']), {name: poll[name] for name in ENGAGEMENT_COLUMNS})
+
+        stale = [(checked_at, post_id, counts) for post_id, (checked_at, counts) in candidates.items()
+                 if checked_at is not None and checked_at < cutoff]
+        stale.sort(key=lambda item: item[0])
+        return [(post_id, counts) for _, post_id, counts in stale]
+
+    def record(self, platform, polls, previous):
+        """
+        Store one poll of each post with its change since the previous counts
+
+        Args:
+            platform: Platform of the posts
+            polls: List of dicts with post_id and the freshly polled counts
+            previous: Dict mapping post_id to its previous counts
+
+        Returns:
+            List of the stored rows, with *_delta values (None where either count is hidden)
+        """
+        polled_at = datetime.now().isoformat()
+        stored = []
+        for poll in polls:
+            row = {'post_id': str(poll['post_id']), 'polled_at': polled_at}
+            before = previous.get(row['post_id'], {})
+            for name in ENGAGEMENT_COLUMNS:
+                value = _to_int(poll.get(name))
+                old = before.get(name)
+                row[name] = value
+                row[f"{name}_delta"] = value - old if value is not None and old is not None else None
+            stored.append(row)
+
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO engagement (platform, post_id, polled_at, likes, comments, view_count, "
+                "likes_delta, comments_delta, view_count_delta) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (platform, row['post_id'], row['polled_at'], row['likes'], row['comments'], row['view_count'],
+                     row['likes_delta'], row['comments_delta'], row['view_count_delta'])
+                    for row in stored
+                ]
+            )
+        return stored
+
+    def close(self):
+        self.conn.close()
+
+def _utc_text(value):
+    #Normalize a timestamp to sortable UTC text such as 2024-05-01T18:42:07Z, or None if unparseable
+    parsed = _to_timestamp(value)
+    return parsed.strftime('%Y-%m-%dT%H:%M:%SZ') if parsed else None
+
+def _time_bound(value):
+    #A since/until argument as UTC text, rejecting values that are not ISO 8601
+    bound = _utc_text(value)
+    if bound is None:
+        raise ValueError(f"Invalid timestamp '{value}', expected an ISO 8601 date or datetime")
+    return bound
+
+def _fts_query(text):
+    '''Quote each word so user input is matched as plain terms, all of which must appear
+    Words without a letter or digit are never indexed, so text made only of those is rejected'''
+    terms = [term.replace('"', '""') for term in str(text).split() if any(char.isalnum() for char in term)]
+    if not terms:
+        raise ValueError(f"Text search needs at least one word, got {text!r}")
+    return ' '.join(f'"{term}"' for term in terms)
+
+class MetadataStore:
+    """
+    Queryable SQLite copy of the saved rows, filled by the save path next to the output.
+    Posts are indexed by platform, author, channel and timestamp, hashtags get their own
+    lookup table, and post_text has an FTS5 full-text index, so hashtag, author, time-range
+    and text lookups never scan the whole history. Timestamps are stored as UTC text.
+    """
+
+    # Order choices for query(); relevance needs a text search
+    ORDERS = {
+        'newest': 'posts.timestamp DESC',
+        'oldest': 'posts.timestamp ASC',
+        'likes': 'posts.likes DESC',
+        'views': 'posts.view_count DESC',
+        'relevance': 'posts_fts.rank'
+    }
+
+    def __init__(self, path='metadata.db'):
+        self.path = path
+        self.created = not os.path.exists(path)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS posts (
+                id INTEGER PRIMARY KEY,
+                platform TEXT NOT NULL,
+                post_id TEXT NOT NULL,
+                post_text TEXT,
+                hashtags TEXT,
+                timestamp TEXT,
+                image_url TEXT,
+                likes INTEGER,
+                comments INTEGER,
+                author TEXT,
+                view_count INTEGER,
+                duration TEXT,
+                channel_id TEXT,
+                url TEXT,
+                scraped_at TEXT,
+                image_phash TEXT,
+                UNIQUE (platform, post_id)
+            );
+            CREATE INDEX IF NOT EXISTS posts_platform_timestamp ON posts (platform, timestamp);
+            CREATE INDEX IF NOT EXISTS posts_timestamp ON posts (timestamp);
+            CREATE INDEX IF NOT EXISTS posts_author ON posts (author COLLATE NOCASE, timestamp);
+            CREATE INDEX IF NOT EXISTS posts_channel_id ON posts (channel_id, timestamp);
+
+            CREATE TABLE IF NOT EXISTS post_hashtags (
+                hashtag TEXT NOT NULL,
+                timestamp TEXT NOT NULL,
+                post_rowid INTEGER NOT NULL,
+                PRIMARY KEY (hashtag, timestamp, post_rowid)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS post_hashtags_post ON post_hashtags (post_rowid);
+
+            CREATE VIRTUAL TABLE IF NOT EXISTS posts_fts USING fts5(
+                post_text, content='posts', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+            );
+            CREATE TRIGGER IF NOT EXISTS posts_fts_insert AFTER INSERT ON posts BEGIN
+                INSERT INTO posts_fts (rowid, post_text) VALUES (new.id, new.post_text);
+            END;
+            CREATE TRIGGER IF NOT EXISTS posts_fts_delete AFTER DELETE ON posts BEGIN
+                INSERT INTO posts_fts (posts_fts, rowid, post_text) VALUES ('delete', old.id, old.post_text);
+            END;
+            CREATE TRIGGER IF NOT EXISTS posts_fts_update AFTER UPDATE OF post_text ON posts BEGIN
+                INSERT INTO posts_fts (posts_fts, rowid, post_text) VALUES ('delete', old.id, old.post_text);
+                INSERT INTO posts_fts (rowid, post_text) VALUES (new.id, new.post_text);
+            END;
+            """
+        )
+        self.conn.commit()
+
+    def _values(self, row):
+        #Column values of a row from either platform or output format, with typed counts and UTC timestamps
+        hashtags = row.get('hashtags') or ''
+        if isinstance(hashtags, (list, tuple)):
+            hashtags = ','.join(hashtags)
+        values = {name: '' if row.get(name) is None else str(row.get(name))
+                  for name in ('post_text', 'image_url', 'author', 'duration', 'channel_id', 'url', 'image_phash')}
+        values.update({name: _to_int(row.get(name)) for name in INTEGER_COLUMNS})
+        values.update({name: _utc_text(row.get(name)) for name in TIMESTAMP_COLUMNS})
+        values.update(platform=str(row['platform']), post_id=str(row['post_id']), hashtags=hashtags)
+        return values
+
+    def add_rows(self, rows):
+        """
+        Insert or update saved rows, keeping the hashtag and full-text indexes in step
+
+        Args:
+            rows: Post data dictionaries, as saved, or as read back from either output format
+
+        Returns:
+            Number of rows stored
+        """
+        count = 0
+        with self.conn:
+            for row in rows:
+                if not row.get('platform') or not row.get('post_id'):
+                    continue
+                values = self._values(row)
+                existing = self.conn.execute(
+                    "SELECT id FROM posts WHERE platform = ? AND post_id = ?", (values['platform'], values['post_id'])
+                ).fetchone()
+                if existing is None:
+                    # New post, the common case: one insert, and nothing to clean up
+                    post_rowid = self.conn.execute(
+                        """
+                        INSERT INTO posts (platform, post_id, post_text, hashtags, timestamp, image_url, likes,
+                                           comments, author, view_count, duration, channel_id, url, scraped_at,
+                                           image_phash)
+                        VALUES (:platform, :post_id, :post_text, :hashtags, :timestamp, :image_url, :likes,
+                                :comments, :author, :view_count, :duration, :channel_id, :url, :scraped_at,
+                                :image_phash)
+                        """,
+                        values
+                    ).lastrowid
+                else:
+                    post_rowid = existing[0]
+                    self.conn.execute(
+                        """
+                        UPDATE posts SET post_text = :post_text, hashtags = :hashtags, timestamp = :timestamp,
+                            image_url = :image_url, likes = :likes, comments = :comments, author = :author,
+                            view_count = :view_count, duration = :duration, channel_id = :channel_id, url = :url,
+                            scraped_at = :scraped_at, image_phash = :image_phash
+                        WHERE id = :id
+                        """,
+                        dict(values, id=post_rowid)
+                    )
+                    self.conn.execute("DELETE FROM post_hashtags WHERE post_rowid = ?", (post_rowid,))
+                tags = {tag.strip().lstrip('#').lower() for tag in values['hashtags'].split(',')}
+                self.conn.executemany(
+                    "INSERT OR IGNORE INTO post_hashtags (hashtag, timestamp, post_rowid) VALUES (?, ?, ?)",
+                    [(tag, values['timestamp'] or '', post_rowid) for tag in tags if tag]
+                )
+                count += 1
+        return count
+
+    def backfill(self, rows, batch_size=10000):
+        #Store rows read back from an existing output, committing in batches
+        count = 0
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= batch_size:
+                count += self.add_rows(batch)
+                batch = []
+        count += self.add_rows(batch)
+        logger.info(f"Indexed {count} saved posts into {self.path}")
+        return count
+
+    def query(self, text=None, hashtag=None, author=None, channel_id=None, platform=None,
+              since=None, until=None, order='newest', limit=100):
+        """
+        Look up saved posts; every given filter must match
+
+        Args:
+            text: Words that must all appear in post_text (full-text search)
+            hashtag: Hashtag, with or without '#', matched case-insensitively
+            author: Author or channel name, matched case-insensitively
+            channel_id: YouTube channel ID
+            platform: 'instagram' or 'youtube'
+            since: Earliest post timestamp, inclusive (ISO 8601 date or datetime; naive values are local time)
+            until: Latest post timestamp, exclusive
+            order: One of ORDERS; 'relevance' requires text
+            limit: Maximum number of rows, or None for all
+
+        Returns:
+            List of row dictionaries, newest first by default
+        """
+        if order not in self.ORDERS:
+            raise ValueError(f"Unknown order '{order}', expected one of {', '.join(self.ORDERS)}")
+        if order == 'relevance' and not text:
+            raise ValueError("Ordering by relevance requires a text search")
+
+        joins = []
+        conditions = []
+        parameters = []
+        if hashtag:
+            # The hashtag table is keyed by (hashtag, timestamp), so date ranges are resolved from it too
+            joins.append("JOIN post_hashtags ON post_hashtags.post_rowid = posts.id")
+            conditions.append("post_hashtags.hashtag = ?")
+            parameters.append(hashtag.strip().lstrip('#').lower())
+        if text:
+            joins.append("JOIN posts_fts ON posts_fts.rowid = posts.id")
+            conditions.append("posts_fts MATCH ?")
+            parameters.append(_fts_query(text))
+        if author:
+            conditions.append("posts.author = ? COLLATE NOCASE")
+            parameters.append(author)
+        if channel_id:
+            conditions.append("posts.channel_id = ?")
+            parameters.append(channel_id)
+        if platform:
+            conditions.append("posts.platform = ?")
+            parameters.append(platform)
+        time_column = 'post_hashtags.timestamp' if hashtag else 'posts.timestamp'
+        for value, operator in ((since, '>='), (until, '<')):
+            if value:
+                conditions.append(f"{time_column} {operator} ?")
+                parameters.append(_time_bound(value))
+
+        sql = "SELECT posts.* FROM posts " + ' '.join(joins)
+        if conditions:
+            sql += " WHERE " + ' AND '.join(conditions)
+        order_by = self.ORDERS[order]
+        if hashtag and order in ('newest', 'oldest'):
+            # Same order, read straight from the (hashtag, timestamp) key instead of sorting the matches
+            order_by = order_by.replace('posts.timestamp', 'post_hashtags.timestamp')
+        sql += f" ORDER BY {order_by}"
+        if limit is not None:
+            sql += " LIMIT ?"
+            parameters.append(int(limit))
+
+        rows = self.conn.execute(sql, parameters).fetchall()
+        return [{name: row[name] for name in row.keys() if name != 'id'} for row in rows]
+
+    def top_hashtags(self, platform=None, since=None, until=None, limit=20):
+        #Most used hashtags in a time range, as (hashtag, post count) pairs
+        conditions = []
+        parameters = []
+        for value, operator in ((since, '>='), (until, '<')):
+            if value:
+                conditions.append(f"post_hashtags.timestamp {operator} ?")
+                parameters.append(_time_bound(value))
+        sql = "SELECT post_hashtags.hashtag, COUNT(*) AS posts FROM post_hashtags"
+        if platform:
+            sql += " JOIN posts ON posts.id = post_hashtags.post_rowid"
+            conditions.append("posts.platform = ?")
+            parameters.append(platform)
+        if conditions:
+            sql += " WHERE " + ' AND '.join(conditions)
+        sql += " GROUP BY post_hashtags.hashtag ORDER BY posts DESC, post_hashtags.hashtag LIMIT ?"
+        parameters.append(int(limit))
+        return [tuple(row) for row in self.conn.execute(sql, parameters)]
+
+    def count(self):
+        return self.conn.execute("SELECT COUNT(*) FROM posts").fetchone()[0]
+
+    def close(self):
+        self.conn.close()
+
+class CheckpointStore:
+    """
+    Persistent scrape progress keyed by (platform, target), so an interrupted scrape can
+    resume from its last committed position instead of starting over.
+    """
+
+    def __init__(self, path='checkpoints.db'):
+        self.path = path
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS checkpoints (
+                platform TEXT NOT NULL,
+                target TEXT NOT NULL,
+                state TEXT NOT NULL,
+                updated_at TEXT NOT NULL,
+                PRIMARY KEY (platform, target)
+            )
+            """
+        )
+        self.conn.commit()
+
+    def load(self, platform, target):
+        #Return the saved state for a target, or None if there is no checkpoint
+        row = self.conn.execute(
+            "SELECT state FROM checkpoints WHERE platform = ? AND target = ?",
+            (platform, target)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def save(self, platform, target, state):
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO checkpoints (platform, target, state, updated_at) VALUES (?, ?, ?, ?)",
+                (platform, target, json.dumps(state), datetime.now().isoformat())
+            )
+
+    def clear(self, platform, target):
+        with self.conn:
+            self.conn.execute(
+                "DELETE FROM checkpoints WHERE platform = ? AND target = ?",
+                (platform, target)
+            )
+
+    def checkpoint(self, platform, target, resume=False):
+        #Open the checkpoint for a scrape, continuing saved progress only when resume is set
+        state = self.load(platform, target) if resume else None
+        if state:
+            logger.info(
+                f"Resuming {platform} '{target}' from checkpoint with "
+                f"{len(state.get('committed_ids', []))} posts already saved"
+            )
+        return ScrapeCheckpoint(self, platform, target, state)
+
+    def close(self):
+        self.conn.close()
+
+class ScrapeCheckpoint:
+    """
+    Progress of one scrape. The scraper sets its current position (a YouTube page token or
+    an Instagram scroll offset) and tracks each row it yields; the save path commits rows
+    once they are on disk. The persisted position is that of the oldest uncommitted row, so
+    resuming never skips a row that was yielded but not yet saved. The YouTube scraper
+    tracks rows on its producer thread while the event loop commits them, so the pending
+    rows and position are guarded by a lock.
+    """
+
+    def __init__(self, store, platform, target, state=None):
+        self.store = store
+        self.platform = platform
+        self.target = target
+
+        state = state or {}
+        self.position = state.get('position', {})
+        self.committed_ids = list(state.get('committed_ids', []))
+        self._pending = {}
+        self._finished = False
+        self._lock = threading.Lock()
+
+    def set_position(self, **position):
+        #Record where the scraper would resume if every yielded row were committed
+        with self._lock:
+            self.position = position
+
+    def track(self, post_id):
+        #Remember the position a row was produced at until it is committed
+        with self._lock:
+            self._pending[post_id] = dict(self.position)
+
+    def finish(self):
+        #Mark the scrape as complete; the checkpoint is cleared once all rows are committed
+        with self._lock:
+            self._finished = True
+
+    def commit(self, post_ids):
+        #Record rows that are now saved and persist the resume position
+        with self._lock:
+            for post_id in post_ids:
+                if self._pending.pop(post_id, None) is not None:
+                    self.committed_ids.append(post_id)
+
+            completed = self._finished and not self._pending
+            state = {
+                'position': next(iter(self._pending.values()), self.position),
+                'committed_ids': list(self.committed_ids)
+            }
+
+        if completed:
+            self.store.clear(self.platform, self.target)
+            return
+
+        self.store.save(self.platform, self.target, state)
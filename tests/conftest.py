@@ -0,0 +1,29 @@
+import os
+import sys
+
+import pytest
+
+# The modules live at the repository root rather than in a package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    #Run a test in an empty directory, since the stores default to files in the working directory
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+def make_row(post_id, platform='youtube', **fields):
+    #A saved row with the columns both platforms share
+    row = {
+        'post_id': post_id,
+        'platform': platform,
+        'post_text': f"post {post_id}",
+        'hashtags': '',
+        'timestamp': '2024-01-01T00:00:00Z',
+        'likes': '1',
+        'comments': '0',
+        'author': 'author',
+        'scraped_at': '2024-01-01T00:00:00'
+    }
+    row.update(fields)
+    return row
@@ -0,0 +1,84 @@
+import threading
+
+from storage import CheckpointStore
+
+def test_resume_restores_committed_rows_and_position(workdir):
+    store = CheckpointStore('checkpoints.db')
+    checkpoint = store.checkpoint('youtube', 'lofi')
+    checkpoint.set_position(page_token='page2')
+    checkpoint.track('a')
+    checkpoint.track('b')
+    checkpoint.commit(['a', 'b'])
+    store.close()
+
+    store = CheckpointStore('checkpoints.db')
+    resumed = store.checkpoint('youtube', 'lofi', resume=True)
+    assert resumed.committed_ids == ['a', 'b']
+    assert resumed.position == {'page_token': 'page2'}
+
+    # Without resume, a scrape starts over
+    assert store.checkpoint('youtube', 'lofi').committed_ids == []
+    store.close()
+
+def test_position_of_oldest_uncommitted_row_is_saved(workdir):
+    store = CheckpointStore('checkpoints.db')
+    checkpoint = store.checkpoint('youtube', 'lofi')
+    checkpoint.set_position(page_token='page1')
+    checkpoint.track('a')
+    checkpoint.set_position(page_token='page2')
+    checkpoint.track('b')
+
+    # 'a' was yielded on page1 but never saved, so resuming must start there again
+    checkpoint.commit(['b'])
+
+    resumed = store.checkpoint('youtube', 'lofi', resume=True)
+    assert resumed.committed_ids == ['b']
+    assert resumed.position == {'page_token': 'page1'}
+    store.close()
+
+def test_untracked_ids_are_not_committed(workdir):
+    store = CheckpointStore('checkpoints.db')
+    checkpoint = store.checkpoint('instagram', 'cats')
+    checkpoint.track('a')
+
+    checkpoint.commit(['a', 'never-yielded'])
+
+    assert checkpoint.committed_ids == ['a']
+    store.close()
+
+def test_finished_scrape_clears_its_checkpoint(workdir):
+    store = CheckpointStore('checkpoints.db')
+    checkpoint = store.checkpoint('youtube', 'lofi')
+    checkpoint.track('a')
+    checkpoint.finish()
+    checkpoint.commit([])
+    assert store.load('youtube', 'lofi') is not None
+
+    checkpoint.commit(['a'])
+
+    assert store.load('youtube', 'lofi') is None
+    store.close()
+
+def test_commit_while_another_thread_tracks(workdir):
+    store = CheckpointStore('checkpoints.db')
+    checkpoint = store.checkpoint('youtube', 'lofi')
+    tracked = []
+
+    def produce():
+        # The YouTube producer thread tracks rows while the event loop commits them
+        for number in range(5000):
+            checkpoint.set_position(page_token=str(number // 50))
+            checkpoint.track(str(number))
+            tracked.append(str(number))
+
+    producer = threading.Thread(target=produce)
+    producer.start()
+    committed = 0
+    while producer.is_alive() or committed < len(tracked):
+        batch = tracked[committed:committed + 25]
+        checkpoint.commit(batch)
+        committed += len(batch)
+    producer.join()
+
+    assert len(checkpoint.committed_ids) == 5000
+    store.close()
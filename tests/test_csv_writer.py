@@ -0,0 +1,90 @@
+import csv
+
+import pytest
+
+import storage
+from storage import MetadataCSVWriter, METADATA_COLUMNS
+from conftest import make_row
+
+def read_rows(filename):
+    with open(filename, 'r', newline='', encoding='utf-8') as f:
+        return list(csv.DictReader(f))
+
+def test_append_creates_file_with_stable_header(workdir):
+    writer = MetadataCSVWriter('metadata.csv')
+    assert not writer.exists()
+
+    assert writer.append([make_row('a'), make_row('b', platform='instagram')]) == 2
+
+    assert writer.read_header() == METADATA_COLUMNS
+    assert [row['post_id'] for row in read_rows('metadata.csv')] == ['a', 'b']
+
+def test_append_adds_rows_without_rewriting(workdir):
+    writer = MetadataCSVWriter('metadata.csv')
+    writer.append([make_row('a')])
+    with open('metadata.csv', 'rb') as f:
+        before = f.read()
+
+    writer.append([make_row('b'), make_row('c')])
+
+    with open('metadata.csv', 'rb') as f:
+        after = f.read()
+    assert after.startswith(before)
+    assert [row['post_id'] for row in read_rows('metadata.csv')] == ['a', 'b', 'c']
+
+def test_append_repairs_a_missing_final_newline(workdir):
+    writer = MetadataCSVWriter('metadata.csv')
+    writer.append([make_row('a')])
+    with open('metadata.csv', 'rb+') as f:
+        f.truncate(len(f.read().rstrip(b'\r\n')))
+
+    writer.append([make_row('b')])
+
+    assert [row['post_id'] for row in read_rows('metadata.csv')] == ['a', 'b']
+
+def test_failed_append_is_rolled_back(workdir, monkeypatch):
+    writer = MetadataCSVWriter('metadata.csv')
+    writer.append([make_row('a')])
+    with open('metadata.csv', 'rb') as f:
+        before = f.read()
+
+    real_fsync = storage.os.fsync
+    calls = []
+
+    def failing_fsync(fd):
+        # Fail the fsync of the appended data, then let the rollback's fsync through
+        calls.append(fd)
+        if len(calls) == 1:
+            raise OSError('disk full')
+        real_fsync(fd)
+
+    monkeypatch.setattr(storage.os, 'fsync', failing_fsync)
+    with pytest.raises(OSError):
+        writer.append([make_row('b')])
+
+    with open('metadata.csv', 'rb') as f:
+        assert f.read() == before
+
+def test_header_migration_adds_new_columns(workdir):
+    old_columns = [c for c in METADATA_COLUMNS if c not in ('duration', 'channel_id', 'url')]
+    MetadataCSVWriter('metadata.csv', columns=old_columns).append([make_row('a')])
+    assert MetadataCSVWriter('metadata.csv').read_header() == old_columns
+
+    writer = MetadataCSVWriter('metadata.csv')
+    writer.append([make_row('b', channel_id='UC1', image_phash='ff00')])
+
+    header = writer.read_header()
+    assert header[:len(old_columns)] == old_columns
+    assert {'duration', 'channel_id', 'url', 'image_phash'} <= set(header)
+    rows = read_rows('metadata.csv')
+    assert [row['post_id'] for row in rows] == ['a', 'b']
+    assert rows[0]['channel_id'] == ''
+    assert rows[1]['channel_id'] == 'UC1'
+    assert rows[1]['image_phash'] == 'ff00'
+
+def test_iter_rows_filters_by_platform(workdir):
+    writer = MetadataCSVWriter('metadata.csv')
+    writer.append([make_row('a'), make_row('b', platform='instagram'), make_row('c')])
+
+    assert [row['post_id'] for row in writer.iter_rows('youtube')] == ['a', 'c']
+    assert list(MetadataCSVWriter('missing.csv').iter_rows()) == []
@@ -0,0 +1,74 @@
+import pytest
+
+from conftest import make_row
+from storage import MetadataStore, _fts_query
+
+@pytest.fixture
+def store(workdir):
+    store = MetadataStore('metadata.db')
+    store.add_rows([
+        make_row('a', post_text="Lofi beats to study to", hashtags='#LoFi,#study', author='Chill Channel',
+                 timestamp='2024-01-01T10:00:00Z', likes='10'),
+        make_row('b', post_text="Late night lofi mix", hashtags='lofi,night', author='chill channel',
+                 timestamp='2024-02-01T10:00:00Z', likes='30'),
+        make_row('c', platform='instagram', post_text="Morning coffee", hashtags=['coffee', 'Study'],
+                 author='someone', timestamp='2024-03-01T10:00:00Z', likes='20')
+    ])
+    yield store
+    store.close()
+
+def post_ids(rows):
+    return [row['post_id'] for row in rows]
+
+def test_fts_query_quotes_each_word():
+    assert _fts_query('lofi  beats') == '"lofi" "beats"'
+    assert _fts_query('say "hi"') == '"say" """hi"""'
+    # Punctuation-only words are dropped, since they are never indexed
+    assert _fts_query('lofi - !!') == '"lofi"'
+
+@pytest.mark.parametrize('text', ['', '   ', '- !! ""'])
+def test_fts_query_needs_a_word(text):
+    with pytest.raises(ValueError):
+        _fts_query(text)
+
+def test_text_search_matches_all_words(store):
+    assert post_ids(store.query(text='lofi')) == ['b', 'a']
+    assert post_ids(store.query(text='LOFI study')) == ['a']
+    assert post_ids(store.query(text='lofi OR coffee')) == []
+    assert post_ids(store.query(text='night" (mix*')) == ['b']
+
+def test_hashtag_filter_ignores_case_and_hash(store):
+    assert post_ids(store.query(hashtag='#lofi')) == ['b', 'a']
+    assert post_ids(store.query(hashtag='STUDY', order='oldest')) == ['a', 'c']
+
+def test_author_filter_ignores_case(store):
+    assert post_ids(store.query(author='CHILL CHANNEL')) == ['b', 'a']
+
+def test_time_range_and_platform(store):
+    assert post_ids(store.query(since='2024-01-15', until='2024-03-01T10:00:00Z')) == ['b']
+    assert post_ids(store.query(hashtag='study', since='2024-02-01')) == ['c']
+    assert post_ids(store.query(platform='instagram')) == ['c']
+    with pytest.raises(ValueError):
+        store.query(since='last week')
+
+def test_orders_and_limit(store):
+    assert post_ids(store.query(order='likes')) == ['b', 'c', 'a']
+    assert post_ids(store.query(order='oldest', limit=2)) == ['a', 'b']
+    assert post_ids(store.query(text='lofi study', order='relevance')) == ['a']
+    with pytest.raises(ValueError):
+        store.query(order='relevance')
+    with pytest.raises(ValueError):
+        store.query(order='random')
+
+def test_updates_replace_indexed_text_and_hashtags(store):
+    store.add_rows([make_row('a', post_text="Rainy jazz", hashtags='jazz', timestamp='2024-01-01T10:00:00Z')])
+
+    assert store.count() == 3
+    assert post_ids(store.query(text='lofi')) == ['b']
+    assert post_ids(store.query(text='jazz')) == ['a']
+    assert post_ids(store.query(hashtag='study')) == ['c']
+
+def test_top_hashtags(store):
+    assert store.top_hashtags(limit=2) == [('lofi', 2), ('study', 2)]
+    assert store.top_hashtags(platform='instagram') == [('coffee', 1), ('study', 1)]
+    assert store.top_hashtags(since='2024-02-01', until='2024-03-01') == [('lofi', 1), ('night', 1)]
@@ -0,0 +1,52 @@
+from storage import PostIndex, MetadataCSVWriter
+from conftest import make_row
+
+def test_filter_new_keeps_order_and_drops_indexed(workdir):
+    index = PostIndex('post_index.db')
+    index.add_rows([make_row('b'), make_row('d')])
+
+    assert index.filter_new('youtube', ['a', 'b', 'c', 'd']) == ['a', 'c']
+    # Post IDs are only unique per platform
+    assert index.filter_new('instagram', ['b']) == ['b']
+    index.close()
+
+def test_filter_new_handles_more_ids_than_one_lookup(workdir):
+    index = PostIndex('post_index.db')
+    index.add_rows([make_row(str(number)) for number in range(0, 1200, 2)])
+
+    new_ids = index.filter_new('youtube', [str(number) for number in range(1200)])
+
+    assert new_ids == [str(number) for number in range(1, 1200, 2)]
+    index.close()
+
+def test_filter_new_rows_drops_duplicates_within_a_batch(workdir):
+    index = PostIndex('post_index.db')
+    index.add_rows([make_row('a')])
+
+    rows = index.filter_new_rows([make_row('a'), make_row('b'), make_row('b'), make_row('b', platform='instagram')])
+
+    assert [(row['platform'], row['post_id']) for row in rows] == [('youtube', 'b'), ('instagram', 'b')]
+    index.close()
+
+def test_index_persists_across_runs(workdir):
+    index = PostIndex('post_index.db')
+    assert index.created
+    index.add_rows([make_row('a')])
+    index.close()
+
+    reopened = PostIndex('post_index.db')
+    assert not reopened.created
+    assert reopened.contains('youtube', 'a')
+    assert not reopened.contains('youtube', 'b')
+    reopened.close()
+
+def test_backfill_from_saved_rows(workdir):
+    writer = MetadataCSVWriter('metadata.csv')
+    writer.append([make_row('a'), make_row('b', platform='instagram'), make_row('')])
+
+    index = PostIndex('post_index.db')
+    assert index.backfill(writer.iter_rows()) == 2
+
+    assert index.contains('youtube', 'a')
+    assert index.contains('instagram', 'b')
+    index.close()
@@ -0,0 +1,88 @@
+import json
+
+import httplib2
+import pytest
+from googleapiclient.errors import HttpError
+
+from quota import QuotaScheduler, QuotaExhaustedError, projected_cost
+
+class FakeRequest:
+    def __init__(self, client):
+        self.client = client
+
+    def execute(self):
+        self.client.calls += 1
+        if self.client.out_of_quota:
+            response = httplib2.Response({'status': 403})
+            response.reason = 'Forbidden'
+            content = {'error': {'errors': [{'reason': 'quotaExceeded'}], 'message': 'quota'}}
+            raise HttpError(response, json.dumps(content).encode('utf-8'))
+        return {'key': self.client.api_key}
+
+class FakeClient:
+    #Stands in for a YouTube API client; make_request gets it and returns an unexecuted request
+    def __init__(self, api_key, out_of_quota=False):
+        self.api_key = api_key
+        self.out_of_quota = out_of_quota
+        self.calls = 0
+
+def make_scheduler(api_keys, daily_budget, exhausted_keys=()):
+    clients = {}
+
+    def client_factory(api_key):
+        clients[api_key] = FakeClient(api_key, out_of_quota=api_key in exhausted_keys)
+        return clients[api_key]
+
+    scheduler = QuotaScheduler(api_keys, daily_budget=daily_budget, ledger_path='quota.db',
+                               client_factory=client_factory)
+    return scheduler, clients
+
+def search(scheduler):
+    return scheduler.execute('search.list', lambda client: FakeRequest(client))['key']
+
+def test_calls_rotate_to_the_next_key_when_one_runs_out(workdir):
+    scheduler, _ = make_scheduler(['key-a', 'key-b'], daily_budget=250)
+
+    # Each key affords two 100-unit searches
+    assert [search(scheduler) for _ in range(4)] == ['key-a', 'key-a', 'key-b', 'key-b']
+    assert scheduler.remaining() == 100
+    scheduler.close()
+
+def test_exhaustion_raises_without_calling_the_api(workdir):
+    scheduler, clients = make_scheduler(['key-a'], daily_budget=150)
+    search(scheduler)
+
+    with pytest.raises(QuotaExhaustedError):
+        search(scheduler)
+
+    assert clients['key-a'].calls == 1
+    # Cheaper calls still fit in what is left
+    assert scheduler.execute('videos.list', lambda client: FakeRequest(client)) == {'key': 'key-a'}
+    assert scheduler.report()['calls'] == {'search.list': 1, 'videos.list': 1}
+    scheduler.close()
+
+def test_key_reported_out_of_quota_by_the_api_is_skipped(workdir):
+    scheduler, clients = make_scheduler(['key-a', 'key-b'], daily_budget=10000, exhausted_keys=('key-a',))
+
+    assert search(scheduler) == 'key-b'
+    assert search(scheduler) == 'key-b'
+
+    # key-a is marked as spent for the day and not tried again
+    assert clients['key-a'].calls == 1
+    assert scheduler.remaining() == 10000 - 200
+    scheduler.close()
+
+def test_usage_is_shared_through_the_ledger(workdir):
+    first, _ = make_scheduler(['key-a'], daily_budget=250)
+    search(first)
+    first.close()
+
+    second, _ = make_scheduler(['key-a'], daily_budget=250)
+    assert second.remaining() == 150
+    assert second.can_afford(projected_cost(50))
+    assert not second.can_afford(projected_cost(100))
+    second.close()
+
+def test_scheduler_needs_a_key(workdir):
+    with pytest.raises(ValueError):
+        QuotaScheduler([], ledger_path='quota.db')
@@ -0,0 +1,80 @@
+import pytest
+
+import response_cache
+from response_cache import ResponseCache, cache_key
+
+@pytest.fixture
+def clock(monkeypatch):
+    #Controllable stand-in for time.time as seen by the cache
+    now = [1000.0]
+    monkeypatch.setattr(response_cache.time, 'time', lambda: now[0])
+    return now
+
+def params(video_id):
+    return {'part': 'snippet,statistics', 'id': video_id}
+
+def test_equivalent_requests_share_a_key():
+    assert cache_key('videos.list', {'part': 'statistics, snippet', 'id': 'a'}) == \
+        cache_key('videos.list', {'part': 'snippet,statistics', 'id': 'a', 'pageToken': None})
+    assert cache_key('videos.list', params('a')) != cache_key('search.list', params('a'))
+
+def test_entries_expire_after_their_endpoint_ttl(workdir, clock):
+    cache = ResponseCache('cache.db', ttls={'videos.list': 60, 'search.list': 10})
+    cache.put('videos.list', params('a'), {'items': ['a']})
+    cache.put('search.list', {'q': 'lofi'}, {'items': []})
+
+    clock[0] += 30
+    assert cache.get('videos.list', params('a')) == {'items': ['a']}
+    assert cache.get('search.list', {'q': 'lofi'}) is None
+
+    clock[0] += 31
+    assert cache.get('videos.list', params('a')) is None
+    assert cache.stats == {'hits': 1, 'misses': 2, 'evictions': 0}
+    cache.close()
+
+def test_expired_entries_are_purged_on_open(workdir, clock):
+    cache = ResponseCache('cache.db', ttls={'videos.list': 60})
+    cache.put('videos.list', params('a'), {'items': ['a']})
+    cache.close()
+
+    clock[0] += 61
+    cache = ResponseCache('cache.db', ttls={'videos.list': 60})
+    assert cache._size == 0
+    cache.close()
+
+def test_least_recently_used_entries_are_evicted(workdir, clock):
+    cache = ResponseCache('cache.db', max_entries=2)
+    cache.put('videos.list', params('a'), {'items': ['a']})
+    clock[0] += 1
+    cache.put('videos.list', params('b'), {'items': ['b']})
+    clock[0] += 1
+    # Reading a makes b the least recently used entry
+    cache.get('videos.list', params('a'))
+    clock[0] += 1
+    cache.put('videos.list', params('c'), {'items': ['c']})
+
+    assert cache.get('videos.list', params('b')) is None
+    assert cache.get('videos.list', params('a')) == {'items': ['a']}
+    assert cache.get('videos.list', params('c')) == {'items': ['c']}
+    assert cache.stats['evictions'] == 1
+    cache.close()
+
+def test_replacing_an_entry_does_not_evict(workdir, clock):
+    cache = ResponseCache('cache.db', max_entries=2)
+    cache.put('videos.list', params('a'), {'items': ['a']})
+    cache.put('videos.list', params('b'), {'items': ['b']})
+    cache.put('videos.list', params('a'), {'items': ['a2']})
+
+    assert cache.get('videos.list', params('a')) == {'items': ['a2']}
+    assert cache.get('videos.list', params('b')) == {'items': ['b']}
+    assert cache.stats['evictions'] == 0
+    cache.close()
+
+def test_zero_ttl_disables_caching(workdir, clock):
+    cache = ResponseCache('cache.db', ttls={'search.list': 0})
+    cache.put('search.list', {'q': 'lofi'}, {'items': []})
+
+    assert not cache.enabled('search.list')
+    assert cache.get('search.list', {'q': 'lofi'}) is None
+    assert cache.stats['misses'] == 0
+    cache.close()
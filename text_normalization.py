@@ -0,0 +1,53 @@
+import re
+
+# Typographic characters replaced with ASCII equivalents, and invisible characters removed.
+# Applied with chained str.replace, which CPython runs in C and skips quickly when a character
+# is absent; str.translate measured slower here because the table maps non-ASCII characters.
+CHARACTER_REPLACEMENTS = (
+    ('\u2018', "'"),
+    ('\u2019', "'"),
+    ('\u201c', '"'),
+    ('\u201d', '"'),
+    ('\u2013', '-'),
+    ('\u2014', '--'),
+    ('\u200b', ''),  # Zero-width space
+    ('\ufeff', '')   # Byte order mark
+)
+
+HASHTAG_PATTERN = re.compile(r'#(\w+)')
+# A hashtag plus the whitespace after it, so removing it leaves no gap
+HASHTAG_STRIP_PATTERN = re.compile(r'#\w+\s*')
+
+def _replace_characters(text):
+    # Plain ASCII text has none of the characters to replace
+    if text.isascii():
+        return text
+    for old, new in CHARACTER_REPLACEMENTS:
+        text = text.replace(old, new)
+    return text
+
+def clean_text(text):
+    #Clean and normalize text to avoid encoding issues: ASCII punctuation, no invisible characters, single spaces
+    if not text:
+        return ""
+    return ' '.join(_replace_characters(text).split())
+
+def extract_hashtags(text):
+    """
+    Clean text and move its hashtags out, normalizing whitespace only once
+
+    Args:
+        text: Raw caption or description
+
+    Returns:
+        Tuple of (cleaned text without hashtags, list of hashtags without the # sign)
+    """
+    if not text:
+        return "", []
+
+    text = _replace_characters(text)
+    hashtags = []
+    if '#' in text:
+        hashtags = HASHTAG_PATTERN.findall(text)
+        text = HASHTAG_STRIP_PATTERN.sub('', text)
+    return ' '.join(text.split()), hashtags
@@ -0,0 +1,152 @@
+import os
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+# Configure logging
+import logging
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_SIZE = (320, 180)
+PREVIEW_FORMATS = {
+    'webp': ('WEBP', 'webp'),
+    'jpeg': ('JPEG', 'jpg')
+}
+# Width and height of the grayscale grid compared by the difference hash
+HASH_SIZE = 8
+
+# Workers start lazily from a download thread while other threads hold SQLite and logging
+# locks, so they must never be forked from this process; forkserver is Unix-only
+WORKER_START_METHOD = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+
+def difference_hash(image, hash_size=HASH_SIZE):
+    #64-bit perceptual (difference) hash: compares neighbouring pixels of a tiny grayscale copy
+    from PIL import Image
+
+    small = image.convert('L').resize((hash_size + 1, hash_size), Image.Resampling.LANCZOS)
+    pixels = list(small.getdata())
+    value = 0
+    for row in range(hash_size):
+        for col in range(hash_size):
+            left = pixels[row * (hash_size + 1) + col]
+            right = pixels[row * (hash_size + 1) + col + 1]
+            value = (value << 1) | (left > right)
+    return f"{value:0{hash_size * hash_size // 4}x}"
+
+def hamming_distance(hash_a, hash_b):
+    #Number of differing bits between two hashes; small distances mean near-duplicate images
+    return bin(int(hash_a, 16) ^ int(hash_b, 16)).count('1')
+
+def process_image(source_path, preview_path, max_size=DEFAULT_MAX_SIZE, image_format='webp', quality=80):
+    '''Resize and recompress one image and compute its perceptual hash
+    Runs in a worker process, so it only takes and returns plain values. Returns the hash'''
+    from PIL import Image
+
+    pil_format, _ = PREVIEW_FORMATS[image_format]
+    with Image.open(source_path) as image:
+        image_hash = difference_hash(image)
+
+        preview = image.convert('RGB')
+        preview.thumbnail(tuple(max_size), Image.Resampling.LANCZOS)
+
+        os.makedirs(os.path.dirname(preview_path), exist_ok=True)
+        temp_path = f"{preview_path}.part"
+        preview.save(temp_path, pil_format, quality=quality)
+        os.replace(temp_path, preview_path)
+
+    return image_hash
+
+class ThumbnailProcessor:
+    """
+    Optional post-processing stage for downloaded thumbnails.
+    Each stored image is resized to fit max_size, recompressed to WebP or JPEG and given a
+    perceptual hash in a process pool, so the CPU-bound work runs on every core instead of
+    competing with the download threads.
+    """
+
+    def __init__(self, previews_dir, max_size=DEFAULT_MAX_SIZE, image_format='webp', quality=80,
+                 workers=None, keep_original=True):
+        if image_format not in PREVIEW_FORMATS:
+            raise ValueError(f"Unsupported thumbnail format: {image_format}")
+        try:
+            import PIL
+        except ImportError as e:
+            raise ImportError("Thumbnail processing requires Pillow: pip install Pillow") from e
+
+        self.previews_dir = previews_dir
+        self.max_size = tuple(max_size)
+        self.image_format = image_format
+        self.quality = quality
+        self.keep_original = keep_original
+        self.executor = ProcessPoolExecutor(max_workers=workers,
+                                            mp_context=multiprocessing.get_context(WORKER_START_METHOD))
+
+    @classmethod
+    def from_config(cls, config, thumbnail_dir):
+        #Create a processor from the thumbnail_processing section of config.json, or None if disabled
+        processing = config.get('thumbnail_processing', {})
+        if not processing.get('enabled'):
+            return None
+        return cls(
+            os.path.join(thumbnail_dir, 'previews'),
+            max_size=processing.get('max_size', DEFAULT_MAX_SIZE),
+            image_format=processing.get('format', 'webp'),
+            quality=processing.get('quality', 80),
+            workers=processing.get('workers'),
+            keep_original=processing.get('keep_original', True)
+        )
+
+    def preview_path(self, content_hash):
+        #Previews are content-addressed like the originals, so duplicates are processed once
+        _, extension = PREVIEW_FORMATS[self.image_format]
+        return os.path.join(self.previews_dir, content_hash[:2], content_hash[2:4], f"{content_hash}.{extension}")
+
+    def process(self, store, file_id):
+        '''Post-process a post's stored thumbnail and record the result in the store
+        Called from download worker threads; blocks only that thread while the process pool works'''
+        entry = store.lookup(file_id)
+        if entry is None:
+            return False
+
+        # Reuse the result of another post with the same image
+        processed = store.processed_for_hash(entry['content_hash'])
+        if processed is None:
+            if not os.path.exists(entry['path']):
+                return False
+            preview_path = self.preview_path(entry['content_hash'])
+            try:
+                image_hash = self.executor.submit(
+                    process_image, entry['path'], preview_path, self.max_size, self.image_format, self.quality
+                ).result()
+            except Exception as e:
+                logger.warning(f"Could not process thumbnail for {file_id}: {str(e)}")
+                return False
+            processed = (image_hash, preview_path)
+
+        store.set_processed(file_id, *processed)
+        if not self.keep_original and os.path.exists(entry['path']):
+            os.remove(entry['path'])
+        return True
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+
+# One process pool shared by every thumbnail downloader in the process
+_processor = None
+_processor_lock = threading.Lock()
+
+def get_thumbnail_processor(config, thumbnail_dir):
+    #Return the shared processor, creating it from config on first use, or None if processing is disabled
+    global _processor
+    with _processor_lock:
+        if _processor is None:
+            _processor = ThumbnailProcessor.from_config(config, thumbnail_dir)
+        return _processor
+
+def close_thumbnail_processor():
+    #Shut down the shared process pool if it was started
+    global _processor
+    with _processor_lock:
+        if _processor is not None:
+            _processor.close()
+            _processor = None
@@ -0,0 +1,450 @@
+import os
+import time
+import queue
+import sqlite3
+import shutil
+import hashlib
+import asyncio
+import threading
+from urllib.parse import urlparse
+from metrics import get_metrics
+
+# Configure logging
+import logging
+logger = logging.getLogger(__name__)
+
+# Browser-like headers so image CDNs don't reject the request
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+}
+VALID_EXTENSIONS = ['jpg', 'jpeg', 'png', 'webp', 'gif', 'heic']
+CHUNK_SIZE = 64 * 1024
+
+def image_extension(image_url):
+    #File extension from the URL path, or jpg when it is missing or not an image type
+    file_extension = 'jpg'
+    if '.' in image_url.split('?')[0].split('/')[-1]:
+        url_extension = image_url.split('?')[0].split('/')[-1].split('.')[-1].lower()
+        # Only use valid image extensions
+        if url_extension in VALID_EXTENSIONS:
+            file_extension = url_extension
+    return file_extension
+
+def thumbnail_path(image_url, file_id, thumbnail_dir):
+    #Legacy flat file path for a thumbnail from its URL extension and a sanitized post ID
+    # Clean the file_id to avoid issues with special characters
+    safe_file_id = "".join([c for c in file_id if c.isalnum() or c in '_-'])
+
+    return os.path.join(thumbnail_dir, f"{safe_file_id}.{image_extension(image_url)}")
+
+class ThumbnailStore:
+    """
+    Content-addressed thumbnail storage.
+    Each unique image is stored once as objects/<ab>/<cd>/<sha256>.<ext>, sharded by hash
+    prefix so no directory grows too large, and a SQLite index maps post IDs to content
+    hashes along with the ETag/Last-Modified validators used for conditional re-fetches
+    and, when post-processing is enabled, the preview path and perceptual hash.
+    """
+
+    def __init__(self, thumbnail_dir='thumbnails', revalidate_after=None):
+        self.thumbnail_dir = thumbnail_dir
+        self.objects_dir = os.path.join(thumbnail_dir, 'objects')
+        # Seconds before a stored thumbnail is re-validated with the server; None never re-fetches
+        self.revalidate_after = revalidate_after
+        self.stats = {'stored': 0, 'deduplicated': 0, 'not_modified': 0, 'imported': 0}
+        os.makedirs(self.objects_dir, exist_ok=True)
+
+        self.conn = sqlite3.connect(os.path.join(thumbnail_dir, 'index.db'), check_same_thread=False, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS thumbnails (
+                post_id TEXT PRIMARY KEY,
+                content_hash TEXT NOT NULL,
+                extension TEXT NOT NULL,
+                image_url TEXT NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                fetched_at REAL NOT NULL,
+                phash TEXT,
+                preview_path TEXT
+            )
+            """
+        )
+        # Indexes created before post-processing existed lack its columns
+        columns = [row[1] for row in self.conn.execute("PRAGMA table_info(thumbnails)")]
+        for column in ('phash', 'preview_path'):
+            if column not in columns:
+                self.conn.execute(f"ALTER TABLE thumbnails ADD COLUMN {column} TEXT")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS thumbnails_content_hash ON thumbnails (content_hash)")
+        self.conn.commit()
+        self._lock = threading.Lock()
+
+        # Post IDs whose download (and processing) finished, until the save path collects them
+        self._done = set()
+        self._done_condition = threading.Condition()
+
+    def object_path(self, content_hash, extension):
+        #Sharded path of a stored image blob
+        return os.path.join(self.objects_dir, content_hash[:2], content_hash[2:4], f"{content_hash}.{extension}")
+
+    def lookup(self, file_id):
+        #Return the index entry for a post as a dict, or None if it has no stored thumbnail
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT content_hash, extension, image_url, etag, last_modified, fetched_at, phash, preview_path "
+                "FROM thumbnails WHERE post_id = ?",
+                (file_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        entry = dict(zip(
+            ('content_hash', 'extension', 'image_url', 'etag', 'last_modified', 'fetched_at', 'phash', 'preview_path'),
+            row
+        ))
+        entry['path'] = self.object_path(entry['content_hash'], entry['extension'])
+        return entry
+
+    def path_for(self, file_id):
+        #Local file path of a post's thumbnail, or None if it has not been downloaded
+        entry = self.lookup(file_id)
+        if entry is None:
+            return None
+        if entry['preview_path'] and os.path.exists(entry['preview_path']):
+            return entry['preview_path']
+        return entry['path']
+
+    def needs_fetch(self, entry):
+        #Whether a stored thumbnail is missing on disk or due for re-validation
+        if entry is None:
+            return True
+        if not os.path.exists(entry['path']) and not (entry['preview_path'] and os.path.exists(entry['preview_path'])):
+            return True
+        if self.revalidate_after is None:
+            return False
+        return time.time() - entry['fetched_at'] >= self.revalidate_after
+
+    def temp_path(self):
+        #Unique temporary file for a download in progress, on the same filesystem as the objects
+        return os.path.join(self.objects_dir, f".{threading.get_ident()}-{time.time_ns()}.part")
+
+    def add(self, file_id, temp_path, content_hash, image_url, etag=None, last_modified=None):
+        #Move a downloaded file into the store, keeping only one copy per content hash
+        extension = image_extension(image_url)
+        object_path = self.object_path(content_hash, extension)
+        duplicate = os.path.exists(object_path)
+        if duplicate:
+            os.remove(temp_path)
+        else:
+            os.makedirs(os.path.dirname(object_path), exist_ok=True)
+            os.replace(temp_path, object_path)
+
+        with self._lock, self.conn:
+            self.stats['deduplicated' if duplicate else 'stored'] += 1
+            self.conn.execute(
+                "INSERT OR REPLACE INTO thumbnails "
+                "(post_id, content_hash, extension, image_url, etag, last_modified, fetched_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (file_id, content_hash, extension, image_url, etag, last_modified, time.time())
+            )
+        return object_path
+
+    def mark_not_modified(self, file_id):
+        #Record a 304 response so the thumbnail is not re-validated again until it is due
+        with self._lock, self.conn:
+            self.conn.execute("UPDATE thumbnails SET fetched_at = ? WHERE post_id = ?", (time.time(), file_id))
+            self.stats['not_modified'] += 1
+
+    def processed_for_hash(self, content_hash):
+        #(phash, preview_path) already computed for this image content, or None
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT phash, preview_path FROM thumbnails "
+                "WHERE content_hash = ? AND phash IS NOT NULL LIMIT 1",
+                (content_hash,)
+            ).fetchone()
+        if row is None or not os.path.exists(row[1]):
+            return None
+        return row
+
+    def set_processed(self, file_id, phash, preview_path):
+        with self._lock, self.conn:
+            self.conn.execute(
+                "UPDATE thumbnails SET phash = ?, preview_path = ? WHERE post_id = ?",
+                (phash, preview_path, file_id)
+            )
+
+    def image_hashes(self, file_ids):
+        #Map post IDs to their perceptual hashes, for the ones that have been processed
+        hashes = {}
+        for file_id in file_ids:
+            entry = self.lookup(file_id)
+            if entry and entry['phash']:
+                hashes[file_id] = entry['phash']
+        return hashes
+
+    def mark_done(self, file_id):
+        #Signal that a post's thumbnail has finished downloading and processing, successfully or not
+        with self._done_condition:
+            self._done.add(file_id)
+            self._done_condition.notify_all()
+
+    def wait_for(self, file_ids, timeout=30):
+        #Block until every given post's thumbnail is done or the timeout expires; returns True if all finished
+        pending = set(file_ids)
+        deadline = time.monotonic() + timeout
+        with self._done_condition:
+            while True:
+                finished = pending & self._done
+                self._done -= finished
+                pending -= finished
+                remaining = deadline - time.monotonic()
+                if not pending or remaining <= 0:
+                    return not pending
+                self._done_condition.wait(remaining)
+
+    def import_legacy(self, image_url, file_id):
+        '''Add a thumbnail saved by older versions as <thumbnail_dir>/<post_id>.<ext> to the store
+        The original is left in place (it may be tracked in a repository); the store gets a hard
+        link to it, or a copy where links are not supported'''
+        legacy_path = thumbnail_path(image_url, file_id, self.thumbnail_dir)
+        if not os.path.exists(legacy_path):
+            return None
+
+        digest = hashlib.sha256()
+        with open(legacy_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+                digest.update(chunk)
+
+        temp_path = self.temp_path()
+        try:
+            os.link(legacy_path, temp_path)
+        except OSError:
+            shutil.copyfile(legacy_path, temp_path)
+        with self._lock:
+            self.stats['imported'] += 1
+        return self.add(file_id, temp_path, digest.hexdigest(), image_url)
+
+    def close(self):
+        self.conn.close()
+
+# One store per thumbnail directory, shared by every downloader in the process
+_stores = {}
+_stores_lock = threading.Lock()
+
+def get_thumbnail_store(thumbnail_dir='thumbnails', revalidate_after=None):
+    #Return the shared store for a thumbnail directory, creating it on first use
+    # Keyed by absolute path so a relative directory means the same store only from the same working directory
+    key = os.path.abspath(thumbnail_dir)
+    with _stores_lock:
+        if key not in _stores:
+            _stores[key] = ThumbnailStore(thumbnail_dir, revalidate_after)
+        elif revalidate_after is not None:
+            _stores[key].revalidate_after = revalidate_after
+        return _stores[key]
+
+def create_session(pool_size=10):
+    #Create a requests session with a keep-alive connection pool sized for the worker count
+    import requests
+    from requests.adapters import HTTPAdapter
+    
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    session.headers.update(DEFAULT_HEADERS)
+    return session
+
+def fetch_thumbnail(session, image_url, file_id, thumbnail_dir, timeout=15, store=None):
+    '''Download a thumbnail over an existing session into the content-addressed store
+    The image is hashed while it streams to a .part file, so an interrupted download never leaves
+    a truncated image and identical images are kept once. Stored thumbnails due for re-validation
+    are re-fetched conditionally with their ETag/Last-Modified'''
+    store = store or get_thumbnail_store(thumbnail_dir)
+
+    with get_metrics().time('thumbnail_fetch') as timer:
+        try:
+            entry = store.lookup(file_id)
+            if entry is None and store.import_legacy(image_url, file_id):
+                entry = store.lookup(file_id)
+
+            # Skip thumbnails that are already stored and not due for re-validation
+            if not store.needs_fetch(entry):
+                timer.outcome = 'skipped'
+                logger.info(f"Thumbnail already exists: {entry['path']}")
+                return True
+
+            headers = {}
+            if entry is not None and os.path.exists(entry['path']):
+                if entry['etag']:
+                    headers['If-None-Match'] = entry['etag']
+                if entry['last_modified']:
+                    headers['If-Modified-Since'] = entry['last_modified']
+
+            with session.get(image_url, timeout=timeout, stream=True, headers=headers) as response:
+                if response.status_code == 304:
+                    store.mark_not_modified(file_id)
+                    timer.outcome = 'not_modified'
+                    logger.info(f"Thumbnail not modified: {entry['path']}")
+                    return True
+                if response.status_code != 200:
+                    timer.outcome = 'failed'
+                    logger.warning(f"Failed to download thumbnail, status code: {response.status_code}")
+                    return False
+
+                temp_path = store.temp_path()
+                try:
+                    digest = hashlib.sha256()
+                    with open(temp_path, 'wb') as f:
+                        for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                            if chunk:
+                                digest.update(chunk)
+                                f.write(chunk)
+                    file_path = store.add(
+                        file_id, temp_path, digest.hexdigest(), image_url,
+                        etag=response.headers.get('ETag'),
+                        last_modified=response.headers.get('Last-Modified')
+                    )
+                finally:
+                    if os.path.exists(temp_path):
+                        os.remove(temp_path)
+
+            logger.info(f"Thumbnail saved to {file_path}")
+            return True
+        except Exception as e:
+            timer.outcome = 'failed'
+            logger.error(f"Error downloading thumbnail: {str(e)}")
+            return False
+
+class ThumbnailDownloader:
+    """
+    Background thumbnail downloader shared by both scrapers.
+    Scrapers queue (image_url, post_id) pairs and keep going while a pool of worker
+    threads downloads them over one keep-alive session, with a cap on concurrent
+    requests per host.
+    """
+
+    def __init__(self, thumbnail_dir='thumbnails', max_workers=8, per_host_limit=4, queue_size=256, timeout=15,
+                 revalidate_after=None, processor=None):
+        self.thumbnail_dir = thumbnail_dir
+        self.per_host_limit = per_host_limit
+        self.timeout = timeout
+        self.store = get_thumbnail_store(thumbnail_dir, revalidate_after)
+        # Optional ThumbnailProcessor run on every downloaded thumbnail
+        self.processor = processor
+
+        self.session = create_session(pool_size=max_workers)
+        self.queue = queue.Queue(maxsize=queue_size)
+
+        self._host_slots = {}
+        self._host_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.stats = {'queued': 0, 'downloaded': 0, 'failed': 0}
+        self._closed = False
+
+        os.makedirs(self.thumbnail_dir, exist_ok=True)
+
+        self._workers = []
+        for i in range(max_workers):
+            worker = threading.Thread(target=self._worker, name=f"thumbnail-worker-{i}", daemon=True)
+            worker.start()
+            self._workers.append(worker)
+
+    def submit(self, image_url, file_id):
+        #Queue a thumbnail for download, blocking only if the queue is full
+        if not image_url or not file_id:
+            return False
+        if self._closed:
+            raise RuntimeError("ThumbnailDownloader is closed")
+
+        self.queue.put((image_url, file_id))
+        with self._stats_lock:
+            self.stats['queued'] += 1
+        return True
+
+    async def asubmit(self, image_url, file_id):
+        #Queue a thumbnail from async code without blocking the event loop when the queue is full
+        if not image_url or not file_id:
+            return False
+        if self._closed:
+            raise RuntimeError("ThumbnailDownloader is closed")
+
+        try:
+            self.queue.put_nowait((image_url, file_id))
+        except queue.Full:
+            await asyncio.to_thread(self.queue.put, (image_url, file_id))
+        with self._stats_lock:
+            self.stats['queued'] += 1
+        return True
+
+    def _host_slot(self, image_url):
+        #Get the semaphore limiting concurrent requests to this URL's host
+        host = urlparse(image_url).netloc
+        with self._host_lock:
+            if host not in self._host_slots:
+                self._host_slots[host] = threading.BoundedSemaphore(self.per_host_limit)
+            return self._host_slots[host]
+
+    def _worker(self):
+        #Download queued thumbnails until a stop sentinel is received
+        while True:
+            item = self.queue.get()
+            try:
+                if item is None:
+                    return
+                image_url, file_id = item
+                try:
+                    with self._host_slot(image_url):
+                        success = fetch_thumbnail(self.session, image_url, file_id, self.thumbnail_dir, self.timeout,
+                                                  self.store)
+                    if success and self.processor is not None:
+                        self.processor.process(self.store, file_id)
+                    with self._stats_lock:
+                        self.stats['downloaded' if success else 'failed'] += 1
+                finally:
+                    if self.processor is not None:
+                        self.store.mark_done(file_id)
+            except Exception as e:
+                logger.error(f"Thumbnail worker error: {str(e)}")
+            finally:
+                self.queue.task_done()
+
+    def close(self, wait=True):
+        '''Stop the workers and close the session
+        With wait=True all queued thumbnails are downloaded first'''
+        if self._closed:
+            return
+        self._closed = True
+
+        if wait:
+            self.queue.join()
+        else:
+            # Drop anything still waiting so the workers reach the stop sentinels
+            while True:
+                try:
+                    item = self.queue.get_nowait()
+                    if item is not None and self.processor is not None:
+                        self.store.mark_done(item[1])
+                    self.queue.task_done()
+                except queue.Empty:
+                    break
+        for _ in self._workers:
+            self.queue.put(None)
+        for worker in self._workers:
+            worker.join()
+
+        self.session.close()
+        logger.info(
+            f"Thumbnail downloader finished: {self.stats['downloaded']} downloaded, "
+            f"{self.stats['failed']} failed, {self.store.stats['deduplicated']} duplicates stored once"
+        )
+
+    async def aclose(self, wait=True):
+        #Close from async code without blocking the event loop while the queue drains
+        await asyncio.to_thread(self.close, wait)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()